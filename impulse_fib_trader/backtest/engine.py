@@ -1,19 +1,115 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
+from pattern.records import PatternTable, pattern_column, PRESENT
+from features.labels import first_touch
 
 class BacktestEngine:
     def __init__(self, config: Dict):
         self.config = config['risk_management']
 
-    def run_backtest(self, patterns: List[Dict], df: pd.DataFrame, entry_mode: str = 'BREAKOUT') -> pd.DataFrame:
+    def run_backtest(self, patterns: Union[PatternTable, List[Dict]], df: pd.DataFrame,
+                     entry_mode: str = 'BREAKOUT', rr: float = 2.5, resolver=None,
+                     symbol: Optional[str] = None) -> pd.DataFrame:
         """
         Runs a rule-based backtest.
+        patterns: list of dicts or a PatternTable.
         entry_mode: 'BREAKOUT' (current) or 'LIMIT' (0.618 Fib level).
+
+        All trades are resolved at once by the first-touch kernel; the result
+        is the same frame _run_backtest_loop builds trade by trade, including
+        the stop winning when stop and target are hit on the same bar.
+        Each trade also records its exit bar and prices, plus entry/exit times
+        when df has a timestamp column (used by the portfolio simulator).
+        With an IntrabarResolver, bars that touch both stop and target are
+        decided on the lower timeframe instead of counting as a stop;
+        symbol then names the market (patterns themselves say 'UNKNOWN').
         """
+        atr_buffer = self.config['stop_loss']['buffer_atr']
+        max_bars = self.config.get('max_bars_in_trade', 40)
+
+        if entry_mode == 'BREAKOUT':
+            if isinstance(patterns, PatternTable):
+                names = patterns.data.dtype.names or ()
+                if 'structure.entry_idx' not in names:
+                    return pd.DataFrame([])
+                if PRESENT + 'structure.entry_idx' in names:
+                    patterns = patterns[patterns.data[PRESENT + 'structure.entry_idx']]
+            else:
+                patterns = [p for p in patterns if 'structure' in p and p['structure']]
+        if not len(patterns):
+            return pd.DataFrame([])
+
+        bullish = pattern_column(patterns, 'impulse.type') == 'bullish'
+        pb_end = pattern_column(patterns, 'pullback.end_idx').astype(np.int64)
+        if entry_mode == 'BREAKOUT':
+            entry_idx = pattern_column(patterns, 'structure.entry_idx').astype(np.int64)
+            entry_price = pattern_column(patterns, 'structure.entry_price').astype(np.float64)
+        else:
+            entry_idx = pb_end
+            fib_level = 0.618
+            imp_range = pattern_column(patterns, 'impulse.range').astype(np.float64)
+            entry_price = np.where(bullish,
+                                   pattern_column(patterns, 'impulse.high') - (imp_range * fib_level),
+                                   pattern_column(patterns, 'impulse.low') + (imp_range * fib_level))
+
+        atr = df['atr'].values.astype(np.float64)[pb_end]
+        sl = np.where(bullish, pattern_column(patterns, 'pullback.low') - atr_buffer * atr,
+                      pattern_column(patterns, 'pullback.high') + atr_buffer * atr)
+        tp = np.where(bullish, entry_price + rr * (entry_price - sl), entry_price - rr * (sl - entry_price))
+        risk = np.abs(entry_price - sl)
+
+        keep = ~(risk == 0)
+        entry_idx, entry_price, sl, tp, risk, bullish = (
+            entry_idx[keep], entry_price[keep], sl[keep], tp[keep], risk[keep], bullish[keep])
+
+        target_bar, stop_bar = first_touch(entry_idx, sl, tp[:, None], df['high'].values.astype(np.float64),
+                                           df['low'].values.astype(np.float64), max_bars, bullish)
+        target_bar = target_bar[:, 0]
+        # Стоп проверяется первым внутри свечи, поэтому при равенстве побеждает он
+        stopped = (stop_bar <= max_bars) & (stop_bar <= target_bar)
+        won = (target_bar <= max_bars) & (target_bar < stop_bar)
+        symbols = pattern_column(patterns, 'symbol', 'UNKNOWN')[keep]
+        if symbol is not None:
+            # Детекторы пишут 'UNKNOWN', рынок для intrabar-свечей задает вызывающий
+            symbols = np.full(len(symbols), symbol, dtype=object)
+        if resolver is not None:
+            tie = np.flatnonzero(stopped & (stop_bar == target_bar))
+            if len(tie):
+                bar_idx = entry_idx[tie] + stop_bar[tie]
+                first = resolver.target_first(symbols[tie], df['timestamp'].values[bar_idx],
+                                              sl[tie], tp[tie], bullish[tie])
+                stopped[tie[first]] = False
+                won[tie[first]] = True
+
+        timeout_idx = np.minimum(entry_idx + max_bars, len(df) - 1)
+        close = df['close'].values.astype(np.float64)[timeout_idx]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            timeout = np.where(bullish, (close - entry_price) / risk, (entry_price - close) / risk)
+        r_multiple = np.where(stopped, -1.0, np.where(won, float(rr), timeout))
+        exit_idx = np.where(stopped, entry_idx + stop_bar, np.where(won, entry_idx + target_bar, timeout_idx))
+        exit_price = np.where(stopped, sl, np.where(won, tp, close))
+
+        results = pd.DataFrame({
+            'symbol': symbols,
+            'entry_idx': entry_idx,
+            'r_multiple': r_multiple,
+            'type': np.where(bullish, 'bullish', 'bearish'),
+            'exit_idx': exit_idx,
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+        })
+        if 'timestamp' in df.columns:
+            results['entry_time'] = df['timestamp'].values[entry_idx]
+            results['exit_time'] = df['timestamp'].values[exit_idx]
+        return results
+
+    def _run_backtest_loop(self, patterns: Union[PatternTable, List[Dict]], df: pd.DataFrame,
+                           entry_mode: str = 'BREAKOUT', rr: float = 2.5) -> pd.DataFrame:
+        """Trade-by-trade reference implementation of run_backtest."""
         results = []
         atr_buffer = self.config['stop_loss']['buffer_atr']
-        max_bars = self.config['max_bars_in_trade']
+        max_bars = self.config.get('max_bars_in_trade', 40)
         
         for p in patterns:
             imp = p['impulse']
@@ -39,10 +135,10 @@ class BacktestEngine:
             if imp['type'] == 'bullish':
                 sl = pb['low'] - atr_buffer * df.iloc[pb['end_idx']]['atr']
                 # TP ставим выше: для лимитки RR обычно лучше
-                tp = entry_price + 2.5 * (entry_price - sl)
+                tp = entry_price + rr * (entry_price - sl)
             else:
                 sl = pb['high'] + atr_buffer * df.iloc[pb['end_idx']]['atr']
-                tp = entry_price - 2.5 * (sl - entry_price)
+                tp = entry_price - rr * (sl - entry_price)
             
             risk = abs(entry_price - sl)
             if risk == 0: continue
@@ -63,7 +159,7 @@ class BacktestEngine:
                         exit_price = sl
                         break
                     if high >= tp:
-                        trade_result = 2.5
+                        trade_result = rr
                         exit_idx = i
                         exit_price = tp
                         break
@@ -74,7 +170,7 @@ class BacktestEngine:
                         exit_price = sl
                         break
                     if low <= tp:
-                        trade_result = 2.5
+                        trade_result = rr
                         exit_idx = i
                         exit_price = tp
                         break
@@ -84,11 +180,18 @@ class BacktestEngine:
                 exit_price = df.iloc[exit_idx]['close']
                 trade_result = (exit_price - entry_price) / risk if imp['type'] == 'bullish' else (entry_price - exit_price) / risk
             
-            results.append({
+            trade = {
                 'symbol': p.get('symbol', 'UNKNOWN'),
                 'entry_idx': entry_idx,
                 'r_multiple': trade_result,
-                'type': imp['type']
-            })
+                'type': imp['type'],
+                'exit_idx': exit_idx,
+                'entry_price': entry_price,
+                'exit_price': exit_price
+            }
+            if 'timestamp' in df.columns:
+                trade['entry_time'] = df.iloc[entry_idx]['timestamp']
+                trade['exit_time'] = df.iloc[exit_idx]['timestamp']
+            results.append(trade)
             
         return pd.DataFrame(results)
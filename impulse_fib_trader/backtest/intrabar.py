@@ -0,0 +1,95 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Sequence, Union
+from data.fetcher import DataFetcher, OHLCV_COLUMNS
+from data.storage import DataStorage, timeframe_ms
+
+logger = logging.getLogger(__name__)
+
+# Резолвер с биржей и хранилищем создается один раз на процесс-воркер
+_RESOLVERS = {}
+
+
+class IntrabarResolver:
+    """
+    Decides which barrier came first on a bar that touched both stop and
+    target, from lower-timeframe candles inside that bar only.
+
+    Lower candles are fetched on demand, one bar window per ambiguous bar,
+    and cached in the candle store (DataStorage.append_ranges), so a rerun
+    reads them from disk. Windows that came back empty are not cached and
+    are fetched again next time. Full lower-timeframe history is never requested.
+    If the lower candles still touch both on the same candle (or are
+    missing), the stop wins, as in the bar-level backtest.
+    """
+    def __init__(self, fetcher: DataFetcher, store: DataStorage, timeframe: str = '1h', lower: str = '1m'):
+        self.fetcher = fetcher
+        self.store = store
+        self.timeframe = timeframe
+        self.lower = lower
+        self.bar_ms = timeframe_ms(timeframe)
+
+    def target_first(self, symbols: Union[str, Sequence[str]], bar_times, stops, targets,
+                     bullish: Union[bool, Sequence[bool]] = True) -> np.ndarray:
+        """
+        For each ambiguous bar (open time bar_times[i]) True if targets[i] was
+        touched strictly before stops[i] on the lower timeframe.
+        """
+        bar_ms = np.asarray(pd.to_datetime(bar_times)).astype('datetime64[ms]').astype(np.int64)
+        symbols = np.broadcast_to(np.asarray(symbols, dtype=object), bar_ms.shape)
+        if (symbols == 'UNKNOWN').any():
+            # Паттерны без символа (например, TAS): иначе качали бы свечи несуществующего рынка
+            raise ValueError("Intrabar resolution needs the market symbol; got 'UNKNOWN'")
+        stops = np.asarray(stops, dtype=np.float64)
+        targets = np.asarray(targets, dtype=np.float64)
+        bullish = np.broadcast_to(np.asarray(bullish, dtype=bool), bar_ms.shape)
+
+        out = np.zeros(len(bar_ms), dtype=bool)
+        for symbol in dict.fromkeys(symbols.tolist()):
+            rows = np.flatnonzero(symbols == symbol)
+            self._ensure(symbol, np.unique(bar_ms[rows]))
+            lower = self.store.load_ranges(symbol, self.lower, int(bar_ms[rows].min()),
+                                           int(bar_ms[rows].max()) + self.bar_ms - 1)
+            if lower.empty:
+                continue
+            ts = lower['timestamp'].astype('datetime64[ms]').astype('int64').values
+            highs = lower['high'].values.astype(np.float64)
+            lows = lower['low'].values.astype(np.float64)
+            for i in rows:
+                lo, hi = np.searchsorted(ts, [bar_ms[i], bar_ms[i] + self.bar_ms])
+                if bullish[i]:
+                    stop_hit, target_hit = lows[lo:hi] <= stops[i], highs[lo:hi] >= targets[i]
+                else:
+                    stop_hit, target_hit = highs[lo:hi] >= stops[i], lows[lo:hi] <= targets[i]
+                if target_hit.any():
+                    first_stop = stop_hit.argmax() if stop_hit.any() else hi - lo
+                    out[i] = target_hit.argmax() < first_stop
+        return out
+
+    def _ensure(self, symbol: str, bar_ms: np.ndarray):
+        """Fetches and caches the lower candles of bars not in the store yet."""
+        cached = set(self.store.cached_ranges(symbol, self.lower))
+        missing = [(int(b), int(b) + self.bar_ms - 1) for b in bar_ms
+                   if (int(b), int(b) + self.bar_ms - 1) not in cached]
+        if not missing:
+            return
+        logger.info(f"Fetching {self.lower} candles for {len(missing)} ambiguous {self.timeframe} bars of {symbol}")
+        frames = [self.fetcher.fetch_range(symbol, self.lower, first, last) for first, last in missing]
+        # fetch_range глотает сетевые ошибки и отдает пустую таблицу: такие окна не кэшируем,
+        # иначе сбой запомнился бы как "нет данных" и бар навсегда решался бы в пользу стопа
+        fetched = [window for window, f in zip(missing, frames) if not f.empty]
+        if len(fetched) < len(missing):
+            logger.warning(f"No {self.lower} candles for {len(missing) - len(fetched)} bars of {symbol}, "
+                           f"will retry on the next run")
+        frames = [f for f in frames if not f.empty]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=OHLCV_COLUMNS)
+        self.store.append_ranges(symbol, self.lower, df, fetched)
+
+
+def get_resolver(lower: str, store_dir: str = 'candles', timeframe: str = '1h') -> IntrabarResolver:
+    """Per-process resolver for scripts and worker tasks (exchange objects are not picklable)."""
+    key = (lower, store_dir, timeframe)
+    if key not in _RESOLVERS:
+        _RESOLVERS[key] = IntrabarResolver(DataFetcher(), DataStorage(store_dir), timeframe, lower)
+    return _RESOLVERS[key]
@@ -0,0 +1,112 @@
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def shareable(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The frame exactly as workers see it: timestamp plus numeric columns as
+    float64. The serial path uses it too, so any worker count gives the same input.
+    """
+    columns = [c for c in df.columns if c != 'timestamp' and pd.api.types.is_numeric_dtype(df[c])]
+    out = df[columns].astype(np.float64)
+    if 'timestamp' in df.columns:
+        out.insert(0, 'timestamp', df['timestamp'].values)
+    return out.reset_index(drop=True)
+
+
+class SharedFrame:
+    """
+    A symbol's candles in one shared-memory block: timestamps as int64 followed
+    by every numeric column as float64. Only the small handle (block name,
+    shape, column names) is pickled to workers; they map the block instead of
+    receiving a copy of the DataFrame.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.columns = [c for c in df.columns if c != 'timestamp' and pd.api.types.is_numeric_dtype(df[c])]
+        self.n = len(df)
+        self.ts_dtype = str(df['timestamp'].dtype) if 'timestamp' in df.columns else None
+
+        size = max(1, 8 * self.n * (len(self.columns) + 1))
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        ts, values = self._views(self.shm.buf, self.n, len(self.columns))
+        if self.ts_dtype is not None:
+            ts[:] = df['timestamp'].values.view(np.int64)
+        for k, col in enumerate(self.columns):
+            values[k] = df[col].values.astype(np.float64)
+
+    @staticmethod
+    def _views(buf, n: int, n_cols: int) -> Tuple[np.ndarray, np.ndarray]:
+        ts = np.ndarray((n,), dtype=np.int64, buffer=buf)
+        values = np.ndarray((n_cols, n), dtype=np.float64, buffer=buf, offset=8 * n)
+        return ts, values
+
+    @property
+    def handle(self) -> Tuple:
+        return (self.shm.name, self.n, self.columns, self.ts_dtype)
+
+    @staticmethod
+    def attach(handle: Tuple) -> Tuple[shared_memory.SharedMemory, pd.DataFrame]:
+        """Maps a block in a worker. The caller closes the returned segment when done."""
+        name, n, columns, ts_dtype = handle
+        shm = shared_memory.SharedMemory(name=name)
+        ts, values = SharedFrame._views(shm.buf, n, len(columns))
+        data = {}
+        if ts_dtype is not None:
+            data['timestamp'] = ts.view(ts_dtype)
+        for k, col in enumerate(columns):
+            data[col] = values[k]
+        # Копия отвязывает фрейм от сегмента, чтобы его можно было закрыть
+        return shm, pd.DataFrame(data, copy=True)
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _run_shared(task: Callable, symbol: str, handle: Tuple, kwargs: Dict):
+    shm, df = SharedFrame.attach(handle)
+    try:
+        return task(symbol, df, **kwargs)
+    finally:
+        shm.close()
+
+
+def run_parallel(task: Callable, frames: Dict[str, pd.DataFrame], workers: int = 1,
+                 **kwargs) -> Dict[str, object]:
+    """
+    Runs task(symbol, df, **kwargs) for every symbol and returns {symbol: result}
+    in the order of `frames`.
+
+    task must be a module-level function whose result depends only on its own
+    symbol's candles: then the output is the same for any worker count.
+    workers <= 1 runs in this process without shared memory.
+    """
+    symbols: List[str] = list(frames)
+    if workers <= 1 or len(symbols) <= 1:
+        return {s: task(s, shareable(frames[s]), **kwargs) for s in symbols}
+
+    shared = {}
+    try:
+        for s in symbols:
+            shared[s] = SharedFrame(shareable(frames[s]))
+        with ProcessPoolExecutor(max_workers=min(workers, len(symbols))) as pool:
+            results = pool.map(_run_shared, [task] * len(symbols), symbols,
+                               [shared[s].handle for s in symbols], [kwargs] * len(symbols))
+            return dict(zip(symbols, results))
+    finally:
+        for frame in shared.values():
+            frame.release()
+
+
+def merge_results(results: List[Optional[pd.DataFrame]]) -> pd.DataFrame:
+    """Concatenates per-symbol result frames (in symbol order) for MetricsCalculator."""
+    frames = [r for r in results if r is not None and not r.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioSimulator:
+    """
+    Replays per-symbol backtest trades as one account, with the rules the
+    live bot trades by:
+
+    - one open position per symbol (TradeManager.enter_trade);
+    - no new entry in a symbol within `cooldown_hours` of its previous
+      entry (get_cooldown_symbols);
+    - at most one entry per scan: among the setups on the same bar only the
+      best score is taken, the first symbol winning ties (perform_scan_and_trade);
+    - every position locks `stake` of the capital; with less free capital
+      the best setup is skipped.
+
+    Trades come from BacktestEngine.run_backtest (entry_time, exit_time,
+    entry_price, exit_price). Symbols' timelines are merged with a heap, and
+    open positions sit in a heap by exit time, so a run costs
+    O(trades * log symbols).
+    """
+    def __init__(self, capital: float = 100.0, stake: float = 10.0, cooldown_hours: float = 4,
+                 min_score: Optional[float] = None, score_column: str = 'score'):
+        self.capital = capital
+        self.stake = stake
+        self.cooldown = pd.Timedelta(hours=cooldown_hours).value
+        self.min_score = min_score
+        self.score_column = score_column
+        self.rejected = Counter()
+        self.final_capital = capital
+
+    def run(self, trades: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        trades: {symbol: backtest frame} in scan order (as run_parallel returns).
+        Returns the trades actually taken, in entry order, with their 'pnl'
+        in capital units; why the others were skipped is in self.rejected.
+        """
+        symbols = [s for s, df in trades.items() if df is not None and not df.empty]
+        entry_ns, exit_ns, scores, returns = [], [], [], []
+        streams = []
+        for rank, symbol in enumerate(symbols):
+            df = trades[symbol]
+            entry = df['entry_time'].values.astype('datetime64[ns]').view(np.int64)
+            entry_ns.append(entry)
+            exit_ns.append(df['exit_time'].values.astype('datetime64[ns]').view(np.int64))
+            scores.append(df[self.score_column].values.astype(np.float64) if self.score_column in df.columns
+                          else np.ones(len(df)))
+            entry_price = df['entry_price'].values.astype(np.float64)
+            move = (df['exit_price'].values.astype(np.float64) - entry_price) / entry_price
+            returns.append(np.where(df['type'].values == 'bullish', move, -move))
+            order = np.argsort(entry, kind='stable')
+            streams.append(zip(entry[order].tolist(), itertools.repeat(rank), order.tolist()))
+
+        self.rejected = Counter()
+        cash = self.capital
+        positions = []     # (exit_ns, rank, pnl)
+        holding = set()
+        last_entry = {}
+        taken = []
+
+        for time, scan in itertools.groupby(heapq.merge(*streams), key=lambda e: e[0]):
+            # Сначала закрываем позиции, вышедшие к этой свече
+            while positions and positions[0][0] <= time:
+                _, rank, pnl = heapq.heappop(positions)
+                cash += self.stake + pnl
+                holding.discard(rank)
+
+            best = None
+            eligible = 0
+            for _, rank, row in scan:
+                if rank in holding:
+                    self.rejected['open_position'] += 1
+                    continue
+                if rank in last_entry and time < last_entry[rank] + self.cooldown:
+                    self.rejected['cooldown'] += 1
+                    continue
+                score = scores[rank][row]
+                if self.min_score is not None and score < self.min_score:
+                    self.rejected['score'] += 1
+                    continue
+                eligible += 1
+                if best is None or score > best[0]:
+                    best = (score, rank, row)
+            if best is None:
+                continue
+            self.rejected['not_best'] += eligible - 1
+            if cash < self.stake:
+                self.rejected['capital'] += 1
+                continue
+
+            _, rank, row = best
+            pnl = self.stake * returns[rank][row]
+            cash -= self.stake
+            heapq.heappush(positions, (exit_ns[rank][row], rank, pnl))
+            holding.add(rank)
+            last_entry[rank] = time
+            taken.append((rank, row, pnl))
+
+        self.final_capital = cash + sum(self.stake + pnl for _, _, pnl in positions)
+        if not taken:
+            return pd.DataFrame([])
+
+        ranks = np.array([t[0] for t in taken])
+        rows = np.array([t[1] for t in taken])
+        pnls = np.array([t[2] for t in taken])
+        pieces = []
+        for rank, symbol in enumerate(symbols):
+            mine = np.flatnonzero(ranks == rank)
+            if len(mine):
+                piece = trades[symbol].iloc[rows[mine]].assign(symbol=symbol, pnl=pnls[mine])
+                piece.index = mine
+                pieces.append(piece)
+        return pd.concat(pieces).sort_index().reset_index(drop=True)
@@ -4,11 +4,13 @@ import os
 
 class Reporter:
     @staticmethod
-    def print_full_report(metrics: dict, name: str = "Strategy"):
-        print(f"
---- {name} Report ---")
-        for k, v in metrics.items():
-            if isinstance(v, float):
+    def print_full_report(metrics: dict, name: str = "Strategy", intervals: dict = None):
+        """intervals: MetricsCalculator.confidence output, printed after the point estimates."""
+        print(f"\n--- {name} Report ---")
+        for k, v in {**metrics, **(intervals or {})}.items():
+            if isinstance(v, tuple):
+                print(f"{k:<20}: [{v[0]:.4f}, {v[1]:.4f}]")
+            elif isinstance(v, float):
                 print(f"{k:<20}: {v:.4f}")
             else:
                 print(f"{k:<20}: {v}")
@@ -0,0 +1,203 @@
+import copy
+import itertools
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from pattern.detector import PatternDetector
+from pattern.impulse import ImpulseDetector
+from pattern.range_index import RangeExtremaIndex
+from pattern.records import pattern_column
+from features.engineer import FeatureEngineer
+from ml.train import MLTrainer
+from backtest.engine import BacktestEngine
+from backtest.metrics import MetricsCalculator
+from backtest.parallel import run_parallel, merge_results
+
+logger = logging.getLogger(__name__)
+
+# Секции конфига, по которым можно перебирать параметры ('impulse_detection.min_candles')
+SWEEP_SECTIONS = ('impulse_detection', 'pullback_requirements')
+# Параметры сделки, которые не входят в конфиг детектора
+TRADE_KEYS = ('rr', 'ml_threshold')
+DEFAULT_RR = 2.5
+
+# Модель грузится один раз на процесс-воркер
+_MODELS = {}
+
+
+def expand_grid(grid: Dict[str, List]) -> List[Dict]:
+    """Every combination of the grid values, the last key varying fastest."""
+    for key in grid:
+        section = key.split('.', 1)[0]
+        if key not in TRADE_KEYS and (section not in SWEEP_SECTIONS or '.' not in key):
+            raise ValueError(f"Unsupported sweep parameter: {key}")
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def apply_point(config: Dict, point: Dict) -> Dict:
+    """Copy of config with the point's 'section.name' values set."""
+    out = copy.deepcopy(config)
+    for key, value in point.items():
+        if key in TRADE_KEYS:
+            continue
+        section, name = key.split('.', 1)
+        out.setdefault(section, {})[name] = value
+    return out
+
+
+def _section_key(config: Dict, section: str) -> str:
+    return json.dumps(config.get(section, {}), sort_keys=True)
+
+
+def _impulse_id(impulse: Dict) -> Tuple:
+    return impulse['type'], impulse['start_idx'], impulse['end_idx']
+
+
+def _loosest(configs: List[Dict]) -> Dict:
+    """Impulse thresholds that let through everything any of the configs accepts."""
+    sections = [ImpulseDetector(c).config for c in configs]
+    loosest = dict(sections[0])
+    loosest['min_atr_multiplier'] = min(s.get('min_atr_multiplier', 2.0) for s in sections)
+    loosest['min_body_ratio'] = min(s.get('min_body_ratio', 0.6) for s in sections)
+    loosest['max_internal_retracement'] = max(s.get('max_internal_retracement', 0.30) for s in sections)
+    return {'impulse_detection': loosest}
+
+
+class ParameterSweep:
+    """
+    Runs every grid point on one symbol, sharing whatever does not change
+    between points:
+
+    - the range index and impulse candidates (one pass per min_candles,
+      pruned under the loosest thresholds of the grid);
+    - impulses per impulse_detection setting;
+    - pullback, structure and success per impulse and pullback_requirements
+      setting, whichever impulse settings found that impulse;
+    - ML probabilities per bar;
+
+    so only the ML threshold filter and the RR backtest run per point.
+    Each point gives exactly the trades of detect_patterns + run_backtest
+    with that config.
+    """
+    def __init__(self, config: Dict, points: List[Dict], model=None):
+        self.config = config
+        self.points = points
+        self.configs = [apply_point(config, p) for p in points]
+        self.model = model
+        self.engine = BacktestEngine(config)
+
+    def run_symbol(self, symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Trades of every point, tagged with the point's number in the 'point' column."""
+        index = RangeExtremaIndex(df)
+
+        by_length: Dict[int, List[Dict]] = {}
+        for cfg in self.configs:
+            by_length.setdefault(ImpulseDetector(cfg).config.get('min_candles', 4), []).append(cfg)
+        candidates = {}
+        for min_candles, configs in by_length.items():
+            detector = ImpulseDetector(_loosest(configs))
+            candidates[min_candles] = detector.prune(detector.candidates(df, index))
+
+        impulses: Dict[str, List[Dict]] = {}
+        patterns: Dict[Tuple[str, str], List[Dict]] = {}
+        by_impulse: Dict[str, Dict[Tuple, Optional[Dict]]] = {}
+        bar_probs = None
+        frames = []
+        for k, (point, cfg) in enumerate(zip(self.points, self.configs)):
+            imp_key = _section_key(cfg, 'impulse_detection')
+            pb_key = (imp_key, _section_key(cfg, 'pullback_requirements'))
+            if imp_key not in impulses:
+                detector = ImpulseDetector(cfg)
+                impulses[imp_key] = detector.select(candidates[detector.config.get('min_candles', 4)])
+            if pb_key not in patterns:
+                # Паттерн зависит только от самого импульса, поэтому общие
+                # импульсы разных настроек проверяются один раз
+                memo = by_impulse.setdefault(pb_key[1], {})
+                todo = [imp for imp in impulses[imp_key] if _impulse_id(imp) not in memo]
+                memo.update((_impulse_id(imp), None) for imp in todo)
+                for p in PatternDetector.from_config(cfg).patterns_from_impulses(todo, df, index):
+                    p['symbol'] = symbol
+                    memo[_impulse_id(p['impulse'])] = p
+                found = [memo[_impulse_id(imp)] for imp in impulses[imp_key]]
+                patterns[pb_key] = [p for p in found if p is not None]
+
+            selected = patterns[pb_key]
+            if 'ml_threshold' in point and selected:
+                if bar_probs is None:
+                    bar_probs = self._bar_probabilities(df)
+                keep = bar_probs[pattern_column(selected, 'structure.entry_idx')] >= point['ml_threshold']
+                selected = [p for p, ok in zip(selected, keep) if ok]
+
+            trades = self.engine.run_backtest(selected, df, rr=point.get('rr', DEFAULT_RR))
+            if trades.empty:
+                continue
+            trades.insert(0, 'point', k)
+            frames.append(trades)
+        return merge_results(frames)
+
+    def _bar_probabilities(self, df: pd.DataFrame) -> np.ndarray:
+        """Model probability for an entry on every bar; patterns just index into it."""
+        if self.model is None:
+            raise ValueError("ml_threshold in the grid needs a model")
+        X = FeatureEngineer().extract_features([{'entry_idx': i} for i in range(len(df))], df)
+        return self.model.predict_proba(X)[:, 1]
+
+
+def sweep_symbol(symbol: str, df: pd.DataFrame, config: Dict, points: List[Dict],
+                 model_path: Optional[str] = None) -> pd.DataFrame:
+    """ParameterSweep for one symbol (runs inside a worker)."""
+    model = None
+    if model_path:
+        if model_path not in _MODELS:
+            trainer = MLTrainer()
+            trainer.load_model(model_path)
+            _MODELS[model_path] = trainer.model
+        model = _MODELS[model_path]
+    return ParameterSweep(config, points, model).run_symbol(symbol, df)
+
+
+def _point_metrics(trades: pd.DataFrame, n_sims: int) -> Dict:
+    metrics = MetricsCalculator.calculate(trades)
+    if n_sims:
+        for key, value in MetricsCalculator.confidence(trades, n_sims).items():
+            if isinstance(value, tuple):
+                metrics[key + '_lo'], metrics[key + '_hi'] = value
+            else:
+                metrics[key] = value
+    return metrics
+
+
+def summarize(trades: pd.DataFrame, points: List[Dict], n_sims: int = 1000) -> pd.DataFrame:
+    """
+    One row per point: its parameters and MetricsCalculator over all symbols'
+    trades, with bootstrap intervals from n_sims paths (0 turns them off).
+    Points without trades get NaN metrics, so every column is always present.
+    """
+    groups = dict(iter(trades.groupby('point', sort=False))) if not trades.empty else {}
+    # Имена колонок метрик берем с фиктивной сделки, даже если сделок нет нигде
+    metric_columns = list(_point_metrics(pd.DataFrame({'r_multiple': [0.0]}), min(n_sims, 1)))
+    rows = []
+    for k, point in enumerate(points):
+        metrics = {}
+        if k in groups:
+            metrics = _point_metrics(groups[k].drop(columns='point').reset_index(drop=True), n_sims)
+        rows.append({**point, 'total_trades': 0, **metrics})
+    columns = list(dict.fromkeys([key for point in points for key in point] + metric_columns))
+    return pd.DataFrame(rows, columns=columns)
+
+
+def run_sweep(frames: Dict[str, pd.DataFrame], config: Dict, grid: Dict[str, List],
+              workers: int = 1, model_path: Optional[str] = None, n_sims: int = 1000) -> pd.DataFrame:
+    """
+    Sweeps the grid over every symbol (one symbol per worker task) and
+    returns the results table, rows in expand_grid order.
+    """
+    points = expand_grid(grid)
+    if 'ml_threshold' in grid and not model_path:
+        raise ValueError("ml_threshold in the grid needs a model_path")
+    logger.info(f"Sweeping {len(points)} points over {len(frames)} symbols")
+    per_symbol = run_parallel(sweep_symbol, frames, workers, config=config, points=points, model_path=model_path)
+    return summarize(merge_results(list(per_symbol.values())), points, n_sims)
@@ -1,65 +1,89 @@
+import argparse
 import pandas as pd
 import numpy as np
 import json
 import os
+from typing import Dict, Optional
 from pattern.tas_detector import TASDetector
 from data.storage import DataStorage
 from data.cleaner import DataCleaner
+from data.cache import ResultCache
+from backtest.parallel import run_parallel
+from backtest.intrabar import get_resolver
 
-def run_backtest():
+def simulate_symbol(symbol: str, df: pd.DataFrame, config: dict, intrabar: Optional[str] = None,
+                    data_paths: Optional[Dict[str, str]] = None) -> list:
+    """
+    TAS detection and RR 2.0 exits for one symbol; returns outcomes (-1 / 2).
+    With data_paths indicators and patterns come from the result cache.
+    """
+    detector = TASDetector(config)
+    if data_paths:
+        df, patterns = ResultCache().detect(data_paths[symbol], df, config, detector)
+    else:
+        df = DataCleaner().calculate_indicators(df)
+        # Поиск паттернов
+        patterns = detector.detect_patterns(df)
+    
+    trades = []
+    for p in patterns:
+        entry_idx = p['entry_idx']
+        entry_price = p['entry_price']
+        sl = p['tail_low']
+        risk = entry_price - sl
+        
+        if risk <= 0: continue
+        
+        tp = entry_price + (risk * 2.0) # RR 2.0
+        
+        # Симуляция выхода
+        outcome = 0 # -1 (SL), 2 (TP), 0 (Timeout)
+        end_search = min(entry_idx + 48, len(df) - 1)
+        
+        for i in range(entry_idx + 1, end_search + 1):
+            low = df.iloc[i]['low']
+            high = df.iloc[i]['high']
+            
+            if low <= sl:
+                # Свеча задела и стоп, и цель: порядок смотрим на младшем ТФ
+                both = high >= tp and intrabar is not None
+                if both and get_resolver(intrabar).target_first(symbol, [df.iloc[i]['timestamp']], [sl], [tp])[0]:
+                    outcome = 2
+                else:
+                    outcome = -1
+                break
+            if high >= tp:
+                outcome = 2
+                break
+        
+        if outcome != 0:
+            trades.append(outcome)
+    return trades
+
+def run_backtest(workers: int = 1, intrabar: Optional[str] = None):
     # 1. Настройки
     config_path = 'impulse_fib_trader/config/pattern_spec_tas.json'
     with open(config_path, 'r') as f:
         config = json.load(f)
     
-    detector = TASDetector(config)
-    cleaner = DataCleaner()
-    
     symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BNB/USDT']
     results = []
 
-    print(f"{'Symbol':<10} | {'Trades':<7} | {'Winrate':<8} | {'Profit (R)':<10} | {'PF':<5}")
-    print("-" * 50)
-
+    frames = {}
+    data_paths = {}
     for symbol in symbols:
         data_path = f"data_{symbol.replace('/', '_')}_1h_tas.parquet"
         if not os.path.exists(data_path): continue
-        
-        df = DataStorage.load_from_parquet(data_path)
-        df = cleaner.calculate_indicators(df)
-        
-        # Поиск паттернов
-        patterns = detector.detect_patterns(df)
-        
-        trades = []
-        for p in patterns:
-            entry_idx = p['entry_idx']
-            entry_price = p['entry_price']
-            sl = p['tail_low']
-            risk = entry_price - sl
-            
-            if risk <= 0: continue
-            
-            tp = entry_price + (risk * 2.0) # RR 2.0
-            
-            # Симуляция выхода
-            outcome = 0 # -1 (SL), 2 (TP), 0 (Timeout)
-            end_search = min(entry_idx + 48, len(df) - 1)
-            
-            for i in range(entry_idx + 1, end_search + 1):
-                low = df.iloc[i]['low']
-                high = df.iloc[i]['high']
-                
-                if low <= sl:
-                    outcome = -1
-                    break
-                if high >= tp:
-                    outcome = 2
-                    break
-            
-            if outcome != 0:
-                trades.append(outcome)
-        
+        frames[symbol] = DataStorage.load_from_parquet(data_path)
+        data_paths[symbol] = data_path
+
+    per_symbol = run_parallel(simulate_symbol, frames, workers, config=config, intrabar=intrabar,
+                              data_paths=data_paths)
+
+    print(f"{'Symbol':<10} | {'Trades':<7} | {'Winrate':<8} | {'Profit (R)':<10} | {'PF':<5}")
+    print("-" * 50)
+
+    for symbol, trades in per_symbol.items():
         if not trades: continue
         
         trades_arr = np.array(trades)
@@ -85,4 +109,8 @@ def run_backtest():
         print(f"Profit Factor: {res_arr[res_arr > 0].sum()/abs(res_arr[res_arr < 0].sum()):.2f}")
 
 if __name__ == "__main__":
-    run_backtest()
+    parser = argparse.ArgumentParser(description="TAS_v1 backtest")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (one symbol per task)")
+    parser.add_argument('--intrabar', default=None, help="lower timeframe (e.g. 5m) for bars hitting both SL and TP")
+    args = parser.parse_args()
+    run_backtest(args.workers, args.intrabar)
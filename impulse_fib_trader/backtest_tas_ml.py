@@ -1,82 +1,112 @@
+import argparse
 import pandas as pd
 import numpy as np
 import json
 import os
+from typing import Dict, Optional
 from pattern.tas_detector import TASDetector
 from data.storage import DataStorage
 from data.cleaner import DataCleaner
+from data.cache import ResultCache
 from ml.train import MLTrainer
 from features.engineer import FeatureEngineer
+from backtest.parallel import run_parallel
+from backtest.intrabar import get_resolver
 
-def run_backtest_ml():
+# Модель грузится один раз на процесс-воркер
+_MODELS = {}
+
+def simulate_symbol(symbol: str, df: pd.DataFrame, config: dict, model_path: str, threshold: float = 0.60,
+                    intrabar: Optional[str] = None, data_paths: Optional[Dict[str, str]] = None) -> list:
+    """
+    TAS detection, ML filter and RR 2.0 exits for one symbol; returns outcomes (-1 / 2).
+    With data_paths indicators and patterns come from the result cache, so
+    a rerun with another threshold skips detection.
+    """
+    if model_path not in _MODELS:
+        trainer = MLTrainer()
+        trainer.load_model(model_path)
+        _MODELS[model_path] = trainer.model
+    model = _MODELS[model_path]
+
+    detector = TASDetector(config)
+    if data_paths:
+        df, patterns = ResultCache().detect(data_paths[symbol], df, config, detector)
+    else:
+        df = DataCleaner().calculate_indicators(df)
+        patterns = detector.detect_patterns(df)
+    if not patterns: return []
+    
+    # Получаем предсказания ML для всех паттернов сразу
+    X = FeatureEngineer().extract_features(patterns, df)
+    probs = model.predict_proba(X)
+    
+    trades = []
+    for idx, p in enumerate(patterns):
+        prob = float(probs[idx][1])
+        
+        # Фильтр ML: только сделки с вероятностью > 60%
+        if prob < threshold:
+            continue
+            
+        entry_idx = p['entry_idx']
+        entry_price = p['entry_price']
+        sl = p['tail_low']
+        risk = entry_price - sl
+        if risk <= 0: continue
+        
+        tp = entry_price + (risk * 2.0)
+        
+        outcome = 0
+        end_search = min(entry_idx + 48, len(df) - 1)
+        for i in range(entry_idx + 1, end_search + 1):
+            low = df.iloc[i]['low']
+            high = df.iloc[i]['high']
+            if low <= sl:
+                # Свеча задела и стоп, и цель: порядок смотрим на младшем ТФ
+                both = high >= tp and intrabar is not None
+                if both and get_resolver(intrabar).target_first(symbol, [df.iloc[i]['timestamp']], [sl], [tp])[0]:
+                    outcome = 2
+                else:
+                    outcome = -1
+                break
+            if high >= tp:
+                outcome = 2
+                break
+        
+        if outcome != 0:
+            trades.append(outcome)
+    return trades
+
+def run_backtest_ml(workers: int = 1, intrabar: Optional[str] = None):
     config_path = 'impulse_fib_trader/config/pattern_spec_tas.json'
     with open(config_path, 'r') as f:
         config = json.load(f)
     
-    detector = TASDetector(config)
-    cleaner = DataCleaner()
-    fe = FeatureEngineer()
-    trainer = MLTrainer()
-    
     model_path = 'trained_model_tas.joblib'
-    if os.path.exists(model_path):
-        trainer.load_model(model_path)
-    else:
+    if not os.path.exists(model_path):
         print("Model not found!")
         return
 
     symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BNB/USDT']
     results = []
 
+    frames = {}
+    data_paths = {}
+    for symbol in symbols:
+        data_path = f"data_{symbol.replace('/', '_')}_1h_tas.parquet"
+        if not os.path.exists(data_path): continue
+        frames[symbol] = DataStorage.load_from_parquet(data_path)
+        data_paths[symbol] = data_path
+
+    per_symbol = run_parallel(simulate_symbol, frames, workers, config=config, model_path=model_path,
+                              intrabar=intrabar, data_paths=data_paths)
+
     print(f"--- Бэктест TAS_v1 + ML (Threshold 0.60) ---")
     print(f"{'Symbol':<10} | {'Trades':<7} | {'Winrate':<8} | {'Profit (R)':<10} | {'PF':<5}")
     print("-" * 55)
 
-    for symbol in symbols:
-        data_path = f"data_{symbol.replace('/', '_')}_1h_tas.parquet"
-        if not os.path.exists(data_path): continue
-        
-        df = DataStorage.load_from_parquet(data_path)
-        df = cleaner.calculate_indicators(df)
-        
-        patterns = detector.detect_patterns(df)
-        if not patterns: continue
-        
-        # Получаем предсказания ML для всех паттернов сразу
-        X = fe.extract_features(patterns, df)
-        probs = trainer.model.predict_proba(X)
-        
-        trades = []
-        for idx, p in enumerate(patterns):
-            prob = float(probs[idx][1])
-            
-            # Фильтр ML: только сделки с вероятностью > 60%
-            if prob < 0.60:
-                continue
-                
-            entry_idx = p['entry_idx']
-            entry_price = p['entry_price']
-            sl = p['tail_low']
-            risk = entry_price - sl
-            if risk <= 0: continue
-            
-            tp = entry_price + (risk * 2.0)
-            
-            outcome = 0
-            end_search = min(entry_idx + 48, len(df) - 1)
-            for i in range(entry_idx + 1, end_search + 1):
-                low = df.iloc[i]['low']
-                high = df.iloc[i]['high']
-                if low <= sl:
-                    outcome = -1
-                    break
-                if high >= tp:
-                    outcome = 2
-                    break
-            
-            if outcome != 0:
-                trades.append(outcome)
-        
+    for symbol, trades in per_symbol.items():
         if not trades: continue
         
         trades_arr = np.array(trades)
@@ -100,4 +130,8 @@ def run_backtest_ml():
         print(f"Profit Factor: {res_arr[res_arr > 0].sum()/abs(res_arr[res_arr < 0].sum()):.2f}")
 
 if __name__ == "__main__":
-    run_backtest_ml()
+    parser = argparse.ArgumentParser(description="TAS_v1 + ML backtest")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (one symbol per task)")
+    parser.add_argument('--intrabar', default=None, help="lower timeframe (e.g. 5m) for bars hitting both SL and TP")
+    args = parser.parse_args()
+    run_backtest_ml(args.workers, args.intrabar)
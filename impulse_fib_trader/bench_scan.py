@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import tempfile
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from data.fetcher import DataFetcher, AsyncDataFetcher
+from data.cleaner import DataCleaner
+from data.storage import DataStorage
+
+HOUR_MS = 3600 * 1000
+
+
+class MockExchange:
+    """
+    Local stand-in for a ccxt exchange: fixed network latency per request and
+    one shared rate-limit budget (minimum spacing between request starts).
+    """
+    def __init__(self, n_symbols: int, latency: float, rate_limit_ms: int):
+        self.symbols = [f"SYM{i}/USDT" for i in range(n_symbols)]
+        self.latency = latency
+        self.rateLimit = rate_limit_ms
+        self.requests = 0
+        self.rows = 0
+        self._next_slot = 0.0
+
+    def _reserve_slot(self) -> float:
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.rateLimit / 1000
+        self.requests += 1
+        return slot - now
+
+    def _candles(self, symbol: str, since: int, limit: int) -> list:
+        now = int(time.time() * 1000)
+        start = since - since % HOUR_MS + (HOUR_MS if since % HOUR_MS else 0)
+        stamps = np.arange(start, now, HOUR_MS)[:limit]
+        rng = np.random.default_rng(abs(hash(symbol)) % (2 ** 32))
+        close = 100 + np.cumsum(rng.normal(0, 1, len(stamps)))
+        open_ = np.r_[close[0], close[:-1]]
+        high = np.maximum(open_, close) + 0.5
+        low = np.minimum(open_, close) - 0.5
+        self.rows += len(stamps)
+        return [[int(t), o, h, l, c, 1000.0] for t, o, h, l, c in zip(stamps, open_, high, low, close)]
+
+    def load_markets(self):
+        return {}
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit=1000):
+        time.sleep(self._reserve_slot() + self.latency)
+        return self._candles(symbol, since, limit)
+
+
+class AsyncMockExchange(MockExchange):
+    async def load_markets(self):
+        return {}
+
+    async def fetch_ohlcv(self, symbol, timeframe, since, limit=1000):
+        await asyncio.sleep(self._reserve_slot() + self.latency)
+        return self._candles(symbol, since, limit)
+
+    async def close(self):
+        pass
+
+
+def scan_sequential(args, start_date: str) -> float:
+    fetcher = DataFetcher()
+    fetcher.exchange = MockExchange(args.symbols, args.latency, args.rate_limit)
+    cleaner = DataCleaner()
+
+    t0 = time.perf_counter()
+    for symbol in fetcher.get_active_symbols():
+        df = fetcher.fetch_ohlcv(symbol, '1h', start_date)
+        cleaner.calculate_indicators(df)
+    return time.perf_counter() - t0
+
+
+async def scan_concurrent(args, start_date: str, concurrency: int) -> float:
+    fetcher = AsyncDataFetcher(max_concurrency=concurrency,
+                               exchange=AsyncMockExchange(args.symbols, args.latency, args.rate_limit))
+    cleaner = DataCleaner()
+
+    t0 = time.perf_counter()
+    symbols = await fetcher.get_active_symbols()
+    async for symbol, df in fetcher.stream_ohlcv(symbols, '1h', start_date):
+        cleaner.calculate_indicators(df)
+    await fetcher.close()
+    return time.perf_counter() - t0
+
+
+async def scan_incremental(args, start_date: str, store: DataStorage, exchange: AsyncMockExchange) -> float:
+    fetcher = AsyncDataFetcher(max_concurrency=max(args.concurrency), exchange=exchange)
+    cleaner = DataCleaner()
+
+    t0 = time.perf_counter()
+    symbols = await fetcher.get_active_symbols()
+    since = {s: store.next_since(s, '1h') for s in symbols}
+    async for symbol, fresh in fetcher.stream_ohlcv(symbols, '1h', start_date, since=since):
+        df = store.update_tail(symbol, '1h', fresh, 5 * 24)
+        cleaner.calculate_indicators(df)
+    await fetcher.close()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-universe scan wall time against a local mock exchange")
+    parser.add_argument('--symbols', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per request")
+    parser.add_argument('--rate-limit', type=int, default=5, help="ms between request starts")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[5, 20, 50])
+    args = parser.parse_args()
+
+    start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
+
+    seq = scan_sequential(args, start_date)
+    print(f"{'mode':<16} | {'wall (s)':<9} | speedup")
+    print("-" * 40)
+    print(f"{'sequential':<16} | {seq:<9.2f} | 1.0x")
+    for c in args.concurrency:
+        t = asyncio.run(scan_concurrent(args, start_date, c))
+        print(f"{'async x' + str(c):<16} | {t:<9.2f} | {seq / t:.1f}x")
+
+    # Свечной стор: первый скан заполняет диск, следующий качает только новые бары
+    with tempfile.TemporaryDirectory() as root:
+        store = DataStorage(root)
+        cold = AsyncMockExchange(args.symbols, args.latency, args.rate_limit)
+        t_cold = asyncio.run(scan_incremental(args, start_date, store, cold))
+        warm = AsyncMockExchange(args.symbols, args.latency, args.rate_limit)
+        t_warm = asyncio.run(scan_incremental(args, start_date, store, warm))
+    print("-" * 40)
+    print(f"{'store cold':<16} | {t_cold:<9.2f} | rows fetched: {cold.rows}")
+    print(f"{'store warm':<16} | {t_warm:<9.2f} | rows fetched: {warm.rows} "
+          f"({1 - warm.rows / cold.rows:.1%} less)")
+
+
+if __name__ == "__main__":
+    main()
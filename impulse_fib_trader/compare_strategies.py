@@ -1,51 +1,66 @@
+import argparse
 import logging
 import json
 import pandas as pd
 import os
 from data.storage import DataStorage
+from data.cache import ResultCache
 from pattern.detector import PatternDetector
 from backtest.engine import BacktestEngine
 from backtest.metrics import MetricsCalculator
+from backtest.parallel import run_parallel, merge_results
+from backtest.portfolio import PortfolioSimulator
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_comparison():
-    symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']
-    timeframe = '1h'
-    config_path = 'config/pattern_spec.json'
-    
+def backtest_symbol(symbol: str, df: pd.DataFrame, config_path: str, data_paths: dict = None):
+    """
+    Detection plus both entry modes for one symbol (runs inside a worker).
+    With data_paths the patterns come from the result cache.
+    """
     with open(config_path, 'r') as f:
         config = json.load(f)
-        
     detector = PatternDetector(config_path)
     bt_engine = BacktestEngine(config)
-    metrics_calc = MetricsCalculator()
+
+    if data_paths:
+        _, patterns = ResultCache().detect(data_paths[symbol], df, config, detector, with_indicators=False)
+    else:
+        patterns = detector.detect_patterns(df)
+    res_breakout = bt_engine.run_backtest(patterns, df, entry_mode='BREAKOUT')
+    res_limit = bt_engine.run_backtest(patterns, df, entry_mode='LIMIT')
+    return res_breakout, res_limit
+
+def run_comparison(workers: int = 1):
+    symbols = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']
+    timeframe = '1h'
+    config_path = 'config/pattern_spec.json'
     
-    all_results_breakout = []
-    all_results_limit = []
+    metrics_calc = MetricsCalculator()
     
+    frames = {}
+    data_paths = {}
     for symbol in symbols:
         data_path = f"data_{symbol.replace('/', '_')}_{timeframe}.parquet"
         if not os.path.exists(data_path):
             logger.warning(f"Data for {symbol} not found. Skipping.")
             continue
             
-        df = DataStorage.load_from_parquet(data_path)
-        patterns = detector.detect_patterns(df)
-        
-        res_breakout = bt_engine.run_backtest(patterns, df, entry_mode='BREAKOUT')
-        all_results_breakout.append(res_breakout)
+        frames[symbol] = DataStorage.load_from_parquet(data_path)
+        data_paths[symbol] = data_path
         
-        res_limit = bt_engine.run_backtest(patterns, df, entry_mode='LIMIT')
-        all_results_limit.append(res_limit)
+    # Каждая пара считается в своем процессе, результаты собираются в порядке symbols
+    results = run_parallel(backtest_symbol, frames, workers, config_path=config_path, data_paths=data_paths)
+    all_results_breakout = [r[0] for r in results.values()]
+    all_results_limit = [r[1] for r in results.values()]
         
     if not all_results_breakout:
         print("No data found to compare. Please run main.py first.")
         return
 
-    df_breakout = pd.concat(all_results_breakout)
-    df_limit = pd.concat(all_results_limit)
+    df_breakout = merge_results(all_results_breakout)
+    df_limit = merge_results(all_results_limit)
     
     metrics_breakout = metrics_calc.calculate(df_breakout)
     metrics_limit = metrics_calc.calculate(df_limit)
@@ -59,7 +74,25 @@ def run_comparison():
         v1 = f"{metrics_breakout[key]:.3f}" if isinstance(metrics_breakout[key], float) else str(metrics_breakout[key])
         v2 = f"{metrics_limit[key]:.3f}" if isinstance(metrics_limit[key], float) else str(metrics_limit[key])
         print(f"{key:<20} | {v1:<15} | {v2:<15}")
+    # 95% интервалы по 10k бутстреп-выборкам сделок
+    ci_breakout = metrics_calc.confidence(df_breakout)
+    ci_limit = metrics_calc.confidence(df_limit)
+    for key in ['expectancy_ci', 'net_profit_r_ci', 'max_drawdown_ci']:
+        v1, v2 = (f"[{ci[key][0]:.2f}, {ci[key][1]:.2f}]" if key in ci else '-' for ci in (ci_breakout, ci_limit))
+        print(f"{key:<20} | {v1:<15} | {v2:<15}")
+    v1, v2 = (f"{ci['risk_of_ruin']:.3f}" if ci else '-' for ci in (ci_breakout, ci_limit))
+    print(f"{'risk_of_ruin':<20} | {v1:<15} | {v2:<15}")
     print("="*60)
 
+    # Один счет по правилам бота: одна позиция на пару, кулдаун 4ч, лучший сетап за скан
+    for mode, per_symbol in (('BREAKOUT', all_results_breakout), ('LIMIT', all_results_limit)):
+        sim = PortfolioSimulator()
+        taken = sim.run(dict(zip(results, per_symbol)))
+        print(f"PORTFOLIO {mode}: {len(taken)} trades, capital {sim.capital:.2f} -> {sim.final_capital:.2f}, "
+              f"skipped {dict(sim.rejected)}")
+
 if __name__ == "__main__":
-    run_comparison()
+    parser = argparse.ArgumentParser(description="BREAKOUT vs LIMIT entry comparison")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (one symbol per task)")
+    args = parser.parse_args()
+    run_comparison(args.workers)
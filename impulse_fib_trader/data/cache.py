@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import pandas as pd
+from typing import Callable, Dict, Tuple
+from data.cleaner import DataCleaner
+from pattern.records import PatternTable
+
+logger = logging.getLogger(__name__)
+
+# Хэши файлов в пределах процесса: (путь, размер, mtime) -> sha256
+_DIGESTS: Dict[Tuple, str] = {}
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's contents, rehashed only when its size or mtime changes."""
+    stat = os.stat(path)
+    marker = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if marker not in _DIGESTS:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        _DIGESTS[marker] = h.hexdigest()
+    return _DIGESTS[marker]
+
+
+class ResultCache:
+    """
+    Content-addressed cache of indicator frames and detected pattern tables.
+
+    Layout: <root>/<kind>/<key>.parquet. A key hashes everything the result
+    depends on (candle file contents, config JSON, detector and indicator
+    VERSION), so changed inputs simply miss and nothing has to be
+    invalidated by hand. Parameters that act after detection (ML threshold,
+    RR) are not part of the key, so changing them reuses the patterns.
+    """
+    def __init__(self, root_dir: str = 'cache'):
+        self.root = pathlib.Path(root_dir)
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+    def indicator_key(self, data_path: str) -> str:
+        return self.key('indicators', file_digest(data_path), DataCleaner.VERSION)
+
+    def pattern_key(self, data_path: str, config: Dict, detector, with_indicators: bool = True) -> str:
+        # Без пересчета индикаторов паттерны зависят от индикаторов, сохраненных в файле
+        indicators = DataCleaner.VERSION if with_indicators else 'stored'
+        return self.key('patterns', file_digest(data_path), config,
+                        type(detector).__name__, detector.VERSION, indicators)
+
+    def _path(self, kind: str, key: str) -> pathlib.Path:
+        return self.root / kind / f"{key}.parquet"
+
+    def frame(self, kind: str, key: str, compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Stored frame for key, or compute() stored under it."""
+        path = self._path(kind, key)
+        if path.exists():
+            return pd.read_parquet(path)
+        df = compute()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Запись через временный файл: параллельные воркеры не читают недописанное
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        logger.debug(f"Cached {kind} {key}")
+        return df
+
+    def table(self, kind: str, key: str, compute: Callable[[], PatternTable]) -> PatternTable:
+        """Like frame() for a PatternTable."""
+        computed = []
+
+        def compute_frame():
+            computed.append(compute())
+            return computed[0].to_frame()
+
+        df = self.frame(kind, key, compute_frame)
+        return computed[0] if computed else PatternTable.from_frame(df)
+
+    def indicators(self, data_path: str, df: pd.DataFrame) -> pd.DataFrame:
+        """calculate_indicators(df) for df loaded from data_path, once per file version."""
+        return self.frame('indicators', self.indicator_key(data_path),
+                          lambda: DataCleaner.calculate_indicators(df))
+
+    def detect(self, data_path: str, df: pd.DataFrame, config: Dict, detector,
+               with_indicators: bool = True) -> Tuple[pd.DataFrame, PatternTable]:
+        """
+        Indicators (optional) and detector.detect_patterns for a candle file,
+        each taken from the cache while the file, config and versions are unchanged.
+        """
+        if with_indicators:
+            df = self.indicators(data_path, df)
+        patterns = self.table('patterns', self.pattern_key(data_path, config, detector, with_indicators),
+                              lambda: PatternTable.from_records(detector.detect_patterns(df)))
+        return df, patterns
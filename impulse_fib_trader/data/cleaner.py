@@ -1,8 +1,13 @@
 import pandas as pd
 import numpy as np
-from typing import Tuple
+import math
+from collections import deque
+from typing import Tuple, Dict
 
 class DataCleaner:
+    # Меняется вместе с формулами индикаторов: сбрасывает кэш (data/cache.py)
+    VERSION = 1
+
     @staticmethod
     def validate_data(df: pd.DataFrame) -> pd.DataFrame:
         if df.empty: return df
@@ -43,3 +48,207 @@ class DataCleaner:
         df['swing_high'] = df['high'][(df['high'] == df['high'].rolling(2*window+1, center=True).max())]
         df['swing_low'] = df['low'][(df['low'] == df['low'].rolling(2*window+1, center=True).min())]
         return df
+
+
+INDICATOR_COLUMNS = ['atr', 'ema_20', 'ema_50', 'ema_200', 'rsi']
+
+
+class _RollingMean:
+    """
+    Fixed-window mean with the same add/remove Kahan bookkeeping as pandas'
+    rolling().mean(), so the streamed values equal the batch ones bit for bit.
+    """
+    __slots__ = ('window', 'values', 'nobs', 'sum_x', 'neg_ct', 'comp_add', 'comp_remove',
+                 'same_count', 'prev_value')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_count = 0
+        self.prev_value = None
+
+    def push(self, val: float, commit: bool = True) -> float:
+        nobs, sum_x, neg_ct = self.nobs, self.sum_x, self.neg_ct
+        comp_add, comp_remove = self.comp_add, self.comp_remove
+        same_count = self.same_count
+        prev_value = val if self.prev_value is None else self.prev_value
+
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if old == old:
+                nobs -= 1
+                y = -old - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if math.copysign(1.0, old) < 0:
+                    neg_ct -= 1
+
+        if val == val:
+            nobs += 1
+            y = val - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if math.copysign(1.0, val) < 0:
+                neg_ct += 1
+            same_count = same_count + 1 if val == prev_value else 1
+            prev_value = val
+
+        if nobs >= self.window and nobs > 0:
+            result = sum_x / nobs
+            if same_count >= nobs:
+                result = prev_value
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+        else:
+            result = np.nan
+
+        if commit:
+            if len(self.values) == self.window:
+                self.values.popleft()
+            self.values.append(val)
+            self.nobs, self.sum_x, self.neg_ct = nobs, sum_x, neg_ct
+            self.comp_add, self.comp_remove = comp_add, comp_remove
+            self.same_count, self.prev_value = same_count, prev_value
+        return result
+
+
+class _Ema:
+    """Recursive EMA matching pandas' ewm(span, adjust=False).mean()."""
+    __slots__ = ('alpha', 'weighted')
+
+    def __init__(self, span: int):
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self.weighted = np.nan
+
+    def push(self, val: float, commit: bool = True) -> float:
+        weighted = self.weighted
+        if weighted == weighted:
+            if val == val:
+                old_wt = 1.0 - self.alpha
+                if weighted != val:
+                    weighted = old_wt * weighted + self.alpha * val
+                    weighted /= old_wt + self.alpha
+        elif val == val:
+            weighted = val
+
+        if commit:
+            self.weighted = weighted
+        return weighted
+
+
+class _IndicatorState:
+    __slots__ = ('last_ts', 'prev_close', 'tr', 'gain', 'loss', 'emas', 'history', 'max_history')
+
+    def __init__(self, atr_period: int, history: int):
+        self.last_ts = None
+        self.prev_close = np.nan
+        self.tr = _RollingMean(atr_period)
+        self.gain = _RollingMean(14)
+        self.loss = _RollingMean(14)
+        self.emas = {span: _Ema(span) for span in IndicatorEngine.EMA_SPANS}
+        self.history: Dict = {} # timestamp -> indicator values, oldest first
+        self.max_history = history
+
+
+class IndicatorEngine:
+    """
+    Streaming counterpart of DataCleaner.calculate_indicators.
+
+    Keeps per-symbol running state (EMA values, the rolling TR window and the
+    RSI gain/loss windows), so every new closed candle costs O(1). Values are
+    identical to the batch path computed over the same history.
+    """
+    EMA_SPANS = (20, 50, 200)
+
+    def __init__(self, atr_period: int = 14, max_history: int = 1000):
+        self.atr_period = atr_period
+        self.max_history = max_history
+        self._states: Dict[str, _IndicatorState] = {}
+
+    def reset(self, symbol: str):
+        self._states.pop(symbol, None)
+
+    def last_timestamp(self, symbol: str):
+        state = self._states.get(symbol)
+        return state.last_ts if state else None
+
+    def update(self, symbol: str, candle, commit: bool = True) -> Dict[str, float]:
+        """
+        Feeds one candle (mapping with timestamp/high/low/close). With
+        commit=False the state is left untouched, e.g. for a forming bar.
+        """
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = _IndicatorState(self.atr_period, self.max_history)
+
+        high, low, close = float(candle['high']), float(candle['low']), float(candle['close'])
+        prev_close = state.prev_close
+
+        # ATR: первый бар без предыдущего close берет только high - low
+        ranges = [r for r in (high - low, abs(high - prev_close), abs(low - prev_close)) if r == r]
+        true_range = max(ranges) if ranges else np.nan
+
+        # RSI: как в batch, NaN-дельта первого бара превращается в 0
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+
+        values = {'atr': state.tr.push(true_range, commit)}
+        for span, ema in state.emas.items():
+            values[f'ema_{span}'] = ema.push(close, commit)
+
+        avg_gain = np.float64(state.gain.push(gain, commit))
+        avg_loss = np.float64(state.loss.push(loss, commit))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            values['rsi'] = float(100 - (100 / (1 + rs)))
+
+        if commit:
+            state.prev_close = close
+            state.last_ts = candle['timestamp']
+            state.history[candle['timestamp']] = values
+            if len(state.history) > state.max_history:
+                del state.history[next(iter(state.history))]
+        return values
+
+    def apply(self, symbol: str, df: pd.DataFrame, forming_last: bool = False) -> pd.DataFrame:
+        """
+        Adds indicator columns to a tail window, feeding only the rows newer
+        than the symbol's state. If the window does not continue the stored
+        state (first call, gap), the state is rebuilt from this window.
+        With forming_last the last row is evaluated but not committed.
+        """
+        if df.empty: return df
+
+        closed = len(df) - 1 if forming_last else len(df)
+        ts_col = df['timestamp']
+        state = self._states.get(symbol)
+        if state is None or not (ts_col.iloc[:closed] == state.last_ts).any():
+            # История должна вместить все окно, иначе ранние строки потеряются
+            self._states[symbol] = _IndicatorState(self.atr_period, max(self.max_history, closed))
+            new_rows = np.arange(closed)
+        else:
+            new_rows = np.flatnonzero((ts_col.iloc[:closed] > state.last_ts).values)
+
+        cols = df[['timestamp', 'high', 'low', 'close']]
+        for row in cols.iloc[new_rows].to_dict('records'):
+            self.update(symbol, row)
+
+        history = self._states[symbol].history
+        rows = [history.get(ts, {}) for ts in ts_col.iloc[:closed]]
+        if forming_last:
+            rows.append(self.update(symbol, cols.iloc[-1].to_dict(), commit=False))
+
+        df = df.copy()
+        for col in INDICATOR_COLUMNS:
+            df[col] = [r.get(col, np.nan) for r in rows]
+        return df
@@ -1,15 +1,58 @@
+import asyncio
 import ccxt
+import ccxt.async_support as ccxt_async
 import pandas as pd
 import time
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple, AsyncIterator
 import logging
 
 logger = logging.getLogger(__name__)
 
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def _filter_symbols(symbols: List[str]) -> List[str]:
+    """Keeps USDT spot pairs, excluding leveraged tokens."""
+    result = []
+    for s in symbols:
+        # Берем только пары к USDT
+        if '/USDT' in s and ':' not in s:
+            # Исключаем токены с плечом (UP, DOWN, BULL, BEAR)
+            base = s.split('/')[0]
+            if not any(suffix in base for suffix in ['UP', 'DOWN', 'BULL', 'BEAR']):
+                result.append(s)
+    return result
+
+
+def _date_range(start_date: str, end_date: Optional[str] = None) -> Tuple[int, int]:
+    since = ccxt.Exchange.parse8601(f"{start_date}T00:00:00Z")
+    limit_end = ccxt.Exchange.parse8601(f"{end_date}T23:59:59Z") if end_date else ccxt.Exchange.milliseconds()
+    return since, limit_end
+
+
+def _page_limit(timeframe: str, since: int, limit_end: int) -> int:
+    # Маленький limit дешевле по весу запроса, поэтому не просим больше, чем ждем
+    expected = (limit_end - since) // (ccxt.Exchange.parse_timeframe(timeframe) * 1000) + 2
+    return int(max(1, min(1000, expected)))
+
+
+def _to_frame(all_ohlcv: List[list], until: Optional[int] = None) -> pd.DataFrame:
+    if not all_ohlcv:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(all_ohlcv, columns=OHLCV_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+
+    if until is not None:
+        df = df[df['timestamp'] <= pd.to_datetime(until, unit='ms')]
+
+    return df
+
+
 class DataFetcher:
-    def __init__(self, exchange_id: str = 'binance'):
-        self.exchange = getattr(ccxt, exchange_id)({
+    def __init__(self, exchange_id: str = 'binance', exchange=None):
+        self.exchange = exchange or getattr(ccxt, exchange_id)({
             'enableRateLimit': True,
             'options': {'defaultType': 'spot'} # Переключаем на спот
         })
@@ -17,37 +60,36 @@ class DataFetcher:
     def get_active_symbols(self) -> List[str]:
         """Fetches all active USDT spot symbols, excluding leveraged tokens."""
         self.exchange.load_markets()
-        symbols = []
-        for s in self.exchange.symbols:
-            # Берем только пары к USDT
-            if '/USDT' in s and ':' not in s:
-                # Исключаем токены с плечом (UP, DOWN, BULL, BEAR)
-                base = s.split('/')[0]
-                if not any(suffix in base for suffix in ['UP', 'DOWN', 'BULL', 'BEAR']):
-                    symbols.append(s)
-        return symbols
+        return _filter_symbols(self.exchange.symbols)
 
     def fetch_ohlcv(self, symbol: str, timeframe: str, start_date: str, end_date: Optional[str] = None) -> pd.DataFrame:
         """
         Fetches OHLCV data from the exchange.
         """
-        since = self.exchange.parse8601(f"{start_date}T00:00:00Z")
-        limit_end = self.exchange.parse8601(f"{end_date}T23:59:59Z") if end_date else self.exchange.milliseconds()
-        
+        since, limit_end = _date_range(start_date, end_date)
+        return self.fetch_range(symbol, timeframe, since, limit_end if end_date else None)
+
+    def fetch_range(self, symbol: str, timeframe: str, since: int, until: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fetches bars opened in [since, until] (ms); until defaults to now.
+        """
+        limit_end = until if until is not None else ccxt.Exchange.milliseconds()
+        page_limit = _page_limit(timeframe, since, limit_end)
+
         all_ohlcv = []
         current_since = since
         
         retry_count = 0
         while current_since < limit_end and retry_count < 3:
             try:
-                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, current_since, limit=1000)
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, current_since, limit=page_limit)
                 if not ohlcv:
                     break
                 
                 all_ohlcv.extend(ohlcv)
                 current_since = ohlcv[-1][0] + 1
                 
-                if len(ohlcv) < 1000:
+                if len(ohlcv) < page_limit:
                     break
                 
                 time.sleep(self.exchange.rateLimit / 1000)
@@ -58,13 +100,92 @@ class DataFetcher:
                 time.sleep(1)
                 continue
                 
-        if not all_ohlcv:
-            return pd.DataFrame()
+        return _to_frame(all_ohlcv, until)
 
-        df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        
-        if end_date:
-            df = df[df['timestamp'] <= pd.to_datetime(limit_end, unit='ms')]
-            
-        return df
+
+class AsyncDataFetcher:
+    """
+    Concurrent OHLCV fetcher on top of ccxt.async_support.
+
+    Every request goes through a single exchange instance, so ccxt's throttler
+    keeps one rate-limit budget for all symbols in flight; `max_concurrency`
+    additionally caps the number of open requests.
+    """
+    def __init__(self, exchange_id: str = 'binance', max_concurrency: int = 20, exchange=None):
+        self.exchange = exchange or getattr(ccxt_async, exchange_id)({
+            'enableRateLimit': True,
+            'options': {'defaultType': 'spot'}
+        })
+        self.max_concurrency = max_concurrency
+
+    async def get_active_symbols(self) -> List[str]:
+        """Fetches all active USDT spot symbols, excluding leveraged tokens."""
+        await self.exchange.load_markets()
+        return _filter_symbols(self.exchange.symbols)
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, start_date: str, end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        Fetches OHLCV data for one symbol. Pacing is left to the exchange throttler.
+        """
+        since, limit_end = _date_range(start_date, end_date)
+        return await self.fetch_range(symbol, timeframe, since, limit_end if end_date else None)
+
+    async def fetch_range(self, symbol: str, timeframe: str, since: int, until: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fetches bars opened in [since, until] (ms); until defaults to now.
+        """
+        limit_end = until if until is not None else ccxt.Exchange.milliseconds()
+        page_limit = _page_limit(timeframe, since, limit_end)
+
+        all_ohlcv = []
+        current_since = since
+
+        retry_count = 0
+        while current_since < limit_end and retry_count < 3:
+            try:
+                ohlcv = await self.exchange.fetch_ohlcv(symbol, timeframe, current_since, limit=page_limit)
+                if not ohlcv:
+                    break
+
+                all_ohlcv.extend(ohlcv)
+                current_since = ohlcv[-1][0] + 1
+
+                if len(ohlcv) < page_limit:
+                    break
+
+            except Exception as e:
+                logger.debug(f"Error fetching {symbol}: {e}")
+                retry_count += 1
+                await asyncio.sleep(1)
+                continue
+
+        return _to_frame(all_ohlcv, until)
+
+    async def stream_ohlcv(self, symbols: List[str], timeframe: str, start_date: str,
+                           end_date: Optional[str] = None,
+                           since: Optional[Dict[str, int]] = None) -> AsyncIterator[Tuple[str, pd.DataFrame]]:
+        """
+        Fetches many symbols at once and yields (symbol, DataFrame) in completion order.
+        `since` maps symbols to a start timestamp (ms) that overrides start_date,
+        e.g. the next bar after what is already in the candle store.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        since = since or {}
+
+        async def _fetch_one(symbol: str) -> Tuple[str, pd.DataFrame]:
+            async with semaphore:
+                if since.get(symbol) is not None:
+                    return symbol, await self.fetch_range(symbol, timeframe, since[symbol])
+                return symbol, await self.fetch_ohlcv(symbol, timeframe, start_date, end_date)
+
+        tasks = [asyncio.ensure_future(_fetch_one(s)) for s in symbols]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Если потребитель прервал цикл, не оставляем висящих запросов
+            for task in tasks:
+                task.cancel()
+
+    async def close(self):
+        await self.exchange.close()
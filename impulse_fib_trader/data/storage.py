@@ -1,7 +1,46 @@
 import pandas as pd
 import pathlib
+import json
+import os
+import time
+from typing import Optional, Dict, List, Tuple
+
+TIMEFRAME_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def timeframe_ms(timeframe: str) -> int:
+    """'1h' -> 3600000."""
+    return int(timeframe[:-1]) * TIMEFRAME_SECONDS[timeframe[-1]] * 1000
+
+
+def last_bar_forming(df: pd.DataFrame, timeframe: str, now_ms: Optional[int] = None) -> bool:
+    """True if the last row of df is a candle that has not closed yet."""
+    if df.empty:
+        return False
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    last_open = int(pd.Timestamp(df['timestamp'].iloc[-1]).value // 10**6)
+    return last_open + timeframe_ms(timeframe) > now_ms
+
 
 class DataStorage:
+    """
+    Parquet helpers plus an append-only candle store.
+
+    Layout: <root>/<timeframe>/<BASE_QUOTE>/part-<first_ts>.parquet with a
+    manifest.json that records the parts and the last stored (closed) bar.
+    Only closed candles are persisted; the bar that is still forming is
+    returned to the caller but never written.
+
+    Sparse windows of a series (e.g. 1m candles inside a few 1h bars) are
+    kept separately under the manifest's 'ranges' and never mix with the
+    append-only parts.
+    """
+    MAX_PARTS = 48 # После этого части сливаются в одну
+
+    def __init__(self, root_dir: str = 'candles'):
+        self.root = pathlib.Path(root_dir)
+
     @staticmethod
     def save_to_parquet(df: pd.DataFrame, file_path: str):
         """Saves DataFrame to Parquet."""
@@ -11,3 +50,170 @@ class DataStorage:
     def load_from_parquet(file_path: str) -> pd.DataFrame:
         """Loads DataFrame from Parquet."""
         return pd.read_parquet(file_path)
+
+    def _dir(self, symbol: str, timeframe: str) -> pathlib.Path:
+        return self.root / timeframe / symbol.replace('/', '_').replace(':', '_')
+
+    def _read_manifest(self, symbol: str, timeframe: str) -> Dict:
+        path = self._dir(symbol, timeframe) / 'manifest.json'
+        if not path.exists():
+            return {'last_ts': None, 'parts': []}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self, symbol: str, timeframe: str, manifest: Dict):
+        path = self._dir(symbol, timeframe) / 'manifest.json'
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Open time (ms) of the last stored closed bar, or None if nothing is stored."""
+        return self._read_manifest(symbol, timeframe)['last_ts']
+
+    def next_since(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Timestamp (ms) to fetch from so that only unseen bars are requested."""
+        last_ts = self.last_timestamp(symbol, timeframe)
+        return last_ts + 1 if last_ts is not None else None
+
+    def append(self, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        """
+        Appends bars newer than the last stored one as a new part file.
+        Returns the number of rows written.
+        """
+        manifest = self._read_manifest(symbol, timeframe)
+        if df.empty:
+            return 0
+
+        ts = df['timestamp'].astype('datetime64[ms]').astype('int64')
+        if manifest['last_ts'] is not None:
+            df = df[(ts > manifest['last_ts']).values]
+            ts = ts[ts > manifest['last_ts']]
+        if df.empty:
+            return 0
+
+        first, last = int(ts.iloc[0]), int(ts.iloc[-1])
+        directory = self._dir(symbol, timeframe)
+        directory.mkdir(parents=True, exist_ok=True)
+        file_name = f"part-{first}.parquet"
+        df.to_parquet(directory / file_name, index=False)
+
+        manifest['parts'].append({'file': file_name, 'first': first, 'last': last, 'rows': len(df)})
+        manifest['last_ts'] = last
+        self._write_manifest(symbol, timeframe, manifest)
+
+        if len(manifest['parts']) > self.MAX_PARTS:
+            self.compact(symbol, timeframe)
+        return len(df)
+
+    def compact(self, symbol: str, timeframe: str):
+        """Merges all parts of a series into a single file."""
+        manifest = self._read_manifest(symbol, timeframe)
+        if len(manifest['parts']) < 2:
+            return
+
+        directory = self._dir(symbol, timeframe)
+        df = self.load(symbol, timeframe)
+        first = manifest['parts'][0]['first']
+        file_name = f"part-{first}.parquet"
+        tmp = directory / (file_name + '.tmp')
+        df.to_parquet(tmp, index=False)
+
+        old_files = [p['file'] for p in manifest['parts']]
+        os.replace(tmp, directory / file_name)
+        manifest['parts'] = [{'file': file_name, 'first': first, 'last': manifest['last_ts'], 'rows': len(df)}]
+        self._write_manifest(symbol, timeframe, manifest)
+        for name in old_files:
+            if name != file_name:
+                (directory / name).unlink(missing_ok=True)
+
+    def load(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        """Loads the full stored history of a series."""
+        manifest = self._read_manifest(symbol, timeframe)
+        directory = self._dir(symbol, timeframe)
+        frames = [pd.read_parquet(directory / p['file']) for p in manifest['parts']]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def cached_ranges(self, symbol: str, timeframe: str) -> List[Tuple[int, int]]:
+        """[first, last] (ms) windows already stored with append_ranges."""
+        return [(r['first'], r['last']) for r in self._read_manifest(symbol, timeframe).get('ranges', [])]
+
+    def append_ranges(self, symbol: str, timeframe: str, df: pd.DataFrame, ranges: List[Tuple[int, int]]):
+        """
+        Stores the candles of several [first, last] windows as one file and
+        marks the windows as cached, even those the exchange had no data for.
+        """
+        if not ranges:
+            return
+        manifest = self._read_manifest(symbol, timeframe)
+        directory = self._dir(symbol, timeframe)
+        directory.mkdir(parents=True, exist_ok=True)
+        file_name = None
+        if not df.empty:
+            file_name = f"range-{min(r[0] for r in ranges)}-{len(manifest.get('ranges', []))}.parquet"
+            df.to_parquet(directory / file_name, index=False)
+        manifest.setdefault('ranges', []).extend({'file': file_name, 'first': int(first), 'last': int(last)}
+                                                 for first, last in ranges)
+        self._write_manifest(symbol, timeframe, manifest)
+
+    def load_ranges(self, symbol: str, timeframe: str, first: int, last: int) -> pd.DataFrame:
+        """Cached window candles opened in [first, last] (ms); only overlapping files are read."""
+        manifest = self._read_manifest(symbol, timeframe)
+        directory = self._dir(symbol, timeframe)
+        files = []
+        for r in manifest.get('ranges', []):
+            if r['file'] and r['first'] <= last and r['last'] >= first and r['file'] not in files:
+                files.append(r['file'])
+        if not files:
+            return pd.DataFrame()
+        df = pd.concat([pd.read_parquet(directory / f) for f in files], ignore_index=True)
+        ts = df['timestamp'].astype('datetime64[ms]').astype('int64')
+        df = df[((ts >= first) & (ts <= last)).values]
+        return df.drop_duplicates('timestamp').sort_values('timestamp').reset_index(drop=True)
+
+    def load_tail(self, symbol: str, timeframe: str, bars: int) -> pd.DataFrame:
+        """Loads the last `bars` stored candles, reading only the newest parts."""
+        manifest = self._read_manifest(symbol, timeframe)
+        directory = self._dir(symbol, timeframe)
+
+        frames = []
+        rows = 0
+        for part in reversed(manifest['parts']):
+            frames.append(pd.read_parquet(directory / part['file']))
+            rows += part['rows']
+            if rows >= bars:
+                break
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames[::-1], ignore_index=True).tail(bars).reset_index(drop=True)
+
+    def update_tail(self, symbol: str, timeframe: str, fresh: pd.DataFrame, bars: int,
+                    now_ms: Optional[int] = None) -> pd.DataFrame:
+        """
+        Stores the closed bars of a freshly fetched increment and returns the
+        last `bars` closed candles from disk plus the still-forming bar, if any.
+        Returns an empty frame if the result does not reach the last closed
+        bar (e.g. the fetch failed and only old candles are on disk).
+        """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        bar_ms = timeframe_ms(timeframe)
+
+        forming = fresh.iloc[0:0]
+        if not fresh.empty:
+            close_ms = fresh['timestamp'].astype('datetime64[ms]').astype('int64') + bar_ms
+            closed_mask = (close_ms <= now_ms).values
+            forming = fresh[~closed_mask]
+            self.append(symbol, timeframe, fresh[closed_mask])
+
+        tail = self.load_tail(symbol, timeframe, bars)
+        if not forming.empty:
+            tail = forming.reset_index(drop=True) if tail.empty else pd.concat([tail, forming], ignore_index=True)
+        # Старый хвост выглядел бы как последние свечи и давал бы "свежие" сигналы
+        last_closed_open = (now_ms // bar_ms - 1) * bar_ms
+        if tail.empty or int(pd.Timestamp(tail['timestamp'].iloc[-1]).value // 10**6) < last_closed_open:
+            return tail.iloc[0:0]
+        return tail
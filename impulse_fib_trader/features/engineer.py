@@ -1,14 +1,71 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict, Union
+from pattern.records import PatternTable, pattern_column
+
+VOLUME_WINDOW = 20
+
+
+def volume_mean(volume: np.ndarray, window: int = VOLUME_WINDOW) -> np.ndarray:
+    """
+    Mean of the `window` bars before each bar (NaN where there are fewer).
+    Every window is summed by one contiguous numpy reduction, NaN counted as 0
+    and skipped in the count - the same arithmetic pandas' Series.mean() does,
+    so results match df.iloc[i-window:i]['volume'].mean() bit for bit.
+    """
+    volume = np.asarray(volume, dtype=np.float64)
+    out = np.full(len(volume), np.nan)
+    if len(volume) <= window:
+        return out
+    missing = np.isnan(volume)
+    windows = sliding_window_view(np.where(missing, 0.0, volume), window)[:-1]
+    counts = window - sliding_window_view(missing, window)[:-1].sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[window:] = np.where(counts > 0, windows.sum(axis=1) / counts, np.nan)
+    return out
+
 
 class FeatureEngineer:
-    def extract_features(self, patterns: List[Dict], df: pd.DataFrame) -> pd.DataFrame:
+    FEATURE_COLUMNS = ['rsi', 'atr_ratio', 'dist_ema_20', 'dist_ema_200', 'volume_ratio', 'wick_ratio']
+
+    def extract_features(self, patterns: Union[PatternTable, List[Dict]], df: pd.DataFrame) -> pd.DataFrame:
+        """
+        One row of features per pattern, gathered for all entry bars at once.
+        Bit-for-bit the same frame as _extract_features_loop, so saved models still apply.
+        """
+        if not len(patterns): return pd.DataFrame()
+
+        idx = pattern_column(patterns, 'entry_idx').astype(np.int64)
+        opens = df['open'].values.astype(np.float64)[idx]
+        highs = df['high'].values.astype(np.float64)[idx]
+        lows = df['low'].values.astype(np.float64)[idx]
+        closes = df['close'].values.astype(np.float64)[idx]
+        volumes = df['volume'].values.astype(np.float64)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Средний объем за 20 свечей считается один раз на весь фрейм
+            volume_ratio = np.where(idx > VOLUME_WINDOW, volumes[idx] / volume_mean(volumes)[idx], 1.0)
+            c_range = highs - lows
+            # Как встроенный min(open, close): open, если close не меньше
+            wick = np.where(closes < opens, closes, opens) - lows
+            wick_ratio = np.where(c_range > 0, wick / c_range, 0)
+
+            return pd.DataFrame({
+                'rsi': df['rsi'].values.astype(np.float64)[idx],
+                'atr_ratio': df['atr'].values.astype(np.float64)[idx] / closes,
+                'dist_ema_20': (closes / df['ema_20'].values.astype(np.float64)[idx]) - 1,
+                'dist_ema_200': (closes / df['ema_200'].values.astype(np.float64)[idx]) - 1,
+                'volume_ratio': volume_ratio,
+                'wick_ratio': wick_ratio,
+            })
+
+    def _extract_features_loop(self, patterns: Union[PatternTable, List[Dict]], df: pd.DataFrame) -> pd.DataFrame:
+        """Per-pattern reference implementation of extract_features."""
         features = []
         if not patterns: return pd.DataFrame()
 
-        for p in patterns:
-            idx = p['entry_idx']
+        for idx in pattern_column(patterns, 'entry_idx').tolist():
             candle = df.iloc[idx]
             
             f = {
@@ -1,29 +1,130 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Union, Sequence, Tuple
+from pattern.records import PatternTable, pattern_column
+
+# Строк на один блок матрицы окон, чтобы не раздувать память на всей истории
+BATCH_ROWS = 8192
+# Цель и горизонт меток create_labels: метка окончательна, когда после входа закрылось LABEL_HORIZON свечей
+LABEL_RR = 2.0
+LABEL_HORIZON = 48
+
+
+def first_touch(entry_idx: np.ndarray, stop: np.ndarray, targets: np.ndarray,
+                highs: np.ndarray, lows: np.ndarray, horizon: int,
+                bullish: Union[bool, np.ndarray] = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First bar (1-based offset after entry) on which each barrier is touched
+    within `horizon` bars; horizon + 1 where it never is.
+
+    entry_idx, stop: (P,); targets: (P, R), one column per take-profit level.
+    Longs touch the stop at low <= stop and a target at high >= target,
+    shorts the other way round. Bars past the end of the data never touch.
+    Returns (target_bar (P, R), stop_bar (P,)); when both land on the same
+    bar the caller decides (labels and backtest count it as a stop).
+    """
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    stop = np.asarray(stop, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64).reshape(len(entry_idx), -1)
+    bullish = np.broadcast_to(np.asarray(bullish, dtype=bool), entry_idx.shape)
+    n = len(highs)
+    never = horizon + 1
+
+    target_bar = np.full(targets.shape, never, dtype=np.int64)
+    stop_bar = np.full(len(entry_idx), never, dtype=np.int64)
+    offsets = np.arange(1, horizon + 1)
+
+    for lo in range(0, len(entry_idx), BATCH_ROWS):
+        rows = slice(lo, lo + BATCH_ROWS)
+        idx = entry_idx[rows, None] + offsets
+        in_bounds = idx < n
+        safe = np.minimum(idx, n - 1)
+        high = highs[safe]
+        low = lows[safe]
+        bull = bullish[rows, None]
+
+        hit = np.where(bull, low <= stop[rows, None], high >= stop[rows, None]) & in_bounds
+        stop_bar[rows] = np.where(hit.any(axis=1), hit.argmax(axis=1) + 1, never)
+
+        for r in range(targets.shape[1]):
+            level = targets[rows, r, None]
+            hit = np.where(bull, high >= level, low <= level) & in_bounds
+            target_bar[rows, r] = np.where(hit.any(axis=1), hit.argmax(axis=1) + 1, never)
+    return target_bar, stop_bar
+
 
 class Labeler:
     def __init__(self, config: Dict):
         self.config = config
 
-    def create_labels(self, patterns: List[Dict], df: pd.DataFrame) -> pd.Series:
+    def first_touch(self, patterns: Union[PatternTable, List[Dict]], df: pd.DataFrame,
+                    rr_multiples: Sequence[float] = (LABEL_RR,),
+                    horizons: Sequence[int] = (LABEL_HORIZON,), resolver=None,
+                    symbol: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Labels every pattern for every (RR, horizon) pair in one pass.
+
+        Returns (labels, bars): columns 'rr{rr}_h{h}'. labels is 1 when the
+        target is touched strictly before the stop within h bars, bars is the
+        number of bars to the first touch of either barrier (NaN if neither is
+        touched within h). An IntrabarResolver decides bars that touch both
+        barriers from lower-timeframe candles; without one the stop wins.
+        symbol names the market for the resolver (TAS patterns carry no symbol
+        of their own); by default it is taken from the patterns.
+        """
+        entry_idx = pattern_column(patterns, 'entry_idx').astype(np.int64)
+        entry_price = pattern_column(patterns, 'entry_price').astype(np.float64)
+        sl = pattern_column(patterns, 'sl').astype(np.float64)
+        risk = entry_price - sl
+        targets = np.stack([entry_price + (risk * rr) for rr in rr_multiples], axis=1)
+
+        target_bar, stop_bar = first_touch(entry_idx, sl, targets, df['high'].values.astype(np.float64),
+                                           df['low'].values.astype(np.float64), max(horizons))
+        tradable = risk > 0
+
+        labels, bars = {}, {}
+        for r, rr in enumerate(rr_multiples):
+            # Касание стопа и цели на одной свече считается стопом
+            won = tradable & (target_bar[:, r] < stop_bar)
+            if resolver is not None:
+                tie = np.flatnonzero(tradable & (target_bar[:, r] == stop_bar) & (stop_bar <= max(horizons)))
+                if len(tie):
+                    symbols = symbol if symbol is not None else pattern_column(patterns, 'symbol', 'UNKNOWN')[tie]
+                    won[tie] = resolver.target_first(symbols,
+                                                     df['timestamp'].values[entry_idx[tie] + stop_bar[tie]],
+                                                     sl[tie], targets[tie, r])
+            first = np.minimum(target_bar[:, r], stop_bar)
+            for h in horizons:
+                name = f"rr{rr:g}_h{h}"
+                labels[name] = (won & (target_bar[:, r] <= h)).astype(np.int64)
+                bars[name] = np.where(tradable & (first <= h), first, np.nan)
+        return pd.DataFrame(labels), pd.DataFrame(bars)
+
+    def create_labels(self, patterns: Union[PatternTable, List[Dict]], df: pd.DataFrame,
+                      resolver=None, symbol: Optional[str] = None) -> pd.Series:
+        """1 if RR LABEL_RR is reached before the stop within LABEL_HORIZON bars, else 0."""
+        if not len(patterns): return pd.Series([])
+        labels, _ = self.first_touch(patterns, df, (LABEL_RR,), (LABEL_HORIZON,), resolver, symbol)
+        return labels[f"rr{LABEL_RR:g}_h{LABEL_HORIZON}"].rename(None)
+
+    def _create_labels_loop(self, patterns: Union[PatternTable, List[Dict]], df: pd.DataFrame) -> pd.Series:
+        """Bar-by-bar reference implementation of create_labels."""
         labels = []
         if not patterns: return pd.Series([])
 
-        for p in patterns:
-            entry_idx = p['entry_idx']
-            entry_price = p['entry_price']
-            sl = p['sl']
-            
+        for entry_idx, entry_price, sl in zip(pattern_column(patterns, 'entry_idx').tolist(),
+                                              pattern_column(patterns, 'entry_price'),
+                                              pattern_column(patterns, 'sl')):
+
             risk = entry_price - sl
             if risk <= 0:
                 labels.append(0)
                 continue
-            
-            tp = entry_price + (risk * 2.0)
+
+            tp = entry_price + (risk * LABEL_RR)
             label = 0
-            end_search = min(entry_idx + 48, len(df) - 1)
-            
+            end_search = min(entry_idx + LABEL_HORIZON, len(df) - 1)
+
             for i in range(entry_idx + 1, end_search + 1):
                 if df.iloc[i]['low'] <= sl: break
                 if df.iloc[i]['high'] >= tp:
@@ -1,3 +1,4 @@
+import argparse
 import logging
 import os
 import json
@@ -5,16 +6,30 @@ import pandas as pd
 from data.fetcher import DataFetcher
 from data.cleaner import DataCleaner
 from data.storage import DataStorage
+from data.cache import ResultCache
 from pattern.tas_detector import TASDetector
 from features.engineer import FeatureEngineer
 from features.labels import Labeler
+from pattern.records import pattern_column
 from ml.train import MLTrainer
+from ml.dataset import ShardWriter
+from ml.registry import ModelRegistry
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def main():
+    parser = argparse.ArgumentParser(description="Train the TAS model")
+    parser.add_argument('--folds', type=int, default=0, help="walk-forward folds before the final fit (0 = off)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="processes for walk-forward folds")
+    parser.add_argument('--shards', default=None,
+                        help="write features per symbol to this dir and train out-of-core from it")
+    parser.add_argument('--holdout-from', default='2024-08-01', help="test rows from this date (with --shards)")
+    args = parser.parse_args()
+    if args.shards and args.folds:
+        parser.error("--folds needs the in-memory dataset; drop --shards")
+
     # Топ ликвидных монет для обучения новой стратегии
     symbols = [
         'BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'ADA/USDT', 'XRP/USDT', 'LTC/USDT', 
@@ -36,8 +51,14 @@ def main():
     detector = TASDetector(config)
     fe = FeatureEngineer()
     labeler = Labeler(config)
+    cache = ResultCache()
+    writer = ShardWriter(args.shards) if args.shards else None
+    if writer:
+        # Каждый запуск собирает шарды заново: старые символы не попадут в обучение
+        writer.clear()
     
     all_data_frames = []
+    total = 0
     
     for symbol in symbols:
         data_path = f"data_{symbol.replace('/', '_')}_{timeframe}_tas.parquet"
@@ -53,42 +74,65 @@ def main():
             DataStorage.save_to_parquet(df, data_path)
         else:
             df = DataStorage.load_from_parquet(data_path)
-            # Пересчет индикаторов для надежности
-            df = cleaner.calculate_indicators(df)
         
-        # 2. Поиск паттернов TAS
+        # 2. Поиск паттернов TAS (из кэша, если файл и конфиг не менялись)
         logger.info(f"Поиск паттернов TAS для {symbol}...")
+        # Пересчет индикаторов для надежности: файл мог быть сохранен со старыми формулами.
+        # Результат кэшируется по содержимому файла и DataCleaner.VERSION, так что повторный запуск не считает заново
+        df, patterns = cache.detect(data_path, df, config, detector, with_indicators=True)
         df.index.name = symbol
-        patterns = detector.detect_patterns(df)
         
-        if patterns:
+        if len(patterns):
             # 3. Извлечение признаков и создание меток
             X_sym = fe.extract_features(patterns, df)
             y_sym = labeler.create_labels(patterns, df)
             
-            all_data_frames.append((X_sym, y_sym))
+            times = pd.Series(pattern_column(patterns, 'timestamp'))
+            total += len(X_sym)
+            if writer:
+                # Шарды на диск сразу, в памяти остается только текущий символ
+                writer.write(symbol, X_sym, y_sym, times)
+            else:
+                all_data_frames.append((X_sym, y_sym, times))
             logger.info(f"Добавлено {len(patterns)} примеров TAS от {symbol}")
 
-    if not all_data_frames:
+    if not total:
         logger.error("Не найдено паттернов TAS для обучения!")
         return
 
-    # 4. Объединение данных
-    X = pd.concat([d[0] for d in all_data_frames], ignore_index=True)
-    y = pd.concat([d[1] for d in all_data_frames], ignore_index=True)
+    logger.info(f"ИТОГО: {total} паттернов TAS. Начинаю обучение...")
+    trainer = MLTrainer()
 
-    logger.info(f"ИТОГО: {len(X)} паттернов TAS. Начинаю обучение...")
+    if writer:
+        # 4-5. Обучение из шардов без объединения в памяти
+        model, ml_eval = trainer.train_from_shards(args.shards, holdout_from=args.holdout_from)
+    else:
+        # 4. Объединение данных
+        X = pd.concat([d[0] for d in all_data_frames], ignore_index=True)
+        y = pd.concat([d[1] for d in all_data_frames], ignore_index=True)
 
-    # 5. Обучение модели
-    trainer = MLTrainer()
-    model, ml_eval = trainer.train(X, y)
+        # 5. Обучение модели
+        if args.folds:
+            # Фолды упорядочены по времени паттерна, а не по символу
+            times = pd.concat([d[2] for d in all_data_frames], ignore_index=True)
+            trainer.walk_forward(X, y, n_splits=args.folds, workers=args.workers, times=times)
+        model, ml_eval = trainer.train(X, y)
     trainer.save_model('trained_model_tas.joblib')
+    metrics = {k: ml_eval[k] for k in ('accuracy',) if k in ml_eval}
+    if 'report' in ml_eval and '1' in ml_eval['report']:
+        metrics.update(precision_1=ml_eval['report']['1']['precision'], recall_1=ml_eval['report']['1']['recall'])
+    # Реестр рядом с ботом, который читает модели оттуда
+    registry = ModelRegistry(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+    version = registry.save(model, 'tas', config=config, window=(start_date, end_date), metrics=metrics,
+                            features=FeatureEngineer.FEATURE_COLUMNS)
     
     print("\n" + "="*50)
     print("ОБУЧЕНИЕ TAS_v1 ЗАВЕРШЕНО")
+    print(f"Модель в реестре: models/tas/{version}")
     print("="*50)
-    print(f"Всего примеров: {len(X)}")
-    print(f"Точность (Accuracy): {ml_eval['accuracy']:.2%}")
+    print(f"Всего примеров: {total}")
+    if 'accuracy' in ml_eval:
+        print(f"Точность (Accuracy): {ml_eval['accuracy']:.2%}")
     print("\nТоп признаков:")
     sorted_features = sorted(ml_eval['feature_importance'].items(), key=lambda x: x[1], reverse=True)
     for feat, imp in sorted_features[:5]:
@@ -0,0 +1,96 @@
+import logging
+import os
+import pathlib
+import shutil
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+LABEL = 'label'
+TIME = 'timestamp'
+
+
+class ShardWriter:
+    """
+    Writes training rows (features, label, pattern time) per symbol as
+    partitioned parquet: <root>/symbol=<SYM>/year=<YYYY>/part.parquet.
+    Rows go to disk as each symbol is processed, so nothing holds the
+    whole universe in memory. Rewriting a symbol replaces all its shards;
+    clear() drops every symbol before a fresh build.
+    """
+    def __init__(self, root_dir: str = 'training_data'):
+        self.root = pathlib.Path(root_dir)
+
+    def clear(self):
+        """Removes all shards, so symbols without patterns this run leave nothing behind."""
+        for symbol_dir in self.root.glob('symbol=*'):
+            shutil.rmtree(symbol_dir)
+
+    def write(self, symbol: str, X: pd.DataFrame, y: pd.Series, times: pd.Series) -> List[str]:
+        data = X.reset_index(drop=True).copy()
+        data[LABEL] = pd.Series(y).to_numpy()
+        data[TIME] = pd.to_datetime(pd.Series(times).to_numpy())
+
+        paths = []
+        symbol_dir = self.root / f"symbol={symbol.replace('/', '_')}"
+        # Годы без паттернов в этом запуске не должны остаться от прошлого
+        if symbol_dir.exists():
+            shutil.rmtree(symbol_dir)
+        for year, part in data.groupby(data[TIME].dt.year, sort=True):
+            path = symbol_dir / f"year={year}" / 'part.parquet'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            part.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            paths.append(str(path))
+        logger.info(f"{symbol}: {len(data)} rows in {len(paths)} shards")
+        return paths
+
+
+def list_shards(root_dir: str) -> List[str]:
+    return sorted(str(p) for p in pathlib.Path(root_dir).glob('symbol=*/year=*/part.parquet'))
+
+
+def feature_columns(path: str) -> List[str]:
+    return [name for name in pq.read_schema(path).names if name not in (LABEL, TIME)]
+
+
+def read_shard(path: str, columns: List[str], start: Optional[pd.Timestamp] = None,
+               end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """One shard restricted to start <= time < end."""
+    df = pd.read_parquet(path, columns=columns + [LABEL, TIME])
+    if start is not None:
+        df = df[df[TIME] >= start]
+    if end is not None:
+        df = df[df[TIME] < end]
+    return df
+
+
+class ShardIter(xgb.DataIter):
+    """
+    Feeds shards to xgboost one file at a time (QuantileDMatrix /
+    ExtMemQuantileDMatrix), optionally limited to a time range.
+    """
+    def __init__(self, paths: List[str], columns: List[str], cache_prefix: Optional[str] = None,
+                 start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None):
+        self.paths = paths
+        self.columns = columns
+        self.start, self.end = start, end
+        self._pos = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        # Пустые после фильтра по времени шарды пропускаем
+        while self._pos < len(self.paths):
+            df = read_shard(self.paths[self._pos], self.columns, self.start, self.end)
+            self._pos += 1
+            if len(df):
+                input_data(data=df[self.columns], label=df[LABEL].values)
+                return True
+        return False
+
+    def reset(self):
+        self._pos = 0
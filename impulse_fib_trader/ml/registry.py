@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import xgboost as xgb
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = 'model.ubj'
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+
+
+def config_hash(config: Optional[Dict]) -> Optional[str]:
+    if config is None:
+        return None
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def _write_atomic(path: pathlib.Path, data: Union[str, bytes]):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data.encode() if isinstance(data, str) else data)
+    os.replace(tmp, path)
+
+
+class ModelRegistry:
+    """
+    Versioned models as native xgboost boosters (UBJSON) plus a manifest:
+    <root>/<name>/<version>/{model.ubj, manifest.json}, with <root>/<name>/LATEST
+    naming the active version. Loading reads the booster directly - no
+    pickle, no sklearn wrapper - and checks the manifest's feature schema
+    against what the caller will feed it.
+    """
+    def __init__(self, root_dir: str = 'models'):
+        self.root = pathlib.Path(root_dir)
+        # name -> (версия, booster, manifest) последней загруженной модели
+        self._current: Dict[str, Tuple[str, xgb.Booster, Dict]] = {}
+        # name -> версия, которую не удалось загрузить (не пытаемся на каждом скане)
+        self._failed: Dict[str, str] = {}
+
+    def save(self, model: Union[xgb.Booster, xgb.XGBModel], name: str, config: Optional[Dict] = None,
+             window: Optional[Tuple[str, str]] = None, metrics: Optional[Dict] = None,
+             activate: bool = True, features: Optional[List[str]] = None) -> str:
+        """
+        Stores model as a new version of name (made LATEST unless activate=False);
+        returns the version. features, if given, must equal the model's.
+        """
+        booster = model.get_booster() if isinstance(model, xgb.XGBModel) else model
+        if not booster.feature_names:
+            raise ValueError("Model has no feature names; train it on a DataFrame")
+        if features is not None and list(features) != list(booster.feature_names):
+            raise ValueError(f"Model features {booster.feature_names} differ from {list(features)}")
+
+        version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        base, n = version, 1
+        while (self.root / name / version).exists():
+            version = f"{base}-{n}"
+            n += 1
+        target = self.root / name / version
+        target.mkdir(parents=True)
+
+        manifest = {
+            'name': name,
+            'version': version,
+            'format': 'ubj',
+            'xgboost': xgb.__version__,
+            'features': list(booster.feature_names),
+            'config_hash': config_hash(config),
+            'train_window': list(window) if window else None,
+            'metrics': metrics or {},
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+        _write_atomic(target / MODEL_FILE, bytes(booster.save_raw('ubj')))
+        _write_atomic(target / MANIFEST_FILE, json.dumps(manifest, indent=2, default=float))
+        if activate:
+            self.activate(name, version, features)
+        logger.info(f"Saved model {name}/{version}")
+        return version
+
+    def activate(self, name: str, version: str, features: Optional[List[str]] = None):
+        """
+        Makes version the LATEST of name. The stored booster is loaded and
+        checked against its manifest (and features, if given) first, so a
+        broken version is refused here rather than when a scan loads it.
+        """
+        if not (self.root / name / version / MODEL_FILE).exists():
+            raise FileNotFoundError(f"No model {name}/{version}")
+        self.load(name, version, features)
+        _write_atomic(self.root / name / LATEST_FILE, version)
+
+    def versions(self, name: str) -> List[str]:
+        return sorted(p.parent.name for p in (self.root / name).glob(f"*/{MANIFEST_FILE}"))
+
+    def latest(self, name: str) -> Optional[str]:
+        path = self.root / name / LATEST_FILE
+        return path.read_text().strip() if path.exists() else None
+
+    def manifest(self, name: str, version: Optional[str] = None) -> Dict:
+        version = version or self.latest(name)
+        with open(self.root / name / version / MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+
+    def load(self, name: str, version: Optional[str] = None, features: Optional[List[str]] = None,
+             config: Optional[Dict] = None) -> Tuple[xgb.Booster, Dict]:
+        """
+        Booster and manifest of name/version (LATEST by default).
+        Raises ValueError if features (the columns the caller will predict
+        on) differ from the model's; a different config only warns.
+        """
+        version = version or self.latest(name)
+        if version is None:
+            raise FileNotFoundError(f"No active model '{name}' in {self.root}")
+        manifest = self.manifest(name, version)
+        if features is not None and list(features) != manifest['features']:
+            raise ValueError(f"Feature schema of {name}/{version} is {manifest['features']}, got {list(features)}")
+        if config is not None and manifest.get('config_hash') not in (None, config_hash(config)):
+            logger.warning(f"Model {name}/{version} was trained with a different config")
+
+        booster = xgb.Booster(model_file=str(self.root / name / version / MODEL_FILE))
+        if booster.feature_names != manifest['features']:
+            raise ValueError(f"Booster {name}/{version} does not match its manifest")
+        return booster, manifest
+
+    def current(self, name: str, features: Optional[List[str]] = None,
+                config: Optional[Dict] = None) -> Optional[xgb.Booster]:
+        """
+        LATEST booster of name, reloaded only when LATEST points to a new
+        version, so a running bot picks up activated models. None if the
+        registry has no such model. A version that fails to load or does
+        not match features is logged once and the previously loaded
+        booster keeps serving.
+        """
+        version = self.latest(name)
+        if version is None:
+            return None
+        cached = self._current.get(name)
+        if (cached is None or cached[0] != version) and self._failed.get(name) != version:
+            try:
+                booster, manifest = self.load(name, version, features, config)
+            except (OSError, ValueError, xgb.core.XGBoostError) as e:
+                self._failed[name] = version
+                logger.error(f"Model {name}/{version} rejected, keeping the previous one: {e}")
+            else:
+                self._current[name] = (version, booster, manifest)
+                logger.info(f"Model {name}/{version} loaded")
+        return self._current[name][1] if name in self._current else None
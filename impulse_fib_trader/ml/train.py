@@ -1,9 +1,58 @@
+import logging
+import os
+import tempfile
+import time
+import numpy as np
 import pandas as pd
 import xgboost as xgb
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import classification_report, accuracy_score
+from sklearn.metrics import classification_report, accuracy_score, precision_score, recall_score, log_loss
 import joblib
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+from ml.dataset import LABEL, ShardIter, feature_columns, list_shards, read_shard
+
+logger = logging.getLogger(__name__)
+
+# Данные walk-forward в процессе-воркере: передаются один раз через initializer
+_FOLD_DATA = {}
+
+
+def booster_params(model_params: Dict, nthread: int) -> Dict:
+    """XGBClassifier parameters in xgb.train form (n_estimators becomes num_boost_round)."""
+    params = {k: v for k, v in model_params.items() if k not in ('n_estimators', 'random_state', 'learning_rate')}
+    params['eta'] = model_params.get('learning_rate', 0.3)
+    params['seed'] = model_params.get('random_state', 0)
+    params['nthread'] = nthread
+    return params
+
+
+def _init_folds(X: np.ndarray, y: np.ndarray, feature_names):
+    _FOLD_DATA.update(X=X, y=y, feature_names=feature_names)
+
+
+def _run_fold(fold: int, train_idx: np.ndarray, test_idx: np.ndarray, model_params: Dict, nthread: int) -> Dict:
+    """Fits one walk-forward fold on a DMatrix built once for it and scores class 1."""
+    X, y, names = _FOLD_DATA['X'], _FOLD_DATA['y'], _FOLD_DATA['feature_names']
+    started = time.perf_counter()
+    y_train = y[train_idx]
+    pos = (y_train == 1).sum()
+    params = booster_params(model_params, nthread)
+    params['scale_pos_weight'] = (y_train == 0).sum() / pos if pos > 0 else 1.0
+
+    dtrain = xgb.DMatrix(X[train_idx], label=y_train, feature_names=names, nthread=nthread)
+    dtest = xgb.DMatrix(X[test_idx], feature_names=names, nthread=nthread)
+    booster = xgb.train(params, dtrain, num_boost_round=model_params.get('n_estimators', 100))
+    y_pred = (booster.predict(dtest) >= 0.5).astype(int)
+    y_test = y[test_idx]
+    return {
+        'fold': fold,
+        'train_size': len(train_idx),
+        'test_size': len(test_idx),
+        'precision': precision_score(y_test, y_pred, zero_division=0),
+        'recall': recall_score(y_test, y_pred, zero_division=0),
+        'seconds': time.perf_counter() - started,
+    }
 
 class MLTrainer:
     def __init__(self, model_params: Dict = None):
@@ -56,6 +105,172 @@ class MLTrainer:
         }
 
 
+    def train_from_shards(self, root_dir: str, holdout_from: Optional[str] = None,
+                          max_bin: int = 256) -> Tuple[xgb.XGBClassifier, Dict]:
+        """
+        Trains on parquet shards written by ml.dataset.ShardWriter without
+        loading them together: shards stream through ShardIter into an
+        external-memory DMatrix whose pages live in a temp dir. Rows at or
+        after holdout_from are left out and used for the test report,
+        predicted one shard at a time.
+        """
+        paths = list_shards(root_dir)
+        if not paths:
+            raise ValueError(f"No training shards in {root_dir}")
+        columns = feature_columns(paths[0])
+        cutoff = pd.Timestamp(holdout_from) if holdout_from else None
+
+        # Веса классов считаем по одной колонке меток, не читая признаки
+        labels = pd.concat([read_shard(p, [], end=cutoff)[LABEL] for p in paths], ignore_index=True)
+        pos_count, neg_count = int((labels == 1).sum()), int((labels == 0).sum())
+        params = booster_params(self.model_params, os.cpu_count() or 1)
+        params['scale_pos_weight'] = neg_count / pos_count if pos_count > 0 else 1.0
+        params['max_bin'] = max_bin
+
+        with tempfile.TemporaryDirectory(prefix='xgb-pages-') as pages:
+            shards = ShardIter(paths, columns, os.path.join(pages, 'train'), end=cutoff)
+            if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+                dtrain = xgb.ExtMemQuantileDMatrix(shards, max_bin=max_bin)
+            else:
+                # xgboost < 3.0: DMatrix из итератора с cache_prefix тоже хранит страницы на диске
+                dtrain = xgb.DMatrix(shards)
+            booster = xgb.train(params, dtrain, num_boost_round=self.model_params.get('n_estimators', 100))
+            del dtrain
+
+        self._use_booster(booster)
+        result = {'feature_importance': dict(zip(columns, self.model.feature_importances_))}
+        if cutoff is None:
+            return self.model, result
+
+        y_test, y_pred = [], []
+        for path in paths:
+            df = read_shard(path, columns, start=cutoff)
+            if len(df):
+                y_test.append(df[LABEL].values)
+                y_pred.append(self.model.predict(df[columns]))
+        if not y_test:
+            logger.warning(f"No rows after {holdout_from} for the holdout report")
+            return self.model, result
+        y_test, y_pred = np.concatenate(y_test), np.concatenate(y_pred)
+        report_dict = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+
+        print("\n" + "-"*30)
+        print(f"ДЕТАЛЬНАЯ МЕТРИКА (Holdout с {holdout_from}, {len(y_test)} примеров):")
+        if '1' in report_dict:
+            print(f"Точность (Precision) для ПРОФИТА (Class 1): {report_dict['1']['precision']:.2%}")
+            print(f"Охват (Recall) для ПРОФИТА (Class 1): {report_dict['1']['recall']:.2%}")
+        print("-"*30)
+
+        result.update(accuracy=accuracy_score(y_test, y_pred), report=report_dict)
+        return self.model, result
+
+    def refresh(self, X: pd.DataFrame, y: pd.Series, times: pd.Series, booster: Optional[xgb.Booster] = None,
+                n_trees: int = 50, holdout_fraction: float = 0.2) -> Tuple[xgb.XGBClassifier, Dict]:
+        """
+        Incremental update: continues boosting the existing model (booster,
+        or the loaded self.model) with n_trees more trees fitted on rows
+        labeled since the last training. The most recent holdout_fraction
+        of the new rows is kept out and scored by the old and the new model.
+
+        Returns the refreshed model and {'before', 'after'} holdout metrics
+        (logloss, precision/recall of class 1) plus 'improved' and
+        'holdout_from' - the time of the first held-out row, from which the
+        next refresh should start so those rows are trained on later.
+        """
+        started = time.perf_counter()
+        if booster is None:
+            booster = self.model.get_booster()
+        order = np.argsort(np.asarray(times), kind='stable')
+        X, y = X.iloc[order][booster.feature_names], y.iloc[order].astype(int)
+        split_idx = self.holdout_split(len(X), holdout_fraction)
+        if split_idx is None:
+            raise ValueError(f"{len(X)} new rows are too few to train and hold out {holdout_fraction:.0%}")
+        X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
+        y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
+
+        pos = (y_train == 1).sum()
+        params = booster_params(self.model_params, os.cpu_count() or 1)
+        params['scale_pos_weight'] = (y_train == 0).sum() / pos if pos > 0 else 1.0
+        # xgb.train не меняет исходный booster: новые деревья добавляются к копии
+        refreshed = xgb.train(params, xgb.DMatrix(X_train, label=y_train), num_boost_round=n_trees, xgb_model=booster)
+
+        def score(model: xgb.Booster) -> Dict:
+            probs = model.inplace_predict(X_test)
+            y_pred = (probs > 0.5).astype(int)
+            return {
+                'logloss': log_loss(y_test, probs, labels=[0, 1]),
+                'precision': precision_score(y_test, y_pred, zero_division=0),
+                'recall': recall_score(y_test, y_pred, zero_division=0),
+            }
+
+        before, after = score(booster), score(refreshed)
+        self._use_booster(refreshed)
+        result = {
+            'train_size': len(X_train),
+            'holdout_size': len(X_test),
+            'holdout_from': pd.Timestamp(np.asarray(times)[order[split_idx]]),
+            'trees': refreshed.num_boosted_rounds(),
+            'before': before,
+            'after': after,
+            'improved': after['logloss'] <= before['logloss'],
+            'seconds': time.perf_counter() - started,
+        }
+
+        print("\n" + "-"*30)
+        print(f"REFRESH: +{n_trees} деревьев на {len(X_train)} примерах, holdout {len(X_test)} ({result['seconds']:.1f}s)")
+        for name, m in (('До', before), ('После', after)):
+            print(f"{name}: LogLoss {m['logloss']:.4f} | Precision {m['precision']:.2%} | Recall {m['recall']:.2%}")
+        print("-"*30)
+        return self.model, result
+
+    @staticmethod
+    def holdout_split(n_rows: int, holdout_fraction: float) -> Optional[int]:
+        """Row where refresh() starts the holdout, or None if either side would be empty."""
+        split_idx = int(n_rows * (1 - holdout_fraction))
+        return split_idx if 0 < split_idx < n_rows else None
+
+    def _use_booster(self, booster: xgb.Booster):
+        # Обертка sklearn, чтобы predict_proba и сохранение работали как после train()
+        self.model = xgb.XGBClassifier(**self.model_params)
+        self.model.load_model(booster.save_raw('json'))
+
+    def walk_forward(self, X: pd.DataFrame, y: pd.Series, n_splits: int = 5, workers: int = 1,
+                     times: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        Walk-forward validation: TimeSeriesSplit folds, each trained on all
+        earlier rows and tested on the next block, in a process pool.
+        times (e.g. pattern timestamps) orders rows gathered from several
+        symbols; without it X is assumed to be in time order already.
+
+        Returns one row per fold with precision/recall for class 1 and the
+        fold's wall time. Threads are split between the workers, so folds
+        use all cores without oversubscribing them.
+        """
+        order = np.argsort(np.asarray(times), kind='stable') if times is not None else np.arange(len(X))
+        data = (X.values[order].astype(np.float32), y.values[order].astype(int), list(X.columns))
+        folds = list(TimeSeriesSplit(n_splits=n_splits).split(order))
+        workers = max(1, min(workers, len(folds)))
+        nthread = max(1, (os.cpu_count() or 1) // workers)
+        args = ([k for k in range(len(folds))], [f[0] for f in folds], [f[1] for f in folds],
+                [self.model_params] * len(folds), [nthread] * len(folds))
+
+        started = time.perf_counter()
+        if workers == 1:
+            _init_folds(*data)
+            results = list(map(_run_fold, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_folds, initargs=data) as pool:
+                results = list(pool.map(_run_fold, *args))
+        report = pd.DataFrame(results)
+
+        print("\n" + "-"*30)
+        print(f"WALK-FORWARD ({len(folds)} folds, {workers} workers, {time.perf_counter() - started:.1f}s):")
+        for r in results:
+            print(f"Fold {r['fold']}: train {r['train_size']}, test {r['test_size']} | "
+                  f"Precision {r['precision']:.2%} | Recall {r['recall']:.2%} | {r['seconds']:.1f}s")
+        print("-"*30)
+        return report
+
     def save_model(self, path: str):
         joblib.dump(self.model, path)
 
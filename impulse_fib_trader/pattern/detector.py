@@ -1,14 +1,36 @@
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 import json
 import logging
 from pattern.impulse import ImpulseDetector
 from pattern.pullback import PullbackMeasurer
 from pattern.structure import StructureValidator
+from pattern.impulse import LENGTH_VARIANTS
+from pattern.range_index import RangeExtremaIndex
+from pattern.records import PatternTable
 
 logger = logging.getLogger(__name__)
 
+# Ключи с номерами свечей, которые сдвигаются при поиске по хвосту данных
+INDEX_KEYS = ('start_idx', 'end_idx', 'entry_idx')
+
+
+def _shift(record: Dict, offset: int) -> Dict:
+    """Copy of a pattern dict with every bar index moved by offset (nested dicts included)."""
+    out = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            out[key] = _shift(value, offset)
+        elif key in INDEX_KEYS:
+            out[key] = value + offset
+        else:
+            out[key] = value
+    return out
+
 class PatternDetector:
+    # Меняется вместе с логикой поиска: сбрасывает кэш паттернов (data/cache.py)
+    VERSION = 1
+
     def __init__(self, config_path: str):
         with open(config_path, 'r') as f:
             self.config = json.load(f)
@@ -17,59 +39,109 @@ class PatternDetector:
         self.pullback_measurer = PullbackMeasurer(self.config)
         self.structure_validator = StructureValidator(self.config)
 
-    def detect_patterns(self, df: pd.DataFrame) -> List[Dict]:
+    @classmethod
+    def from_config(cls, config: Dict) -> 'PatternDetector':
+        """Detector for an already loaded (e.g. modified) config dict."""
+        detector = cls.__new__(cls)
+        detector.config = config
+        detector.impulse_detector = ImpulseDetector(config)
+        detector.pullback_measurer = PullbackMeasurer(config)
+        detector.structure_validator = StructureValidator(config)
+        return detector
+
+    def detect_patterns(self, df: pd.DataFrame, as_table: bool = False) -> Union[List[Dict], PatternTable]:
         """
         Runs the full detection pipeline (for Breakout mode).
+        One range-extremum index per DataFrame serves impulse detection and the success check.
+        as_table=True returns a columnar PatternTable instead of dicts.
         """
         logger.info("Detecting impulses...")
-        impulses = self.impulse_detector.detect(df)
+        index = RangeExtremaIndex(df)
+        impulses = self.impulse_detector.detect(df, index)
+        patterns = self.patterns_from_impulses(impulses, df, index)
+        if as_table:
+            return PatternTable.from_records(patterns)
+        return patterns
+
+    def patterns_from_impulses(self, impulses: List[Dict], df: pd.DataFrame,
+                               index: RangeExtremaIndex) -> List[Dict]:
+        """Pullback and structure stages for already detected impulses."""
+        pullbacks = self.pullback_measurer.measure_batch(impulses, df)
+        pairs = [(imp, pb) for imp, pb in zip(impulses, pullbacks) if pb]
+        structures = self.structure_validator.validate_batch(
+            [imp for imp, _ in pairs], [pb for _, pb in pairs], df)
         
         patterns = []
-        for imp in impulses:
-            pullback = self.pullback_measurer.measure(imp, df)
-            if pullback:
-                structure = self.structure_validator.validate(imp, pullback, df)
-                if structure:
-                    success = self._evaluate_success(imp, structure, df)
-                    patterns.append({
-                        'symbol': 'UNKNOWN', # To be filled by scanner
-                        'impulse': imp,
-                        'pullback': pullback,
-                        'structure': structure,
-                        'success': success,
-                        'timestamp': df.iloc[imp['start_idx']]['timestamp']
-                    })
+        timestamps = df['timestamp'].iloc[[imp['start_idx'] for imp, _ in pairs]].tolist()
+        for (imp, pullback), structure, timestamp in zip(pairs, structures, timestamps):
+            if structure:
+                success = self._evaluate_success(imp, structure, df, index)
+                patterns.append({
+                    'symbol': 'UNKNOWN', # To be filled by scanner
+                    'impulse': imp,
+                    'pullback': pullback,
+                    'structure': structure,
+                    'success': success,
+                    'timestamp': timestamp
+                })
         return patterns
 
+    def max_impulse_length(self) -> int:
+        return self.impulse_detector.config.get('min_candles', 4) + LENGTH_VARIANTS - 1
+
+    def pattern_span(self) -> int:
+        """Most bars an impulse start can precede its entry: impulse + pullback + structure search."""
+        max_bars = self.structure_validator.risk_config.get('max_bars_in_trade', 40)
+        return self.max_impulse_length() + self.pullback_measurer.MAX_DURATION + max_bars
+
+    def detect_live(self, df: pd.DataFrame, lookback: int) -> List[Dict]:
+        """
+        Patterns whose entry is in the last `lookback` bars. Same result as
+        filtering detect_patterns(df), but only the impulse starts that can
+        still reach that window are evaluated, so the cost is O(pattern span)
+        rather than O(history).
+        """
+        n = len(df)
+        offset = max(0, n - lookback - self.pattern_span())
+        tail = df.iloc[offset:].reset_index(drop=True)
+        patterns = self.detect_patterns(tail)
+        return [_shift(p, offset) for p in patterns
+                if p['structure']['entry_idx'] + offset >= n - lookback]
+
     def detect_pending_patterns(self, df: pd.DataFrame) -> List[Dict]:
         """
         Detects patterns that are in the pullback phase (for Limit mode).
+        Only impulses ending in the last 12 bars qualify, so just the tail
+        that can hold their starts is scanned.
         """
-        impulses = self.impulse_detector.detect(df)
+        offset = max(0, len(df) - 12 - self.max_impulse_length())
+        df = df.iloc[offset:].reset_index(drop=True)
+        index = RangeExtremaIndex(df)
+        impulses = self.impulse_detector.detect(df, index)
         pending = []
         
-        for imp in impulses:
-            # Если импульс закончился совсем недавно (последние 12 свечей)
-            if imp['end_idx'] >= len(df) - 12:
-                pullback = self.pullback_measurer.measure(imp, df)
-                # Если цена сейчас в зоне 0.5 - 0.705
-                if pullback and pullback['end_idx'] >= len(df) - 2:
-                    # Рассчитываем идеальный вход 0.618
-                    fib_level = 0.618
-                    if imp['type'] == 'bullish':
-                        entry_price = imp['high'] - (imp['range'] * fib_level)
-                    else:
-                        entry_price = imp['low'] + (imp['range'] * fib_level)
-                        
-                    pending.append({
-                        'impulse': imp,
-                        'pullback': pullback,
-                        'limit_entry_price': entry_price,
-                        'timestamp': df.iloc[imp['start_idx']]['timestamp']
-                    })
-        return pending
+        # Если импульс закончился совсем недавно (последние 12 свечей)
+        recent = [imp for imp in impulses if imp['end_idx'] >= len(df) - 12]
+        for imp, pullback in zip(recent, self.pullback_measurer.measure_batch(recent, df)):
+            # Если цена сейчас в зоне 0.5 - 0.705
+            if pullback and pullback['end_idx'] >= len(df) - 2:
+                # Рассчитываем идеальный вход 0.618
+                fib_level = 0.618
+                if imp['type'] == 'bullish':
+                    entry_price = imp['high'] - (imp['range'] * fib_level)
+                else:
+                    entry_price = imp['low'] + (imp['range'] * fib_level)
+                    
+                pending.append({
+                    'impulse': imp,
+                    'pullback': pullback,
+                    'limit_entry_price': entry_price,
+                    'timestamp': df.iloc[imp['start_idx']]['timestamp']
+                })
+        return [_shift(p, offset) for p in pending]
 
-    def _evaluate_success(self, impulse: Dict, structure: Dict, df: pd.DataFrame) -> bool:
+    def _evaluate_success(self, impulse: Dict, structure: Dict, df: pd.DataFrame,
+                          index: Optional[RangeExtremaIndex] = None) -> bool:
         """
         Simple evaluation if the pattern resulted in a continuation.
         In Phase 2, we just look forward 20 bars.
@@ -80,9 +152,14 @@ class PatternDetector:
         target_bars = 20
         end_idx = min(entry_idx + target_bars, len(df) - 1)
         
-        future_prices = df.iloc[entry_idx + 1 : end_idx + 1]
-        if future_prices.empty:
+        if entry_idx + 1 > end_idx:
             return False
+        if index is not None:
+            if impulse['type'] == 'bullish':
+                return index.max_high(entry_idx + 1, end_idx) > structure['entry_price'] + 0.5 * impulse_range
+            return index.min_low(entry_idx + 1, end_idx) < structure['entry_price'] - 0.5 * impulse_range
+
+        future_prices = df.iloc[entry_idx + 1 : end_idx + 1]
             
         if impulse['type'] == 'bullish':
             # Reach 1.0 RR (another impulse range)
@@ -1,15 +1,190 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict, Optional
+from pattern.range_index import RangeExtremaIndex
+
+# Импульс длиной от min_candles до min_candles + 9 свечей
+LENGTH_VARIANTS = 10
+
+# Сумма тел через cumsum может отличаться от slice.sum() в последнем бите,
+# поэтому значения ближе этого к порогу перепроверяются точной формулой
+RATIO_TOLERANCE = 1e-9
+
 
 class ImpulseDetector:
     def __init__(self, config: Dict):
         self.config = config.get('impulse_detection', config.get('pattern_specification', {}).get('impulse_detection', {}))
 
-    def detect(self, df: pd.DataFrame) -> List[Dict]:
+    def detect(self, df: pd.DataFrame, index: Optional[RangeExtremaIndex] = None) -> List[Dict]:
         """
         Detects impulses in the data.
         Returns a list of impulse metadata.
+
+        Evaluates every (start, length) pair at once: window high/low come from
+        the shared range index (or sliding-window running max/min without one)
+        and body sums from a cumulative sum.
+        Returns exactly what the bar-by-bar loop (_detect_loop) returns,
+        including the first-match-per-start rule.
+        """
+        return self.select(self.candidates(df, index))
+
+    def candidates(self, df: pd.DataFrame, index: Optional[RangeExtremaIndex] = None) -> Optional[Dict]:
+        """
+        Per-(start, length) arrays that depend only on the data and min_candles,
+        not on the other thresholds. select() turns them into impulses, so a
+        parameter sweep can compute them once and re-select per grid point.
+        """
+        min_candles = self.config.get('min_candles', 4)
+        n = len(df)
+        n_starts = n - min_candles
+        if n_starts <= 0:
+            return None
+
+        opens = df['open'].values.astype(np.float64)
+        closes = df['close'].values.astype(np.float64)
+        highs = df['high'].values.astype(np.float64)
+        lows = df['low'].values.astype(np.float64)
+        atr = df['atr'].values.astype(np.float64)
+
+        starts = np.arange(n_starts)
+        lengths = min_candles + np.arange(LENGTH_VARIANTS)
+        end_idx = starts[:, None] + lengths[None, :] - 1
+        valid = end_idx + 1 <= n - 1 # как `if i + length >= len(df): break`
+
+        # Окна максимальной длины; хвост дополняем, а невалидные длины маскируем
+        span = min_candles + LENGTH_VARIANTS - 1
+        cols = slice(min_candles - 1, span)
+        pad = span
+        if index is not None:
+            first = np.broadcast_to(starts[:, None], end_idx.shape)
+            last = np.minimum(end_idx, n - 1)
+            win_high = index.max_high(first, last)
+            win_low = index.min_low(first, last)
+        else:
+            win_high = np.maximum.accumulate(
+                sliding_window_view(np.r_[highs, np.full(pad, -np.inf)], span)[:n_starts], axis=1)[:, cols]
+            win_low = np.minimum.accumulate(
+                sliding_window_view(np.r_[lows, np.full(pad, np.inf)], span)[:n_starts], axis=1)[:, cols]
+        bodies = np.abs(closes - opens)
+        body_sum = np.cumsum(sliding_window_view(np.r_[bodies, np.zeros(pad)], span)[:n_starts], axis=1)[:, cols]
+
+        return {
+            'min_candles': min_candles,
+            'starts': starts,
+            'opens': opens,
+            'closes': closes,
+            'start_price': opens[:n_starts, None],
+            'end_price': closes[np.minimum(end_idx, n - 1)],
+            'win_high': win_high,
+            'win_low': win_low,
+            'body_sum': body_sum,
+            'total_range': win_high - win_low,
+            'atr': atr[:n_starts, None],
+            'valid': valid,
+        }
+
+    def prune(self, cands: Optional[Dict]) -> Optional[Dict]:
+        """
+        Keeps only the starts where some length passes this detector's
+        thresholds (body ratio with a tolerance margin). With the loosest
+        thresholds of a sweep, select() under any stricter setting returns the
+        same impulses from the pruned candidates.
+        """
+        if cands is None:
+            return None
+        tolerance = RATIO_TOLERANCE * max(1.0, abs(self.config.get('min_body_ratio', 0.6)))
+        keep = np.zeros(len(cands['starts']), dtype=bool)
+        for net_move, retrace in self._sides(cands):
+            keep |= self._passed(net_move, retrace, cands, body_margin=tolerance).any(axis=1)
+        return {key: (value[keep] if isinstance(value, np.ndarray) and key not in ('opens', 'closes') else value)
+                for key, value in cands.items()}
+
+    @staticmethod
+    def _sides(cands: Dict):
+        """(net_move, internal retracement) for bullish, then bearish."""
+        start_price, end_price = cands['start_price'], cands['end_price']
+        return ((end_price - start_price, cands['win_high'] - end_price),
+                (start_price - end_price, end_price - cands['win_low']))
+
+    def select(self, cands: Optional[Dict]) -> List[Dict]:
+        """Impulses from candidates() under this detector's thresholds."""
+        if cands is None:
+            return []
+        (bull_net, bull_retr), (bear_net, bear_retr) = self._sides(cands)
+        bull_first = self._first_match(bull_net, bull_retr, cands)
+        bear_first = self._first_match(bear_net, bear_retr, cands)
+
+        min_candles = cands['min_candles']
+        starts, opens, closes = cands['starts'], cands['opens'], cands['closes']
+        win_high, win_low = cands['win_high'], cands['win_low']
+
+        impulses = []
+        bull_rows = np.flatnonzero(bull_first >= 0)
+        bear_rows = np.flatnonzero(bear_first >= 0)
+        # Порядок как в цикле: по старту, для одного старта сначала bullish
+        order = np.lexsort((np.r_[np.zeros(len(bull_rows)), np.ones(len(bear_rows))], np.r_[bull_rows, bear_rows]))
+        rows = np.r_[bull_rows, bear_rows][order]
+        kinds = np.r_[np.zeros(len(bull_rows), dtype=int), np.ones(len(bear_rows), dtype=int)][order]
+
+        for row, kind in zip(rows, kinds):
+            k = bull_first[row] if kind == 0 else bear_first[row]
+            i = int(starts[row])
+            length = min_candles + k
+            impulses.append({
+                'type': 'bullish' if kind == 0 else 'bearish',
+                'start_idx': i,
+                'end_idx': int(i + length - 1),
+                'start_price': opens[i],
+                'end_price': closes[i + length - 1],
+                'high': win_high[row, k],
+                'low': win_low[row, k],
+                'range': closes[i + length - 1] - opens[i] if kind == 0 else opens[i] - closes[i + length - 1]
+            })
+        return impulses
+
+    def _passed(self, net_move: np.ndarray, retrace: np.ndarray, cands: Dict,
+                body_margin: float = 0.0) -> np.ndarray:
+        """Threshold mask without the exact re-check of borderline body ratios."""
+        min_atr_mult = self.config.get('min_atr_multiplier', 2.0)
+        min_body_ratio = self.config.get('min_body_ratio', 0.6)
+        max_internal_retr = self.config.get('max_internal_retracement', 0.30)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            passed = cands['valid'] & (net_move > 0)
+            passed &= ~(net_move < min_atr_mult * cands['atr'])
+            passed &= ~(retrace / net_move > max_internal_retr)
+            if body_margin:
+                passed &= ~(cands['body_sum'] / cands['total_range'] < min_body_ratio - body_margin)
+        return passed
+
+    def _first_match(self, net_move: np.ndarray, retrace: np.ndarray, cands: Dict) -> np.ndarray:
+        """
+        Index of the first passing length for every start (-1 if none).
+        NaN comparisons are kept as in the loop: a NaN ATR does not reject.
+        """
+        min_candles = cands['min_candles']
+        min_body_ratio = self.config.get('min_body_ratio', 0.6)
+        starts, opens, closes = cands['starts'], cands['opens'], cands['closes']
+        total_range = cands['total_range']
+
+        passed = self._passed(net_move, retrace, cands)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            body_ratio = cands['body_sum'] / total_range
+            body_ok = ~(body_ratio < min_body_ratio)
+            borderline = passed & (np.abs(body_ratio - min_body_ratio) <= RATIO_TOLERANCE * max(1.0, abs(min_body_ratio)))
+            for row, k in zip(*np.nonzero(borderline)):
+                i = starts[row]
+                length = min_candles + k
+                exact = np.abs(closes[i:i+length] - opens[i:i+length]).sum() / total_range[row, k]
+                body_ok[row, k] = not exact < min_body_ratio
+            passed &= body_ok
+
+        return np.where(passed.any(axis=1), passed.argmax(axis=1), -1)
+
+    def _detect_loop(self, df: pd.DataFrame) -> List[Dict]:
+        """
+        Reference bar-by-bar implementation of detect().
         """
         impulses = []
         min_candles = self.config.get('min_candles', 4)
@@ -3,27 +3,32 @@ import numpy as np
 from typing import List, Dict, Optional
 
 class PullbackMeasurer:
+    # Увеличиваем до 48 часов (2 дня на H1), чтобы ловить долгие боковики
+    MAX_DURATION = 48
+
     def __init__(self, config: Dict):
         # Support both old and new config structures
         self.config = config.get('pullback_requirements', 
                                 config.get('pullback_detection', {}))
         self.old_config = config.get('pullback_detection', {})
 
-    def measure(self, impulse: Dict, df: pd.DataFrame) -> Optional[Dict]:
-        """
-        Measures if a pullback following an impulse is valid.
-        """
-        start_idx = impulse['end_idx'] + 1
-        # Увеличиваем до 48 часов (2 дня на H1), чтобы ловить долгие боковики
-        max_duration = 48 
-        
+    def _thresholds(self):
         # New config keys
         fib_min = self.config.get('min_retracement', 
                                  self.old_config.get('fib_range', {}).get('min', 0.50))
         fib_max = self.config.get('max_retracement', 
                                  self.old_config.get('fib_range', {}).get('max', 0.705))
-        
         touch_50_required = self.config.get('touch_50_level', False)
+        return fib_min, fib_max, touch_50_required
+
+    def measure(self, impulse: Dict, df: pd.DataFrame) -> Optional[Dict]:
+        """
+        Measures if a pullback following an impulse is valid.
+        Slice-by-slice reference for measure_batch, which the detector uses.
+        """
+        start_idx = impulse['end_idx'] + 1
+        max_duration = self.MAX_DURATION
+        fib_min, fib_max, touch_50_required = self._thresholds()
         
         if start_idx >= len(df):
             return None
@@ -38,16 +43,18 @@ class PullbackMeasurer:
                 break
                 
             window = df.iloc[start_idx : current_idx + 1]
+            window_low = window['low'].min()
+            window_high = window['high'].max()
             
             if impulse['type'] == 'bullish':
-                pullback_low = window['low'].min()
+                pullback_low = window_low
                 if pullback_low < impulse_low:
                     return None
                     
                 retracement = (impulse_high - pullback_low) / impulse_range
                 
                 # Check touch 50 level if required
-                touched_50 = (impulse_high - window['low'].min()) / impulse_range >= 0.5
+                touched_50 = (impulse_high - window_low) / impulse_range >= 0.5
                 if touch_50_required and not touched_50:
                     continue
                 
@@ -57,17 +64,17 @@ class PullbackMeasurer:
                         'end_idx': current_idx,
                         'depth': retracement,
                         'low': pullback_low,
-                        'high': window['high'].max(),
+                        'high': window_high,
                         'touched_50': touched_50
                     }
             else: # bearish
-                pullback_high = window['high'].max()
+                pullback_high = window_high
                 if pullback_high > impulse_high:
                     return None
                     
                 retracement = (pullback_high - impulse_low) / impulse_range
                 
-                touched_50 = (window['high'].max() - impulse_low) / impulse_range >= 0.5
+                touched_50 = (window_high - impulse_low) / impulse_range >= 0.5
                 if touch_50_required and not touched_50:
                     continue
                 
@@ -77,8 +84,72 @@ class PullbackMeasurer:
                         'end_idx': current_idx,
                         'depth': retracement,
                         'high': pullback_high,
-                        'low': window['low'].min(),
+                        'low': window_low,
                         'touched_50': touched_50
                     }
                     
         return None
+
+    def measure_batch(self, impulses: List[Dict], df: pd.DataFrame) -> List[Optional[Dict]]:
+        """
+        Array version of measure() for all impulses of a symbol at once.
+        Returns one entry per impulse (the measure() dict or None), in order.
+
+        Each row of the (impulses, MAX_DURATION) matrix is the growing pullback
+        window; running low/high come from minimum/maximum.accumulate and the
+        answer is the first bar that either invalidates or qualifies.
+        """
+        if not impulses:
+            return []
+
+        n = len(df)
+        fib_min, fib_max, touch_50_required = self._thresholds()
+        lows = df['low'].values.astype(np.float64)
+        highs = df['high'].values.astype(np.float64)
+
+        start = np.array([imp['end_idx'] + 1 for imp in impulses], dtype=np.int64)
+        imp_high = np.array([imp['high'] for imp in impulses], dtype=np.float64)[:, None]
+        imp_low = np.array([imp['low'] for imp in impulses], dtype=np.float64)[:, None]
+        imp_range = np.array([imp['range'] for imp in impulses], dtype=np.float64)[:, None]
+        bullish = np.array([imp['type'] == 'bullish' for imp in impulses])[:, None]
+
+        idx = start[:, None] + np.arange(self.MAX_DURATION)
+        in_bounds = idx < n
+        safe = np.minimum(idx, n - 1)
+        run_low = np.minimum.accumulate(np.where(in_bounds, lows[safe], np.inf), axis=1)
+        run_high = np.maximum.accumulate(np.where(in_bounds, highs[safe], -np.inf), axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            retracement = np.where(bullish, (imp_high - run_low) / imp_range,
+                                   (run_high - imp_low) / imp_range)
+        broken = np.where(bullish, run_low < imp_low, run_high > imp_high) & in_bounds
+        # touched_50 в measure() считается той же формулой, что и retracement
+        touched_50 = retracement >= 0.5
+        ok = in_bounds & (fib_min <= retracement) & (retracement <= fib_max)
+        if touch_50_required:
+            ok &= touched_50
+
+        stop = broken | ok
+        has_stop = stop.any(axis=1)
+        k = stop.argmax(axis=1)
+
+        results = []
+        for row, imp in enumerate(impulses):
+            j = k[row]
+            if not has_stop[row] or broken[row, j]:
+                results.append(None)
+                continue
+            result = {
+                'start_idx': int(start[row]),
+                'end_idx': int(idx[row, j]),
+                'depth': retracement[row, j],
+            }
+            if imp['type'] == 'bullish':
+                result['low'] = run_low[row, j]
+                result['high'] = run_high[row, j]
+            else:
+                result['high'] = run_high[row, j]
+                result['low'] = run_low[row, j]
+            result['touched_50'] = touched_50[row, j]
+            results.append(result)
+        return results
@@ -0,0 +1,48 @@
+import pandas as pd
+import numpy as np
+from typing import Union
+
+IndexLike = Union[int, np.ndarray]
+
+
+class RangeExtremaIndex:
+    """
+    Sparse tables answering "max high / min low over bars [a, b]" (inclusive)
+    in O(1). Built once per DataFrame in O(n log n) and shared by impulse
+    detection and the success check.
+
+    Queries accept scalars or integer arrays of equal shape.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.n = len(df)
+        self._max_high = self._build(df['high'].values, np.maximum)
+        self._min_low = self._build(df['low'].values, np.minimum)
+
+    def _build(self, values: np.ndarray, op) -> np.ndarray:
+        """Level k holds op over [i, i + 2**k - 1]; padded to a (levels, n) array."""
+        values = values.astype(np.float64)
+        levels = max(1, self.n.bit_length())
+        table = np.full((levels, self.n), np.nan)
+        table[0] = values
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            width = self.n - (1 << k) + 1
+            table[k, :width] = op(table[k - 1, :width], table[k - 1, half:half + width])
+        return table
+
+    @staticmethod
+    def _level(length: IndexLike) -> IndexLike:
+        if np.isscalar(length):
+            return int(length).bit_length() - 1
+        return np.floor(np.log2(length)).astype(np.int64)
+
+    def _query(self, table: np.ndarray, op, a: IndexLike, b: IndexLike):
+        k = self._level(b - a + 1)
+        span = (1 << k) if np.isscalar(k) else np.left_shift(1, k)
+        return op(table[k, a], table[k, b - span + 1])
+
+    def max_high(self, a: IndexLike, b: IndexLike):
+        return self._query(self._max_high, np.maximum, a, b)
+
+    def min_low(self, a: IndexLike, b: IndexLike):
+        return self._query(self._min_low, np.minimum, a, b)
@@ -0,0 +1,193 @@
+import pandas as pd
+import numpy as np
+from typing import List, Dict, Iterator, Union
+
+# Вложенные поля (impulse/pullback/structure) хранятся как 'impulse.high'
+SEP = '.'
+# Маска наличия для ключей, которые есть не у всех паттернов
+PRESENT = '__has__'
+
+
+def _flatten(record: Dict, prefix: str = '') -> Dict:
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + key + SEP))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def _dtype_of(values: list) -> np.dtype:
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, (bool, np.bool_)):
+        return np.dtype('?')
+    if isinstance(sample, (int, np.integer)):
+        return np.dtype('i8')
+    if isinstance(sample, (float, np.floating)):
+        return np.dtype('f8')
+    if isinstance(sample, str):
+        return np.dtype(f"U{max(1, max(len(v) for v in values if v is not None))}")
+    if isinstance(sample, (pd.Timestamp, np.datetime64)):
+        return np.dtype('M8[ns]')
+    return np.dtype('O')
+
+
+def _fill_value(dtype: np.dtype):
+    return {'?': False, 'i': 0, 'f': np.nan, 'U': '', 'M': np.datetime64('NaT')}.get(dtype.kind)
+
+
+def _scalar(value, dtype: np.dtype):
+    """Back to the type the detectors put into the dicts."""
+    if dtype.kind == 'M':
+        return pd.Timestamp(value)
+    if dtype.kind in 'i?U':
+        return value.item()
+    return value
+
+
+class PatternTable:
+    """
+    Columnar storage for detected patterns: one NumPy structured array
+    instead of a list of nested dicts.
+
+    Columns are the flattened dict keys ('impulse.high', 'structure.entry_idx',
+    'entry_price', ...). table[i] and iteration rebuild the legacy dict
+    lazily, table['col'] returns the whole column as an array.
+    """
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+    @classmethod
+    def from_records(cls, patterns: List[Dict]) -> 'PatternTable':
+        flat = [_flatten(p) for p in patterns]
+        names = []
+        for row in flat:
+            for key in row:
+                if key not in names:
+                    names.append(key)
+
+        fields = []
+        columns = {}
+        for name in names:
+            values = [row.get(name) for row in flat]
+            dtype = _dtype_of(values)
+            fields.append((name, dtype))
+            columns[name] = [_fill_value(dtype) if v is None else v for v in values]
+            if any(name not in row for row in flat):
+                fields.append((PRESENT + name, np.dtype('?')))
+                columns[PRESENT + name] = [name in row for row in flat]
+
+        data = np.empty(len(flat), dtype=fields)
+        for name, values in columns.items():
+            if data.dtype[name].kind == 'M':
+                values = [np.datetime64(pd.Timestamp(v), 'ns') if v is not None else v for v in values]
+            data[name] = values
+        return cls(data)
+
+    @classmethod
+    def concat(cls, tables: List['PatternTable']) -> 'PatternTable':
+        """Stacks tables with the same columns (e.g. one per symbol)."""
+        tables = [t for t in tables if len(t)]
+        if not tables:
+            return cls(np.empty(0))
+        return cls(np.concatenate([t.data for t in tables]))
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name in (self.data.dtype.names or ()) if not name.startswith(PRESENT)]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key) -> Union[Dict, np.ndarray, 'PatternTable']:
+        if isinstance(key, str):
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            return self._row(self.data[key])
+        return PatternTable(self.data[key])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in self.data:
+            yield self._row(row)
+
+    def _row(self, row) -> Dict:
+        out = {}
+        dtype = self.data.dtype
+        for name in self.columns:
+            if PRESENT + name in dtype.names and not row[PRESENT + name]:
+                continue
+            target = out
+            *groups, key = name.split(SEP)
+            for group in groups:
+                target = target.setdefault(group, {})
+            target[key] = _scalar(row[name], dtype[name])
+        return out
+
+    def with_column(self, name: str, values) -> 'PatternTable':
+        """Copy with one column set (added if missing), e.g. 'symbol'."""
+        values = np.broadcast_to(np.asarray(values), (len(self),))
+        names = self.data.dtype.names or ()
+        # Строковые колонки расширяются под более длинные значения
+        fields = [(field, np.result_type(self.data.dtype[field], values.dtype) if field == name
+                   else self.data.dtype[field]) for field in names]
+        if name not in names:
+            fields.append((name, values.dtype))
+        data = np.empty(len(self), dtype=fields)
+        for field in names:
+            data[field] = self.data[field]
+        data[name] = values
+        return PatternTable(data)
+
+    def to_dicts(self) -> List[Dict]:
+        return list(self)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Every column, presence masks included, e.g. to store as parquet."""
+        return pd.DataFrame({name: self.data[name] for name in (self.data.dtype.names or ())})
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'PatternTable':
+        """Inverse of to_frame (string columns come back as fixed-width unicode)."""
+        if not len(df.columns):
+            return cls(np.empty(0))
+        fields = []
+        columns = {}
+        for name in df.columns:
+            values = df[name].to_numpy()
+            if values.dtype.kind == 'M':
+                values = values.astype('M8[ns]')
+            elif values.dtype.kind not in '?biuf':
+                values = np.array([str(v) for v in values], dtype=str)
+                if values.dtype.itemsize == 0:
+                    values = values.astype('U1')
+            fields.append((name, values.dtype))
+            columns[name] = values
+        data = np.empty(len(df), dtype=fields)
+        for name, values in columns.items():
+            data[name] = values
+        return cls(data)
+
+
+_MISSING = object()
+
+
+def pattern_column(patterns: Union[PatternTable, List[Dict]], name: str, default=_MISSING) -> np.ndarray:
+    """
+    One field for every pattern as an array, from either a PatternTable or a
+    list of dicts; nested fields are addressed as 'structure.entry_idx'.
+    With a default, patterns without the field get it instead of a KeyError.
+    """
+    if isinstance(patterns, PatternTable):
+        if default is not _MISSING and name not in patterns.columns:
+            return np.array([default] * len(patterns))
+        return patterns[name]
+    values = []
+    for p in patterns:
+        for key in name.split(SEP):
+            if default is not _MISSING and key not in p:
+                p = default
+                break
+            p = p[key]
+        values.append(p)
+    return np.array(values)
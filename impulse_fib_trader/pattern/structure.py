@@ -1,7 +1,11 @@
 import pandas as pd
-from typing import Dict, Optional
+import numpy as np
+from typing import List, Dict, Optional
 
 class StructureValidator:
+    # Строк на один блок в validate_batch, чтобы матрица не разрасталась
+    BATCH_ROWS = 4096
+
     def __init__(self, config: Dict):
         self.config = config.get('entry_trigger', 
                                 config.get('structure_requirements', {}))
@@ -10,6 +14,7 @@ class StructureValidator:
     def validate(self, impulse: Dict, pullback: Dict, df: pd.DataFrame) -> Optional[Dict]:
         """
         Validates the entry based on the trigger type.
+        Candle-by-candle reference for validate_batch, which the detector uses.
         """
         start_idx = pullback['end_idx'] + 1
         max_bars = self.risk_config.get('max_bars_in_trade', 40)
@@ -60,3 +65,70 @@ class StructureValidator:
                         }
                     
         return None
+
+    def validate_batch(self, impulses: List[Dict], pullbacks: List[Dict], df: pd.DataFrame) -> List[Optional[Dict]]:
+        """
+        Validates every (impulse, pullback) pair of a symbol at once.
+        Returns one entry per pair (the validate() dict or None), in order.
+
+        Close/high/low for the max_bars_in_trade bars after each pullback are
+        gathered into a matrix (in blocks of BATCH_ROWS pairs) and the first
+        qualifying bar per row is found with argmax over the trigger mask.
+        """
+        if not impulses:
+            return []
+
+        n = len(df)
+        max_bars = self.risk_config.get('max_bars_in_trade', 40)
+        trigger_type = self.config.get('type', 'close_beyond_structure')
+        closes = df['close'].values.astype(np.float64)
+        highs = df['high'].values.astype(np.float64)
+        lows = df['low'].values.astype(np.float64)
+
+        start = np.array([pb['end_idx'] + 1 for pb in pullbacks], dtype=np.int64)
+        bullish = np.array([imp['type'] == 'bullish' for imp in impulses])
+        if trigger_type == 'false_break_wick_only':
+            level = np.array([pb['low'] if bull else pb['high']
+                              for pb, bull in zip(pullbacks, bullish)], dtype=np.float64)
+        else:
+            level = np.array([imp['high'] if bull else imp['low']
+                              for imp, bull in zip(impulses, bullish)], dtype=np.float64)
+
+        results = []
+        for lo in range(0, len(impulses), self.BATCH_ROWS):
+            rows = slice(lo, lo + self.BATCH_ROWS)
+            idx = start[rows, None] + np.arange(max_bars)
+            in_bounds = idx < n
+            safe = np.minimum(idx, n - 1)
+            close = closes[safe]
+            bull = bullish[rows, None]
+            lvl = level[rows, None]
+
+            if trigger_type == 'false_break_wick_only':
+                hit = np.where(bull, (lows[safe] < lvl) & (close > lvl),
+                               (highs[safe] > lvl) & (close < lvl))
+            else:
+                hit = np.where(bull, close > lvl, close < lvl)
+            hit &= in_bounds
+
+            has_hit = hit.any(axis=1)
+            first = idx[np.arange(len(idx)), hit.argmax(axis=1)]
+            for row in range(len(idx)):
+                if not has_hit[row]:
+                    results.append(None)
+                    continue
+                i = int(first[row])
+                if trigger_type == 'false_break_wick_only':
+                    results.append({
+                        'entry_idx': i,
+                        'entry_price': closes[i],
+                        'confirmation': 'false_break_wick_only',
+                        'stop_loss': lows[i] - 0.0001 if bull[row, 0] else highs[i] + 0.0001
+                    })
+                else:
+                    results.append({
+                        'entry_idx': i,
+                        'entry_price': closes[i],
+                        'confirmation': 'close_beyond_high' if bull[row, 0] else 'close_beyond_low'
+                    })
+        return results
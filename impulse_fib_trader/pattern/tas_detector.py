@@ -1,12 +1,212 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+# Фазы TAS
+SEEK_TAIL, RETRACE, SHELF = 0, 1, 2
+
+
+class TASDetector:
+    """
+    Tails & Shelves (config/pattern_spec_tas.json) as a single forward pass:
+    initial drop -> liquidity tail -> sharp retracement -> shelf -> breakout.
+
+    Every bar is handled at most twice (once in its phase and once more from
+    SEEK_TAIL when that phase fails), so detection is O(n) in the number of bars.
+    """
+    # Меняется вместе с логикой поиска: сбрасывает кэш паттернов (data/cache.py)
+    VERSION = 1
 
-class ImpulseRejectionDetector:
     def __init__(self, config: Dict):
         self.config = config
+        drop = config.get('phase_1_initial_drop', {}).get('momentum_criteria', {})
+        wick = config.get('phase_2_liquidity_tail', {}).get('extreme_criteria', {}).get('wick_characteristics', {})
+        retr = config.get('phase_3_sharp_retracement', {}).get('breakout_level_calculation', {})
+        shelf = config.get('phase_4_shelf_formation', {}).get('shelf_characteristics', {})
+        candle = config.get('entry_trigger', {}).get('aggressive_entry', {}).get('candle_specifications', {})
+        stop = config.get('risk_management', {}).get('stop_loss', {})
+
+        self.min_bearish = drop.get('min_consecutive_bearish', 2)
+        self.lower_wick_ratio = wick.get('lower_wick_ratio', 0.40)
+        self.body_position = wick.get('body_position', 0.66)
+        self.min_move = retr.get('min_move_percent', 0.005)
+        self.max_move = retr.get('max_move_percent', 0.05)
+        self.max_retrace_bars = retr.get('candle_requirements', {}).get('count', 3)
+        self.max_deviation_atr = shelf.get('test_of_extreme', {}).get('max_deviation_atr', 0.3)
+        self.shelf_min = shelf.get('consolidation', {}).get('min_candles', 3)
+        self.shelf_max = shelf.get('consolidation', {}).get('max_candles', 8)
+        self.entry_body_ratio = candle.get('body_ratio', 0.70)
+        self.entry_close_position = candle.get('close_position', 0.9)
+        self.sl_buffer_atr = stop.get('buffer_atr', 0.15)
 
     def detect_patterns(self, df: pd.DataFrame) -> List[Dict]:
+        """
+        Returns one dict per breakout: tail_low, breakout_level, shelf_low,
+        entry_idx, entry_price, sl and the entry bar timestamp.
+        """
+        patterns = []
+        n = len(df)
+        if n < self.min_bearish + 3:
+            return patterns
+
+        opens = df['open'].values.astype(np.float64).tolist()
+        highs = df['high'].values.astype(np.float64).tolist()
+        lows = df['low'].values.astype(np.float64).tolist()
+        closes = df['close'].values.astype(np.float64).tolist()
+        atr = df['atr'].values.astype(np.float64).tolist()
+        stamps = df['timestamp'].values if 'timestamp' in df.columns else df.index.values
+
+        phase = SEEK_TAIL
+        bear_run = 0 # медвежьих свечей подряд перед текущей
+        run_low = float('inf')
+        tail_low = retr_high = shelf_low = 0.0
+        retr_bars = shelf_bars = 0
+
+        for i in range(n):
+            o, h, l, c = opens[i], highs[i], lows[i], closes[i]
+            rng = h - l
+
+            if phase == RETRACE:
+                if l < tail_low:
+                    phase = SEEK_TAIL
+                elif h > retr_high and retr_bars < self.max_retrace_bars:
+                    retr_high = h
+                    retr_bars += 1
+                    if retr_bars == self.max_retrace_bars and not self._move_ok(tail_low, retr_high):
+                        phase = SEEK_TAIL
+                    bear_run, run_low = self._bear_step(o, c, l, bear_run, run_low)
+                    continue
+                elif retr_bars > 0 and self._move_ok(tail_low, retr_high):
+                    # Откат закончился: уровень пробоя зафиксирован, бар уже часть полки
+                    phase = SHELF
+                    shelf_bars = 0
+                    shelf_low = float('inf')
+                else:
+                    phase = SEEK_TAIL
+
+            if phase == SHELF:
+                if c > retr_high:
+                    if (shelf_bars >= self.shelf_min and rng > 0
+                            and abs(c - o) / rng >= self.entry_body_ratio
+                            and (c - l) / rng >= self.entry_close_position):
+                        patterns.append({
+                            'symbol': 'UNKNOWN',
+                            'type': 'TAS',
+                            'side': 'bullish',
+                            'tail_low': tail_low,
+                            'breakout_level': retr_high,
+                            'shelf_low': shelf_low,
+                            'entry_idx': i,
+                            'entry_price': c,
+                            'sl': min(tail_low, shelf_low) - self.sl_buffer_atr * atr[i],
+                            'timestamp': stamps[i]
+                        })
+                    phase = SEEK_TAIL
+                elif (c > tail_low and l >= tail_low - self.max_deviation_atr * atr[i]
+                        and shelf_bars < self.shelf_max):
+                    shelf_bars += 1
+                    shelf_low = min(shelf_low, l)
+                    bear_run, run_low = self._bear_step(o, c, l, bear_run, run_low)
+                    continue
+                else:
+                    phase = SEEK_TAIL
+
+            # SEEK_TAIL: хвост после серии медвежьих свечей, на новом минимуме серии
+            if (bear_run >= self.min_bearish and rng > 0 and l <= run_low
+                    and (min(o, c) - l) / rng >= self.lower_wick_ratio
+                    and (c - l) / rng >= self.body_position):
+                phase = RETRACE
+                tail_low = l
+                retr_high = h
+                retr_bars = 0
+            bear_run, run_low = self._bear_step(o, c, l, bear_run, run_low)
+
+        return patterns
+
+    def _move_ok(self, tail_low: float, retr_high: float) -> bool:
+        if tail_low <= 0:
+            return False
+        move = (retr_high - tail_low) / tail_low
+        return self.min_move <= move <= self.max_move
+
+    @staticmethod
+    def _bear_step(o: float, c: float, l: float, bear_run: int, run_low: float):
+        if c < o:
+            return bear_run + 1, min(run_low, l) if bear_run else l
+        return 0, float('inf')
+
+
+
+class ImpulseRejectionDetector:
+    VERSION = 1
+
+    def __init__(self, config: Dict):
+        self.config = config
+
+    def detect_patterns(self, df: pd.DataFrame, last_n: Optional[int] = None) -> List[Dict]:
+        """
+        Vectorized version of _detect_patterns_loop with identical output.
+        Uses df['ema_200'] from calculate_indicators when it is there.
+
+        last_n: only evaluate the last N candidate bars (live scanning);
+        None scans the whole frame.
+        """
+        patterns = []
+        n = len(df)
+        if n < 200: return patterns
+
+        first = 50
+        if last_n is not None:
+            first = max(first, n - 1 - last_n)
+        if first >= n - 1: return patterns
+        # Контекст: 5 свечей назад для серии медвежьих
+        lo = first - 5
+
+        opens = df['open'].values[lo:].astype(np.float64)
+        highs = df['high'].values[lo:].astype(np.float64)
+        lows = df['low'].values[lo:].astype(np.float64)
+        closes = df['close'].values[lo:].astype(np.float64)
+        if 'ema_200' in df.columns:
+            ema_200 = df['ema_200'].values[lo:].astype(np.float64)
+        else:
+            ema_200 = df['close'].ewm(span=200, adjust=False).mean().values[lo:]
+
+        # Кандидаты i = first .. n-2 соответствуют позициям 5 .. m-2 в срезе
+        m = len(closes)
+        cur = slice(5, m - 1)
+        o, h, l, c = opens[cur], highs[cur], lows[cur], closes[cur]
+
+        # 1. ТРЕНД
+        trend = ~(c < ema_200[cur])
+        # 2. ОТКАТ: медвежьих в [i-5, i) не меньше 3
+        bearish = np.cumsum(np.r_[0, (closes < opens).astype(np.int64)])
+        bearish_count = bearish[5:m - 1] - bearish[0:m - 6]
+        # 3. ХВОСТ
+        candle_range = h - l
+        with np.errstate(invalid='ignore', divide='ignore'):
+            wick_ratio = (np.minimum(o, c) - l) / candle_range
+            body_pos = (np.maximum(o, c) - l) / candle_range
+        # 4. ПОДТВЕРЖДЕНИЕ: среднее трех закрытий, сложенных в том же порядке, что и в pandas
+        mean_3 = ((closes[2:m - 4] + closes[3:m - 3]) + closes[4:m - 2]) / 3
+
+        hit = (trend & (bearish_count >= 3) & (candle_range != 0)
+               & (wick_ratio >= 0.40) & (body_pos >= 0.50) & (c > mean_3))
+
+        for k in np.flatnonzero(hit):
+            i = first + int(k)
+            patterns.append({
+                'symbol': 'UNKNOWN',
+                'type': 'Impulse_Rejection',
+                'side': 'bullish',
+                'entry_idx': i,
+                'entry_price': c[k],
+                'sl': l[k] * 0.998, # Небольшой запас под хвост
+                'timestamp': df.index[i]
+            })
+        return patterns
+
+    def _detect_patterns_loop(self, df: pd.DataFrame) -> List[Dict]:
+        """Bar-by-bar reference implementation of detect_patterns."""
         patterns = []
         if len(df) < 200: return patterns
 
@@ -0,0 +1,105 @@
+import argparse
+import logging
+import json
+import os
+import pandas as pd
+from data.fetcher import DataFetcher
+from data.cleaner import DataCleaner
+from data.storage import timeframe_ms, last_bar_forming
+from pattern.tas_detector import TASDetector
+from pattern.records import PatternTable, pattern_column
+from features.engineer import FeatureEngineer
+from features.labels import Labeler, LABEL_HORIZON
+from ml.train import MLTrainer
+from ml.registry import ModelRegistry
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Истории до отсечки хватает, чтобы EMA 200 и ATR успели разогреться
+WARMUP_BARS = 500
+
+
+def new_examples(fetcher, symbol, timeframe, since, detector, fe, labeler):
+    """Features, labels and times of patterns entered after `since` whose labels are final."""
+    start = int(since.value // 10**6) - WARMUP_BARS * timeframe_ms(timeframe)
+    df = fetcher.fetch_range(symbol, timeframe, start)
+    if df.empty:
+        return None
+    if last_bar_forming(df, timeframe):
+        df = df.iloc[:-1]
+    df = DataCleaner.calculate_indicators(DataCleaner.validate_data(df))
+
+    patterns = PatternTable.from_records(detector.detect_patterns(df))
+    if not len(patterns):
+        return None
+    times = pd.Series(pattern_column(patterns, 'timestamp'))
+    mature = (times >= since).values & (pattern_column(patterns, 'entry_idx') + LABEL_HORIZON < len(df))
+    patterns = patterns[mature]
+    if not len(patterns):
+        return None
+    return fe.extract_features(patterns, df), labeler.create_labels(patterns, df), times[mature]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continue boosting the active model on patterns since its cutoff")
+    parser.add_argument('--config', default=os.path.join(BASE_DIR, 'config', 'pattern_spec_tas.json'))
+    parser.add_argument('--models', default=os.path.join(BASE_DIR, 'models'), help="model registry dir")
+    parser.add_argument('--name', default='tas')
+    parser.add_argument('--symbols', nargs='+', default=[
+        'BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'ADA/USDT', 'XRP/USDT', 'LTC/USDT',
+        'LINK/USDT', 'SOL/USDT', 'MATIC/USDT', 'DOT/USDT', 'AVAX/USDT', 'DOGE/USDT'])
+    parser.add_argument('--timeframe', default='1h')
+    parser.add_argument('--since', default=None, help="override the cutoff stored in the model manifest")
+    parser.add_argument('--trees', type=int, default=50, help="trees added per refresh")
+    parser.add_argument('--holdout', type=float, default=0.2, help="most recent share of new rows kept for validation")
+    parser.add_argument('--force', action='store_true', help="activate even if holdout logloss got worse")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    registry = ModelRegistry(args.models)
+    booster, manifest = registry.load(args.name, features=FeatureEngineer.FEATURE_COLUMNS, config=config)
+    window = manifest.get('train_window') or [None, None]
+    since = pd.Timestamp(args.since or window[1])
+    logger.info(f"Refreshing {args.name}/{manifest['version']} with patterns since {since}")
+
+    fetcher = DataFetcher()
+    detector = TASDetector(config)
+    fe = FeatureEngineer()
+    labeler = Labeler(config)
+    parts = []
+    for symbol in args.symbols:
+        part = new_examples(fetcher, symbol, args.timeframe, since, detector, fe, labeler)
+        if part is not None:
+            parts.append(part)
+            logger.info(f"{symbol}: {len(part[0])} новых примеров")
+
+    if not parts:
+        logger.info("Новых размеченных паттернов нет, модель не меняется")
+        return
+    X = pd.concat([p[0] for p in parts], ignore_index=True)
+    y = pd.concat([p[1] for p in parts], ignore_index=True)
+    times = pd.concat([p[2] for p in parts], ignore_index=True)
+
+    if MLTrainer.holdout_split(len(X), args.holdout) is None:
+        # Например, один новый паттерн за ночь: ждем, пока примеров хватит на обучение и holdout
+        logger.info(f"Всего {len(X)} новых примеров, мало для обучения и holdout - модель не меняется")
+        return
+
+    trainer = MLTrainer()
+    model, result = trainer.refresh(X, y, times, booster=booster, n_trees=args.trees, holdout_fraction=args.holdout)
+    if not (result['improved'] or args.force):
+        logger.warning("Holdout LogLoss вырос, новая версия не активирована")
+    # Отложенный holdout попадет в обучение следующего обновления
+    version = registry.save(model, args.name, config=config,
+                            window=(window[0], result['holdout_from'].isoformat()),
+                            metrics={'refreshed_from': manifest['version'], 'before': result['before'],
+                                     'after': result['after'], 'new_rows': len(X)},
+                            activate=result['improved'] or args.force, features=FeatureEngineer.FEATURE_COLUMNS)
+    logger.info(f"Saved {args.name}/{version} ({result['trees']} trees)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import logging
+import json
+import os
+from features.engineer import FeatureEngineer
+from ml.train import MLTrainer
+from ml.registry import ModelRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a pickled model (.joblib) into the model registry")
+    parser.add_argument('model_path', help="joblib file saved by MLTrainer.save_model")
+    parser.add_argument('--name', required=True, help="registry name: 'tas' for the bot, 'impulse' for the scanner")
+    parser.add_argument('--config', default=None, help="pattern spec the model was trained with")
+    parser.add_argument('--window', nargs=2, default=None, metavar=('START', 'END'), help="training window")
+    parser.add_argument('--models', default=os.path.join(BASE_DIR, 'models'), help="model registry dir")
+    args = parser.parse_args()
+
+    config = None
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+
+    trainer = MLTrainer()
+    trainer.load_model(args.model_path)
+    version = ModelRegistry(args.models).save(trainer.model, args.name, config=config, window=args.window,
+                                              metrics={'imported_from': os.path.basename(args.model_path)},
+                                              features=FeatureEngineer.FEATURE_COLUMNS)
+    logger.info(f"{args.model_path} -> {args.name}/{version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
+import asyncio
 import logging
 import json
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from data.fetcher import DataFetcher
-from data.cleaner import DataCleaner
+from data.fetcher import AsyncDataFetcher
+from data.cleaner import DataCleaner, IndicatorEngine
+from data.storage import DataStorage, timeframe_ms, last_bar_forming
 from pattern.detector import PatternDetector
 from features.engineer import FeatureEngineer
-from ml.train import MLTrainer
+from ml.registry import ModelRegistry
+from ml.predict import DECISION_THRESHOLD, predict_proba_batch
 import os
 import time
 
@@ -14,66 +18,121 @@ import time
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Реестр общий с ботом. Модель 'impulse' попадает туда из pickle командой
+#   python register_model.py trained_model.joblib --name impulse --config config/pattern_spec.json
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+
 class MarketScanner:
-    def __init__(self, config_path: str, model_path: str):
-        self.fetcher = DataFetcher()
+    def __init__(self, config_path: str, model_path: str = None, max_concurrency: int = 20, candles_dir: str = 'candles',
+                 model_name: str = 'impulse', models_dir: str = MODELS_DIR):
+        self.max_concurrency = max_concurrency
+        self.store = DataStorage(candles_dir)
         self.cleaner = DataCleaner()
+        self.indicators = IndicatorEngine()
         self.detector = PatternDetector(config_path)
         self.fe = FeatureEngineer()
-        self.trainer = MLTrainer()
+        self.registry = ModelRegistry(models_dir)
+        self.model_name = model_name
+        self.legacy_model = None
         
         with open(config_path, 'r') as f:
             self.config = json.load(f)
             
-        if os.path.exists(model_path):
-            self.trainer.load_model(model_path)
+        if self._model() is not None:
+            print(f"Успешно загружена ML-модель: {model_name}/{self.registry.latest(model_name)}")
+        elif model_path and os.path.exists(model_path):
+            # Старый формат: pickle XGBClassifier, пока модель не сохранена в реестр
+            from ml.train import MLTrainer
+            trainer = MLTrainer()
+            trainer.load_model(model_path)
+            self.legacy_model = trainer.model
             print(f"Успешно загружена ML-модель: {model_path}")
         else:
             print("Ошибка: Файл модели не найден! Сначала запустите python main.py")
             exit(1)
 
+    def _model(self):
+        # Реестр проверяется на каждом скане: активированная версия подхватывается без перезапуска
+        model = self.registry.current(self.model_name, FeatureEngineer.FEATURE_COLUMNS, self.config)
+        return model if model is not None else self.legacy_model
+
     def scan_market(self, timeframe: str = '1h', lookback: int = 3):
-        symbols = self.fetcher.get_active_symbols()
-        print(f"Сканирование {len(symbols)} пар на спотовом рынке ({timeframe})...")
-        
-        signals = []
-        # Берем данные за последние 7 дней, этого достаточно для H1 паттерна
-        start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+        return asyncio.run(self._scan_market_async(timeframe, lookback))
 
-        for i, symbol in enumerate(symbols):
-            if i % 50 == 0:
-                print(f"Прогресс: {i}/{len(symbols)}...")
-                
-            try:
-                df = self.fetcher.fetch_ohlcv(symbol, timeframe, start_date)
-                if df.empty or len(df) < 40: continue
-                
-                df = self.cleaner.validate_data(df)
-                df = self.cleaner.calculate_indicators(df)
-                df = self.cleaner.identify_swings(df)
-                
-                patterns = self.detector.detect_patterns(df)
-                if not patterns: continue
-                
-                # Используем lookback для фильтрации свежести паттернов
-                latest_patterns = [p for p in patterns if p['structure']['entry_idx'] >= len(df) - lookback]
+    async def _scan_market_async(self, timeframe: str, lookback: int):
+        # Асинхронный клиент привязан к event loop, поэтому создаем его на каждый скан
+        fetcher = AsyncDataFetcher(max_concurrency=self.max_concurrency)
+        try:
+            symbols = await fetcher.get_active_symbols()
+            print(f"Сканирование {len(symbols)} пар на спотовом рынке ({timeframe})...")
+            
+            # Кандидаты всех пар копятся и оцениваются моделью одним вызовом
+            candidates = []
+            # Берем данные за последние 7 дней, этого достаточно для H1 паттерна.
+            # Уже сохраненные свечи читаются с диска, с биржи качается только хвост
+            start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+            tail_bars = 7 * 24 * 3600 * 1000 // timeframe_ms(timeframe)
+            since = {s: self.store.next_since(s, timeframe) for s in symbols}
+
+            i = 0
+            async for symbol, fresh in fetcher.stream_ohlcv(symbols, timeframe, start_date, since=since):
+                if i % 50 == 0:
+                    print(f"Прогресс: {i}/{len(symbols)}...")
+                i += 1
                 
-                if latest_patterns:
-                    X = self.fe.extract_features(latest_patterns, df)
-                    preds = self.trainer.model.predict(X)
-                    probs = self.trainer.model.predict_proba(X)
+                try:
+                    df = self.store.update_tail(symbol, timeframe, fresh, tail_bars)
+                    self._scan_symbol(symbol, df, timeframe, lookback, candidates)
+                except Exception:
+                    continue # Игнорируем ошибки для отдельных пар
                     
-                    for idx, p in enumerate(latest_patterns):
-                        if preds[idx] == 1:
-                            signals.append({
-                                'symbol': symbol,
-                                'pattern': p,
-                                'ml_prob': float(probs[idx][1])
-                            })
-                            
-            except Exception:
-                continue # Игнорируем ошибки для отдельных пар
-                
+            return self._score(candidates)
+        finally:
+            await fetcher.close()
+
+    def _scan_symbol(self, symbol: str, df: pd.DataFrame, timeframe: str, lookback: int, candidates: list):
+        if df.empty or len(df) < 40: return
+        
+        df = self.cleaner.validate_data(df)
+        # Индикаторы досчитываются только по новым закрытым свечам
+        df = self.indicators.apply(symbol, df, forming_last=last_bar_forming(df, timeframe))
+        df = self.cleaner.identify_swings(df)
+        
+        # Ищем только паттерны со входом в последних lookback свечах
+        latest_patterns = self.detector.detect_live(df, lookback)
+        
+        if latest_patterns:
+            X = self.fe.extract_features(latest_patterns, df)
+            # Битые признаки отсеиваются здесь, где ошибка пропускает только эту пару
+            X = X[FeatureEngineer.FEATURE_COLUMNS].astype(np.float32)
+            if len(X) != len(latest_patterns):
+                raise ValueError(f"{symbol}: {len(X)} feature rows for {len(latest_patterns)} patterns")
+            candidates.append((symbol, latest_patterns, X))
+
+    def _score(self, candidates: list) -> list:
+        """Signals for the candidates the model assigns to class 1, from one batched prediction."""
+        model = self._model()
+        try:
+            probs = predict_proba_batch(model, [X for _, _, X in candidates])
+        except Exception as e:
+            # Одна пара не должна обнулять весь скан: оцениваем по отдельности, пропуская сбойные
+            logger.warning(f"Batched scoring failed ({e}), scoring symbols one by one")
+            probs = []
+            for symbol, _, X in candidates:
+                try:
+                    probs.append(predict_proba_batch(model, [X])[0])
+                except Exception:
+                    probs.append(np.zeros(0))
+        signals = []
+        for (symbol, patterns, _), symbol_probs in zip(candidates, probs):
+            for p, prob in zip(patterns, symbol_probs):
+                if prob > DECISION_THRESHOLD:
+                    signals.append({
+                        'symbol': symbol,
+                        'pattern': p,
+                        'ml_prob': float(prob)
+                    })
         return signals
 
     def provide_recommendations(self, signals):
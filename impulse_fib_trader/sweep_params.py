@@ -0,0 +1,56 @@
+import argparse
+import logging
+import json
+import os
+from data.storage import DataStorage
+from data.cache import ResultCache
+from backtest.sweep import run_sweep
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Пример сетки: {"impulse_detection.min_atr_multiplier": [1.0, 1.5],
+#                "pullback_requirements.min_retracement": [0.6, 0.75], "rr": [2.0, 2.5]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep for the impulse/pullback strategy")
+    parser.add_argument('--config', default='config/pattern_spec.json', help="base pattern spec")
+    parser.add_argument('--grid', required=True, help="JSON file: {'section.param': [values], 'rr': [...], 'ml_threshold': [...]}")
+    parser.add_argument('--symbols', nargs='+', default=['BTC/USDT', 'ETH/USDT', 'SOL/USDT'])
+    parser.add_argument('--timeframe', default='1h')
+    parser.add_argument('--model', default=None, help="model for ml_threshold points")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (one symbol per task)")
+    parser.add_argument('--sims', type=int, default=1000, help="bootstrap paths per point for confidence intervals (0 = off)")
+    parser.add_argument('--out', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    with open(args.grid, 'r') as f:
+        grid = json.load(f)
+
+    cache = ResultCache()
+    frames = {}
+    for symbol in args.symbols:
+        data_path = f"data_{symbol.replace('/', '_')}_{args.timeframe}.parquet"
+        if not os.path.exists(data_path):
+            logger.warning(f"Data for {symbol} not found. Skipping.")
+            continue
+        df = DataStorage.load_from_parquet(data_path)
+        # Индикаторы считаются один раз на версию файла (как в main.py), а не на каждую точку сетки
+        frames[symbol] = cache.indicators(data_path, df)
+
+    if not frames:
+        print("No data found. Please run main.py first.")
+        return
+
+    results = run_sweep(frames, config, grid, workers=args.workers, model_path=args.model, n_sims=args.sims)
+    results.to_csv(args.out, index=False)
+    logger.info(f"{len(results)} points saved to {args.out}")
+
+    print(results.sort_values('expectancy', ascending=False).head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,14 @@ from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from config.config import BOT_TOKEN, TELEGRAM_PRIVATE_CHAT_ID
-from data.fetcher import DataFetcher
-from data.cleaner import DataCleaner
+from data.fetcher import AsyncDataFetcher
+from data.cleaner import DataCleaner, IndicatorEngine
+from data.storage import DataStorage, last_bar_forming
 from pattern.tas_detector import TASDetector
 from trade_manager import TradeManager
 from features.engineer import FeatureEngineer
-from ml.train import MLTrainer
+from ml.registry import ModelRegistry
+from ml.predict import predict_proba_batch
 
 # Logging
 logging.basicConfig(
@@ -47,22 +49,40 @@ current_chat_id = load_telegram_state()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'pattern_spec_tas.json')
 MODEL_PATH = os.path.join(BASE_DIR, 'trained_model_tas.joblib')
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+MODEL_NAME = 'tas'
+CANDLES_DIR = os.path.join(BASE_DIR, 'candles')
+SCAN_BARS = 5 * 24 # 5 дней H1
 
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
 trade_manager = TradeManager()
 
-fetcher = DataFetcher()
+fetcher = AsyncDataFetcher(max_concurrency=20)
+store = DataStorage(CANDLES_DIR)
 cleaner = DataCleaner()
+indicators = IndicatorEngine()
 fe = FeatureEngineer()
-trainer = MLTrainer()
+registry = ModelRegistry(MODELS_DIR)
+legacy_model = None
 
 with open(CONFIG_PATH, 'r') as f:
     config = json.load(f)
 detector = TASDetector(config)
 
-if os.path.exists(MODEL_PATH):
+def current_model():
+    """Active registry model (swapped in without a restart) or the legacy joblib one."""
+    model = registry.current(MODEL_NAME, FeatureEngineer.FEATURE_COLUMNS, config)
+    return model if model is not None else legacy_model
+
+if current_model() is not None:
+    print(f"✅ Модель TAS загружена: {MODEL_NAME}/{registry.latest(MODEL_NAME)}")
+elif os.path.exists(MODEL_PATH):
+    # Старый pickle, пока модель не сохранена в реестр через main.py
+    from ml.train import MLTrainer
+    trainer = MLTrainer()
     trainer.load_model(MODEL_PATH)
+    legacy_model = trainer.model
     print(f"✅ Модель TAS загружена: {MODEL_PATH}")
 else:
     print(f"⚠️ Модель {MODEL_PATH} не найдена. Бот будет работать без ML фильтра!")
@@ -113,24 +133,31 @@ async def perform_scan_and_trade(show_progress=False):
         await send_notification("🔍 Сканирую рынок на наличие паттернов TAS...")
 
     try:
-        symbols = fetcher.get_active_symbols()
-        total = len(symbols)
+        symbols = await fetcher.get_active_symbols()
         best_setup = None
         max_prob = 0
         
         cooldown_symbols = trade_manager.get_cooldown_symbols(hours=4)
+        active_symbols = {t['symbol'] for t in trade_manager.active_trades}
+        scan_symbols = [s for s in symbols if s not in active_symbols and s not in cooldown_symbols]
+        total = len(scan_symbols)
+        start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
+        candidates = []
+        model = current_model()
 
-        for i, symbol in enumerate(symbols):
-            if any(t['symbol'] == symbol for t in trade_manager.active_trades):
-                continue
-            if symbol in cooldown_symbols:
-                continue
-
-            df = await asyncio.to_thread(fetcher.fetch_ohlcv, symbol, '1h', (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d'))
+        # С биржи качаем только свечи после последней сохраненной, остальное читаем с диска.
+        # Свечи приходят по мере готовности, пока остальные пары еще качаются
+        since = {s: store.next_since(s, '1h') for s in scan_symbols}
+        i = 0
+        async for symbol, fresh in fetcher.stream_ohlcv(scan_symbols, '1h', start_date, since=since):
+            i += 1
+            if i % 50 == 0: print(f"Scanned {i}/{total}...")
+            df = store.update_tail(symbol, '1h', fresh, SCAN_BARS)
             if df.empty or len(df) < 40: continue
             
             df = cleaner.validate_data(df)
-            df = cleaner.calculate_indicators(df)
+            # Индикаторы досчитываются только по новым закрытым свечам
+            df = indicators.apply(symbol, df, forming_last=last_bar_forming(df, '1h'))
             
             patterns = detector.detect_patterns(df)
             # Берем только свежие пробои (последние 3 свечи)
@@ -144,18 +171,20 @@ async def perform_scan_and_trade(show_progress=False):
                 ticker = await asyncio.to_thread(trade_manager.exchange.fetch_ticker, symbol)
                 current_price = ticker['last']
                 
-                prob = 1.0 # По умолчанию если нет модели
-                if trainer.model:
-                    X = fe.extract_features(latest, df)
-                    probs = trainer.model.predict_proba(X)
-                    prob = float(probs[-1][1])
-                
                 p = latest[-1]
-                if prob > max_prob and current_price < p['entry_price'] * 1.01:
-                    max_prob = prob
-                    best_setup = {'symbol': symbol, 'p': p, 'prob': prob, 'current_price': current_price}
-            
-            if i % 50 == 0: print(f"Scanned {i}/{total}...")
+                if current_price < p['entry_price'] * 1.01:
+                    # Модель оценивает только последний паттерн, признаки копим для общего вызова
+                    X = fe.extract_features(latest, df).iloc[[-1]] if model is not None else None
+                    candidates.append((symbol, p, current_price, X))
+
+        probs = [1.0] * len(candidates) # По умолчанию если нет модели
+        if candidates and model is not None:
+            probs = [float(pr[0]) for pr in predict_proba_batch(model, [c[3] for c in candidates])]
+
+        for (symbol, p, current_price, _), prob in zip(candidates, probs):
+            if prob > max_prob:
+                max_prob = prob
+                best_setup = {'symbol': symbol, 'p': p, 'prob': prob, 'current_price': current_price}
 
         if best_setup and max_prob >= 0.50:
             s = best_setup
@@ -183,13 +212,15 @@ async def perform_scan_and_trade(show_progress=False):
 async def global_scan_no_trade(message: types.Message):
     status_msg = await message.answer("⏳ Ищу паттерны TAS (Tails & Shelves)...")
     try:
-        symbols = fetcher.get_active_symbols()
+        symbols = await fetcher.get_active_symbols()
         found = []
-        for symbol in symbols[:100]:
-            df = await asyncio.to_thread(fetcher.fetch_ohlcv, symbol, '1h', (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d'))
+        start_date = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
+        since = {s: store.next_since(s, '1h') for s in symbols[:100]}
+        async for symbol, fresh in fetcher.stream_ohlcv(symbols[:100], '1h', start_date, since=since):
+            df = store.update_tail(symbol, '1h', fresh, SCAN_BARS)
             if df.empty: continue
             df = cleaner.validate_data(df)
-            df = cleaner.calculate_indicators(df)
+            df = indicators.apply(symbol, df, forming_last=last_bar_forming(df, '1h'))
             patterns = detector.detect_patterns(df)
             latest = [p for p in patterns if p['entry_idx'] >= len(df) - 6]
             for p in latest:
@@ -275,7 +306,10 @@ async def auto_scan_task():
 async def main():
     asyncio.create_task(monitor_trades())
     asyncio.create_task(auto_scan_task())
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await fetcher.close()
 
 if __name__ == "__main__":
     if sys.platform == 'win32':
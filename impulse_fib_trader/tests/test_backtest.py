@@ -0,0 +1,28 @@
+import json
+import pandas as pd
+import pytest
+from backtest.engine import BacktestEngine
+from pattern.detector import PatternDetector
+from pattern.records import PatternTable
+from tests.test_impulse import _random_candles
+
+
+@pytest.mark.parametrize('entry_mode', ['BREAKOUT', 'LIMIT'])
+def test_vectorized_backtest_matches_loop(entry_mode):
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    detector = PatternDetector('config/pattern_spec.json')
+    detector.structure_validator.config['type'] = 'close_beyond_structure'
+    df = _random_candles(1500, 2)
+    patterns = detector.detect_patterns(df)
+    engine = BacktestEngine(config)
+
+    expected = engine._run_backtest_loop(patterns, df, entry_mode)
+
+    assert set(expected['type']) == {'bullish', 'bearish'}
+    pd.testing.assert_frame_equal(engine.run_backtest(patterns, df, entry_mode), expected, check_exact=True)
+    pd.testing.assert_frame_equal(engine.run_backtest(PatternTable.from_records(patterns), df, entry_mode),
+                                  expected, check_exact=True)
+    pd.testing.assert_frame_equal(engine.run_backtest(patterns, df, entry_mode, rr=1.5),
+                                  engine._run_backtest_loop(patterns, df, entry_mode, rr=1.5), check_exact=True)
+    assert engine.run_backtest([], df, entry_mode).empty
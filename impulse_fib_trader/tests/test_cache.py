@@ -0,0 +1,54 @@
+import json
+import pandas as pd
+from data.cache import ResultCache
+from data.cleaner import DataCleaner
+from pattern.detector import PatternDetector
+from tests.test_impulse import _random_candles
+
+
+class CountingDetector(PatternDetector):
+    calls = 0
+
+    def detect_patterns(self, df, as_table=False):
+        CountingDetector.calls += 1
+        return super().detect_patterns(df, as_table)
+
+
+def test_detection_is_reused_until_inputs_change(tmp_path):
+    data_path = str(tmp_path / 'candles.parquet')
+    df = _random_candles(1200, 4)
+    df.to_parquet(data_path, index=False)
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    detector = CountingDetector.from_config(config)
+    CountingDetector.calls = 0
+
+    _, first = cache.detect(data_path, df, config, detector, with_indicators=False)
+    _, again = cache.detect(data_path, pd.read_parquet(data_path), config, detector, with_indicators=False)
+
+    assert CountingDetector.calls == 1
+    assert again.to_dicts() == first.to_dicts() == PatternDetector.from_config(config).detect_patterns(df)
+
+    # Другой конфиг, другая версия детектора или новые свечи - новый ключ
+    config['impulse_detection']['min_atr_multiplier'] = 1.5
+    cache.detect(data_path, df, config, detector, with_indicators=False)
+    detector.VERSION = CountingDetector.VERSION + 1
+    cache.detect(data_path, df, config, detector, with_indicators=False)
+    df.iloc[-1, df.columns.get_loc('close')] += 1.0
+    df.to_parquet(data_path, index=False)
+    cache.detect(data_path, df, config, detector, with_indicators=False)
+    assert CountingDetector.calls == 4
+
+
+def test_indicator_frames_are_cached(tmp_path):
+    data_path = str(tmp_path / 'candles.parquet')
+    raw = _random_candles(300, 1)[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+    raw.to_parquet(data_path, index=False)
+    cache = ResultCache(str(tmp_path / 'cache'))
+
+    computed = cache.indicators(data_path, raw)
+    stored = cache.indicators(data_path, raw.iloc[:0])
+
+    pd.testing.assert_frame_equal(stored, computed)
+    pd.testing.assert_frame_equal(computed, DataCleaner.calculate_indicators(raw))
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from data.cleaner import DataCleaner, IndicatorEngine, INDICATOR_COLUMNS
+
+
+def _random_candles(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[0], close[:-1]]
+    # Плоский участок проверяет ветки для одинаковых значений в окне
+    close[300:330] = close[299]
+    open_[300:330] = close[299]
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    high[300:330] = close[299]
+    low[300:330] = close[299]
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2023-01-01', periods=n, freq='1h'),
+        'open': open_, 'high': high, 'low': low, 'close': close, 'volume': 1.0,
+    })
+
+
+def _assert_same(streamed: pd.DataFrame, batch: pd.DataFrame):
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_array_equal(streamed[col].values, batch[col].values, err_msg=col)
+
+
+def test_streaming_matches_batch_on_full_history():
+    df = _random_candles(1500)
+    batch = DataCleaner.calculate_indicators(df.copy())
+
+    streamed = IndicatorEngine().apply('BTC/USDT', df)
+
+    _assert_same(streamed, batch)
+
+
+def test_streaming_matches_batch_bar_by_bar():
+    df = _random_candles(600)
+    batch = DataCleaner.calculate_indicators(df.copy())
+    engine = IndicatorEngine()
+    window = 120
+
+    engine.apply('BTC/USDT', df.iloc[:400])
+    for end in range(401, len(df) + 1):
+        tail = df.iloc[end - window:end]
+        # Последняя свеча формируется: считается, но не попадает в состояние
+        streamed = engine.apply('BTC/USDT', tail, forming_last=True)
+        _assert_same(streamed, batch.iloc[end - window:end])
+        assert engine.last_timestamp('BTC/USDT') == df['timestamp'].iloc[end - 2]
@@ -34,3 +34,36 @@ def test_impulse_logic():
     
     assert len(impulses) > 0
     assert impulses[0]['type'] == 'bullish'
+
+@pytest.mark.parametrize('lookback', [3, 50])
+def test_detect_live_matches_full_scan(lookback):
+    from tests.test_impulse import _random_candles
+    detector = PatternDetector('config/pattern_spec.json')
+    df = _random_candles(1200, 3)
+
+    full = detector.detect_patterns(df)
+    expected = [p for p in full if p['structure']['entry_idx'] >= len(df) - lookback]
+
+    assert detector.detect_live(df, lookback) == expected
+    # Хвост целиком покрывает полный паттерн
+    assert detector.pattern_span() >= max(p['structure']['entry_idx'] - p['impulse']['start_idx'] for p in full)
+
+
+def test_pending_patterns_match_full_frame(monkeypatch):
+    from tests.test_impulse import _random_candles
+    detector = PatternDetector('config/pattern_spec.json')
+    df = _random_candles(1500, 5)
+    cuts = range(300, len(df) + 1, 7)
+
+    trimmed = [detector.detect_pending_patterns(df.iloc[:n]) for n in cuts]
+    # Без обрезки хвоста: импульсы ищутся по всей истории
+    monkeypatch.setattr(detector, 'max_impulse_length', lambda: len(df))
+    full = [detector.detect_pending_patterns(df.iloc[:n]) for n in cuts]
+
+    assert trimmed == full
+    found = [p for pending in full for p in pending]
+    assert found and any(p['impulse']['start_idx'] > 300 for p in found)
+    for n, pending in zip(cuts, full):
+        for p in pending:
+            assert p['pullback']['end_idx'] >= n - 2
+            assert p['timestamp'] == df['timestamp'].iloc[p['impulse']['start_idx']]
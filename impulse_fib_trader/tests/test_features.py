@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+from features.engineer import FeatureEngineer
+from pattern.records import PatternTable
+from tests.test_impulse import _random_candles
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_vectorized_features_bit_identical(seed):
+    df = _random_candles(1500, seed)
+    rng = np.random.default_rng(seed)
+    df['volume'] = rng.lognormal(10, 3, len(df))
+    df.loc[200:230, 'volume'] = np.nan
+    patterns = [{'entry_idx': i} for i in range(0, len(df), 3)]
+    fe = FeatureEngineer()
+
+    expected = fe._extract_features_loop(patterns, df)
+
+    pd.testing.assert_frame_equal(fe.extract_features(patterns, df), expected, check_exact=True)
+    pd.testing.assert_frame_equal(fe.extract_features(PatternTable.from_records(patterns), df), expected,
+                                  check_exact=True)
+    assert list(expected.columns) == FeatureEngineer.FEATURE_COLUMNS
@@ -0,0 +1,49 @@
+import asyncio
+import pandas as pd
+from data.fetcher import AsyncDataFetcher
+
+
+class FakeAsyncExchange:
+    def __init__(self, delays):
+        self.delays = delays
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def fetch_ohlcv(self, symbol, timeframe, since, limit=1000):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delays[symbol])
+        self.in_flight -= 1
+        return [[since, 1.0, 2.0, 0.5, 1.5, 10.0]]
+
+    async def close(self):
+        pass
+
+
+def _collect(fetcher, symbols):
+    async def run():
+        return [(s, df) async for s, df in fetcher.stream_ohlcv(symbols, '1h', '2024-01-01')]
+    return asyncio.run(run())
+
+
+def test_stream_yields_in_completion_order():
+    exchange = FakeAsyncExchange({'SLOW/USDT': 0.2, 'FAST/USDT': 0.0})
+    fetcher = AsyncDataFetcher(max_concurrency=2, exchange=exchange)
+
+    results = _collect(fetcher, ['SLOW/USDT', 'FAST/USDT'])
+
+    assert [s for s, _ in results] == ['FAST/USDT', 'SLOW/USDT']
+    df = results[0][1]
+    assert list(df.columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    assert df['timestamp'].iloc[0] == pd.Timestamp('2024-01-01')
+
+
+def test_stream_respects_concurrency_limit():
+    symbols = [f"S{i}/USDT" for i in range(12)]
+    exchange = FakeAsyncExchange({s: 0.01 for s in symbols})
+    fetcher = AsyncDataFetcher(max_concurrency=3, exchange=exchange)
+
+    results = _collect(fetcher, symbols)
+
+    assert sorted(s for s, _ in results) == sorted(symbols)
+    assert exchange.max_in_flight == 3
@@ -0,0 +1,42 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from data.cleaner import DataCleaner
+from pattern.impulse import ImpulseDetector
+from pattern.range_index import RangeExtremaIndex
+
+
+def _random_candles(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 0.2, n)
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2023-01-01', periods=n, freq='1h'),
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.random(n) * 0.5,
+        'low': np.minimum(open_, close) - rng.random(n) * 0.5,
+        'close': close,
+        'volume': 1.0,
+    })
+    return DataCleaner.calculate_indicators(df)
+
+
+@pytest.mark.parametrize('config_path', ['config/pattern_spec.json', 'config/pattern_spec_hard.json'])
+@pytest.mark.parametrize('seed', [1, 2])
+def test_vectorized_detect_matches_loop(config_path, seed):
+    with open(config_path, 'r') as f:
+        detector = ImpulseDetector(json.load(f))
+    df = _random_candles(3000, seed)
+
+    expected = detector._detect_loop(df)
+    assert detector.detect(df) == expected
+    assert detector.detect(df, RangeExtremaIndex(df)) == expected
+
+
+def test_vectorized_detect_short_frames():
+    detector = ImpulseDetector({'impulse_detection': {'min_candles': 4}})
+    for n in range(0, 16):
+        df = _random_candles(n, 5) if n else _random_candles(1, 5).iloc[:0]
+        assert detector.detect(df) == detector._detect_loop(df)
+        assert detector.detect(df, RangeExtremaIndex(df)) == detector._detect_loop(df)
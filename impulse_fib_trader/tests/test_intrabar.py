@@ -0,0 +1,132 @@
+import json
+import numpy as np
+import pandas as pd
+from backtest.engine import BacktestEngine
+from backtest.intrabar import IntrabarResolver
+from data.fetcher import DataFetcher
+from data.storage import DataStorage
+from pattern.detector import PatternDetector
+from tests.test_impulse import _random_candles
+
+MINUTE_MS = 60 * 1000
+
+
+class FakeExchange:
+    """1m candles from path(symbol, open_ms) -> (high, low); records every request."""
+    rateLimit = 0
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit=1000):
+        self.calls.append((symbol, timeframe, since, limit))
+        start = -(-since // MINUTE_MS) * MINUTE_MS
+        rows = []
+        for k in range(limit):
+            ts = start + k * MINUTE_MS
+            high, low = self.path(symbol, ts)
+            rows.append([ts, (high + low) / 2, high, low, (high + low) / 2, 1.0])
+        return rows
+
+
+def _resolver(tmp_path, path):
+    exchange = FakeExchange(path)
+    return IntrabarResolver(DataFetcher(exchange=exchange), DataStorage(str(tmp_path)), '1h', '1m'), exchange
+
+
+def test_orders_barriers_and_caches_windows(tmp_path):
+    bar = pd.Timestamp('2024-01-01 05:00')
+    bar_ms = bar.value // 10**6
+
+    def path(symbol, ts):
+        minute = (ts - bar_ms) // MINUTE_MS
+        # BTC: цель на 10-й минуте, стоп на 30-й; ETH наоборот
+        spike, dip = (10, 30) if symbol == 'BTC/USDT' else (30, 10)
+        return (110.0 if minute == spike else 100.5), (90.0 if minute == dip else 99.5)
+
+    resolver, exchange = _resolver(tmp_path, path)
+    first = resolver.target_first(['BTC/USDT', 'ETH/USDT', 'BTC/USDT'], [bar, bar, bar],
+                                  [95.0, 95.0, 105.0], [105.0, 105.0, 95.0], [True, True, False])
+
+    assert list(first) == [True, False, False]
+    # Только окно одной часовой свечи на символ, без полной истории 1m
+    assert [(c[0], c[2]) for c in exchange.calls] == [('BTC/USDT', bar_ms), ('ETH/USDT', bar_ms)]
+    assert all(c[3] <= 61 for c in exchange.calls)
+
+    again, exchange = _resolver(tmp_path, path)
+    assert list(again.target_first('BTC/USDT', [bar], [95.0], [105.0])) == [True]
+    assert exchange.calls == []
+
+
+def test_failed_fetch_is_not_cached_as_missing_data(tmp_path, monkeypatch):
+    monkeypatch.setattr('data.fetcher.time.sleep', lambda s: None)
+    bar = pd.Timestamp('2024-01-01 05:00')
+    bar_ms = bar.value // 10**6
+    # Цель на 10-й минуте, стоп на 30-й
+    path = lambda s, ts: (110.0 if ts - bar_ms == 10 * MINUTE_MS else 100.5,
+                          90.0 if ts - bar_ms == 30 * MINUTE_MS else 99.5)
+    resolver, exchange = _resolver(tmp_path, path)
+    fetch = exchange.fetch_ohlcv
+    failures = [0]
+
+    def flaky(*args, **kwargs):
+        # Первый fetch_range исчерпывает все три попытки
+        if failures[0] < 3:
+            failures[0] += 1
+            raise ConnectionError('rate limited')
+        return fetch(*args, **kwargs)
+    exchange.fetch_ohlcv = flaky
+
+    assert list(resolver.target_first('BTC/USDT', [bar], [95.0], [105.0])) == [False]
+    assert resolver.store.cached_ranges('BTC/USDT', '1m') == []
+
+    assert list(resolver.target_first('BTC/USDT', [bar], [95.0], [105.0])) == [True]
+    assert resolver.store.cached_ranges('BTC/USDT', '1m') == [(bar_ms, bar_ms + 3600000 - 1)]
+
+
+def test_backtest_resolves_ties_on_lower_timeframe(tmp_path):
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    detector = PatternDetector('config/pattern_spec.json')
+    df = _random_candles(1500, 3)
+    patterns = detector.detect_patterns(df)
+    engine = BacktestEngine(config)
+    base = engine.run_backtest(patterns, df)
+
+    # Первая минута каждого часа бьет вверх, дальше цена падает к нулю
+    resolver, _ = _resolver(tmp_path, lambda s, ts: (1e12, 1e11) if ts % 3600000 == 0 else (0.0, 0.0))
+    resolved = engine.run_backtest(patterns, df, resolver=resolver, symbol='BTC/USDT')
+
+    # У стопнутых сделок exit_price = SL, отсюда TP и неоднозначные свечи
+    stopped = base['r_multiple'].values == -1.0
+    entry_price, sl = base['entry_price'].values, base['exit_price'].values
+    tie_long = (base['type'].values == 'bullish') & stopped & (
+        df['high'].values[base['exit_idx'].values] >= entry_price + 2.5 * (entry_price - sl))
+    assert tie_long.any()
+    np.testing.assert_array_equal(resolved['r_multiple'].values[~tie_long], base['r_multiple'].values[~tie_long])
+    assert (resolved['r_multiple'].values[tie_long] == 2.5).all()
+    assert (resolved['exit_idx'] == base['exit_idx']).all()
+
+
+def test_labels_need_an_explicit_symbol_for_tas_patterns(tmp_path):
+    import pytest
+    from features.labels import Labeler
+
+    df = _random_candles(300, 2)
+    rows = range(20, 250, 10)
+    # Стоп и цель внутри диапазона следующей свечи: каждая метка решается по 1m
+    patterns = []
+    for i in rows:
+        sl = df['low'].iloc[i + 1] + 1e-6
+        patterns.append({'entry_idx': i, 'entry_price': (df['high'].iloc[i + 1] - 1e-6 + 2 * sl) / 3,
+                         'sl': sl, 'symbol': 'UNKNOWN'})
+    resolver, exchange = _resolver(tmp_path, lambda s, ts: (1e12, 1e11) if ts % 3600000 == 0 else (0.0, 0.0))
+    labeler = Labeler({})
+
+    with pytest.raises(ValueError):
+        labeler.create_labels(patterns, df, resolver)
+    assert exchange.calls == []
+
+    labels = labeler.create_labels(patterns, df, resolver, symbol='BTC/USDT')
+    assert labels.sum() > 0 and {c[0] for c in exchange.calls} == {'BTC/USDT'}
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from features.labels import Labeler, first_touch
+from tests.test_impulse import _random_candles
+
+
+def test_create_labels_matches_loop():
+    df = _random_candles(3000, 4)
+    rng = np.random.default_rng(4)
+    idx = np.sort(rng.choice(len(df), 600, replace=False))
+    patterns = [{'entry_idx': int(i), 'entry_price': df['close'].iloc[i],
+                 'sl': df['close'].iloc[i] - rng.random() * 3 + 0.3} for i in idx]
+    labeler = Labeler({})
+
+    pd.testing.assert_series_equal(labeler.create_labels(patterns, df), labeler._create_labels_loop(patterns, df))
+
+
+def test_first_touch_grid_and_ties():
+    highs = np.array([10.0, 10.5, 12.0, 11.0, 13.0])
+    lows = np.array([9.5, 9.8, 8.9, 10.0, 10.0])
+    # Бар 2 задевает и стоп (9.0), и цель RR 1 (11.0) -> стоп
+    target_bar, stop_bar = first_touch([0], [9.0], [[11.0, 13.0]], highs, lows, horizon=4)
+    assert stop_bar.tolist() == [2]
+    assert target_bar.tolist() == [[2, 4]]
+
+    df = pd.DataFrame({'high': highs, 'low': lows})
+    labels, bars = Labeler({}).first_touch([{'entry_idx': 0, 'entry_price': 10.0, 'sl': 9.7}], df,
+                                           rr_multiples=(1.0, 20.0), horizons=(1, 4))
+    assert labels.iloc[0].to_dict() == {'rr1_h1': 1, 'rr1_h4': 1, 'rr20_h1': 0, 'rr20_h4': 0}
+    # RR 20 недостижим: за 4 бара первым касается стоп (бар 2), за 1 бар - ничего
+    np.testing.assert_array_equal(bars.iloc[0].values, [1.0, 1.0, np.nan, 2.0])
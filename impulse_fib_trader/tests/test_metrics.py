@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest.metrics import MetricsCalculator, simulate_paths
+
+
+def _reference(paths: np.ndarray):
+    """Whole-matrix cumsum/cummax per simulation (sims x trades)."""
+    equity = np.cumsum(paths, axis=1)
+    drawdown = (equity - np.maximum.accumulate(equity, axis=1)).min(axis=1)
+    return equity[:, -1], drawdown, equity.min(axis=1)
+
+
+@pytest.mark.parametrize('method', ['bootstrap', 'shuffle'])
+def test_paths_match_full_matrix(method, monkeypatch):
+    r = np.random.default_rng(3).normal(0.2, 1.5, 700)
+    monkeypatch.setattr('backtest.metrics.TRADE_BATCH', 64)
+    monkeypatch.setattr('backtest.metrics.SIM_BATCH', 40)
+
+    stats = simulate_paths(r, 100, method, seed=7)
+
+    rng = np.random.default_rng(7)
+    if method == 'bootstrap':
+        idx = np.concatenate([rng.integers(0, 700, size=(min(64, 700 - lo), 100)) for lo in range(0, 700, 64)])
+        paths = r[idx].T
+    else:
+        paths = np.concatenate([rng.permuted(np.broadcast_to(r, (40, 700)), axis=1) for _ in range(0, 100, 40)])[:100]
+        np.testing.assert_allclose(stats['terminal_r'], r.sum())
+    terminal, drawdown, low = _reference(paths)
+    np.testing.assert_allclose(stats['terminal_r'], terminal)
+    np.testing.assert_allclose(stats['max_drawdown'], drawdown)
+    np.testing.assert_allclose(stats['min_equity'], low)
+
+
+def test_confidence_brackets_point_estimates():
+    r = np.random.default_rng(0).choice([-1.0, 2.0], 2000, p=[0.6, 0.4])
+    df = pd.DataFrame({'r_multiple': np.r_[r, np.nan]})
+    point = MetricsCalculator.calculate(df)
+
+    ci = MetricsCalculator.confidence(df, n_sims=2000)
+
+    assert ci['expectancy_ci'][0] < point['expectancy'] < ci['expectancy_ci'][1]
+    assert ci['net_profit_r_ci'][0] < point['net_profit_r'] < ci['net_profit_r_ci'][1]
+    assert ci['max_drawdown_ci'][0] < ci['max_drawdown_ci'][1] <= 0
+    assert 0 <= ci['risk_of_ruin'] <= 1
+    assert ci == MetricsCalculator.confidence(df, n_sims=2000)
+    assert MetricsCalculator.confidence(pd.DataFrame()) == {}
@@ -0,0 +1,35 @@
+import os
+import pandas as pd
+from backtest.parallel import run_parallel, merge_results, shareable
+from compare_strategies import backtest_symbol
+from tests.test_impulse import _random_candles
+
+
+def _shm_blocks() -> set:
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+def test_same_results_for_any_worker_count():
+    frames = {f"SYM{i}/USDT": _random_candles(700, i) for i in range(3)}
+    before = _shm_blocks()
+
+    serial = run_parallel(backtest_symbol, frames, workers=1, config_path='config/pattern_spec.json')
+    pooled = run_parallel(backtest_symbol, frames, workers=3, config_path='config/pattern_spec.json')
+
+    assert list(pooled) == list(frames)
+    for symbol in frames:
+        for mode in (0, 1):
+            pd.testing.assert_frame_equal(pooled[symbol][mode], serial[symbol][mode], check_exact=True)
+    merged = merge_results([r[0] for r in pooled.values()])
+    assert len(merged) == sum(len(r[0]) for r in serial.values())
+    # Сегменты разделяемой памяти удаляются после прогона
+    assert _shm_blocks() <= before
+
+
+def test_shareable_keeps_values():
+    df = _random_candles(50, 1)
+    df['label'] = 'x'
+    out = shareable(df)
+    assert 'label' not in out.columns
+    assert (out['timestamp'] == df['timestamp']).all()
+    pd.testing.assert_series_equal(out['close'], df['close'])
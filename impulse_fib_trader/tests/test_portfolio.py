@@ -0,0 +1,77 @@
+import json
+import numpy as np
+import pandas as pd
+from backtest.engine import BacktestEngine
+from backtest.portfolio import PortfolioSimulator
+from pattern.detector import PatternDetector
+from tests.test_impulse import _random_candles
+
+T0 = pd.Timestamp('2024-01-01')
+
+
+def _trades(rows):
+    """rows: (entry hour, exit hour, score, entry price, exit price)."""
+    return pd.DataFrame({
+        'entry_time': [T0 + pd.Timedelta(hours=r[0]) for r in rows],
+        'exit_time': [T0 + pd.Timedelta(hours=r[1]) for r in rows],
+        'score': [r[2] for r in rows],
+        'entry_price': [r[3] for r in rows],
+        'exit_price': [r[4] for r in rows],
+        'type': 'bullish',
+        'r_multiple': 1.0,
+    })
+
+
+def test_live_trading_rules():
+    trades = {
+        'A/USDT': _trades([(0, 2, 0.5, 100, 110),   # взята
+                           (1, 3, 0.9, 100, 100),   # позиция по A еще открыта
+                           (3, 5, 0.9, 100, 100),   # кулдаун 4ч от входа в 0
+                           (6, 7, 0.6, 100, 90)]),  # взята
+        'B/USDT': _trades([(0, 1, 0.5, 10, 20),     # та же оценка, но A раньше в списке
+                           (6, 8, 0.7, 10, 11)]),   # лучше A на этом скане
+        'C/USDT': _trades([(1, 9, 0.1, 50, 50),     # взята: A занята
+                           (8, 9, 0.9, 50, 50)]),   # позиция по C еще открыта
+    }
+    sim = PortfolioSimulator(capital=100.0, stake=10.0)
+
+    taken = sim.run(trades)
+
+    assert list(taken['symbol']) == ['A/USDT', 'C/USDT', 'B/USDT']
+    assert list(taken['entry_time']) == [T0, T0 + pd.Timedelta(hours=1), T0 + pd.Timedelta(hours=6)]
+    np.testing.assert_allclose(taken['pnl'], [1.0, 0.0, 1.0])
+    assert sim.final_capital == 102.0
+    assert sim.rejected == {'not_best': 2, 'open_position': 2, 'cooldown': 1}
+
+
+def test_capital_limit_and_min_score():
+    trades = {'A/USDT': _trades([(0, 5, 0.9, 100, 100)]),
+              'B/USDT': _trades([(1, 5, 0.9, 100, 100), (6, 7, 0.3, 100, 100)])}
+
+    taken = PortfolioSimulator(capital=15.0, stake=10.0, min_score=0.5).run(trades)
+
+    assert list(taken['symbol']) == ['A/USDT']
+
+
+def test_positions_never_overlap_on_random_history():
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    detector = PatternDetector('config/pattern_spec.json')
+    engine = BacktestEngine(config)
+    trades = {}
+    for i in range(3):
+        df = _random_candles(1500, i)
+        trades[f"SYM{i}/USDT"] = engine.run_backtest(detector.detect_patterns(df), df)
+
+    taken = PortfolioSimulator(capital=20.0, stake=10.0).run(trades)
+
+    assert len(taken) and taken['entry_time'].is_monotonic_increasing
+    assert not taken['entry_time'].duplicated().any()
+    for _, group in taken.groupby('symbol'):
+        gaps = group['entry_time'].values[1:] - group['exit_time'].values[:-1]
+        assert (gaps >= np.timedelta64(0)).all()
+        assert (np.diff(group['entry_time'].values) >= np.timedelta64(4, 'h')).all()
+    # Не больше двух позиций одновременно при капитале на две ставки
+    events = sorted([(t, 1) for t in taken['entry_time']] + [(t, -1) for t in taken['exit_time']],
+                    key=lambda e: (e[0], e[1]))
+    assert max(np.cumsum([e[1] for e in events])) <= 2
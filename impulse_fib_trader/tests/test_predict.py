@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+import pandas as pd
+import xgboost as xgb
+from ml.predict import DECISION_THRESHOLD, predict_proba_batch
+
+
+def test_batch_matches_per_block_predictions():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 4)), columns=['a', 'b', 'c', 'd'])
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=3).fit(X, (X['a'] + X['c'] > 0).astype(int))
+    X.loc[7, 'b'] = np.nan
+    # Другой порядок колонок и пустой блок у одной из пар
+    blocks = [X.iloc[:3], X.iloc[3:3], X.iloc[3:250][['d', 'c', 'b', 'a']], X.iloc[250:]]
+
+    probs = predict_proba_batch(model, blocks)
+
+    assert [len(p) for p in probs] == [3, 0, 247, 150]
+    for block, p in zip(blocks, probs):
+        if len(block):
+            block = block[list(X.columns)]
+            np.testing.assert_array_equal(p, model.predict_proba(block)[:, 1])
+            np.testing.assert_array_equal(p > DECISION_THRESHOLD, model.predict(block) == 1)
+    assert predict_proba_batch(model, [X.iloc[:0]])[0].size == 0
+
+
+def test_registry_roundtrip_and_schema_check(tmp_path):
+    from ml.registry import ModelRegistry
+
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(size=(200, 3)), columns=['a', 'b', 'c'])
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=2).fit(X, (X['a'] > 0).astype(int))
+    registry = ModelRegistry(str(tmp_path))
+
+    first = registry.save(model, 'tas', config={'rr': 2.0}, window=('2023-01-01', '2025-01-01'),
+                          metrics={'accuracy': 0.6})
+    booster = registry.current('tas', features=['a', 'b', 'c'])
+    assert registry.current('tas') is booster
+    np.testing.assert_array_equal(predict_proba_batch(booster, [X])[0], model.predict_proba(X)[:, 1])
+    manifest = registry.manifest('tas')
+    assert manifest['features'] == ['a', 'b', 'c'] and manifest['train_window'] == ['2023-01-01', '2025-01-01']
+
+    with pytest.raises(ValueError):
+        registry.load('tas', features=['a', 'c', 'b'])
+
+    # Новая версия подхватывается без перезапуска, старую можно вернуть
+    second = registry.save(xgb.XGBClassifier(n_estimators=3).fit(X, (X['b'] > 0).astype(int)), 'tas')
+    assert registry.versions('tas') == [first, second]
+    assert registry.current('tas') is not booster
+    registry.activate('tas', first)
+    np.testing.assert_array_equal(registry.current('tas').inplace_predict(X), booster.inplace_predict(X))
+    assert registry.current('missing') is None
+
+
+def test_registry_refuses_bad_versions_and_keeps_serving(tmp_path, caplog):
+    from ml.registry import ModelRegistry
+
+    rng = np.random.default_rng(2)
+    X = pd.DataFrame(rng.normal(size=(100, 2)), columns=['a', 'b'])
+    registry = ModelRegistry(str(tmp_path))
+    good = registry.save(xgb.XGBClassifier(n_estimators=3).fit(X, (X['a'] > 0).astype(int)), 'tas', features=['a', 'b'])
+    serving = registry.current('tas', features=['a', 'b'])
+
+    other = X.rename(columns={'b': 'c'})
+    with pytest.raises(ValueError):
+        registry.save(xgb.XGBClassifier(n_estimators=3).fit(other, X['a'] > 0), 'tas', features=['a', 'b'])
+    stale = registry.save(xgb.XGBClassifier(n_estimators=3).fit(other, X['a'] > 0), 'tas', activate=False)
+    with pytest.raises(ValueError):
+        registry.activate('tas', stale, features=['a', 'b'])
+    assert registry.latest('tas') == good
+
+    # LATEST изменен вручную на несовместимую или битую версию: скан продолжает со старой моделью
+    (tmp_path / 'tas' / 'LATEST').write_text(stale)
+    assert registry.current('tas', features=['a', 'b']) is serving
+    (tmp_path / 'tas' / stale / 'model.ubj').write_bytes(b'garbage')
+    (tmp_path / 'tas' / 'LATEST').write_text(stale + 'x')
+    assert registry.current('tas', features=['a', 'b']) is serving
+    assert sum('rejected' in r.message for r in caplog.records) == 2
+    assert ModelRegistry(str(tmp_path)).current('tas', features=['a', 'b']) is None
+
+
+def test_scanner_skips_a_symbol_that_fails_to_score():
+    scanner = pytest.importorskip('scanner')
+    rng = np.random.default_rng(3)
+    columns = scanner.FeatureEngineer.FEATURE_COLUMNS
+    X = pd.DataFrame(rng.normal(size=(50, len(columns))), columns=columns)
+    model = xgb.XGBClassifier(n_estimators=5).fit(X, (X['rsi'] > 0).astype(int))
+    s = object.__new__(scanner.MarketScanner)
+    s._model = lambda: model
+
+    good = X.iloc[:10]
+    candidates = [('AAA/USDT', [{'id': i} for i in range(10)], good),
+                  ('BBB/USDT', [{'id': 0}], X.iloc[:1].drop(columns='rsi'))]
+    signals = s._score(candidates)
+
+    expected = model.predict_proba(good)[:, 1]
+    assert [sig['pattern']['id'] for sig in signals] == list(np.flatnonzero(expected > 0.5))
+    assert {sig['symbol'] for sig in signals} == {'AAA/USDT'}
@@ -0,0 +1,35 @@
+import json
+import pytest
+from pattern.impulse import ImpulseDetector
+from pattern.pullback import PullbackMeasurer
+from tests.test_impulse import _random_candles
+
+
+@pytest.mark.parametrize('config_path', ['config/pattern_spec.json', 'config/pattern_spec_hard.json'])
+@pytest.mark.parametrize('touch_50', [False, True])
+def test_measure_batch_matches_measure(config_path, touch_50):
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    df = _random_candles(600, 6)
+    impulses = ImpulseDetector(config).detect(df)
+    measurer = PullbackMeasurer(config)
+    measurer.config['touch_50_level'] = touch_50
+
+    expected = [measurer.measure(imp, df) for imp in impulses]
+
+    assert any(expected)
+    assert measurer.measure_batch(impulses, df) == expected
+
+
+def test_measure_batch_near_end_of_data():
+    config = {'impulse_detection': {'min_candles': 4}}
+    df = _random_candles(1500, 8)
+    impulses = ImpulseDetector(config).detect(df)
+    measurer = PullbackMeasurer(config)
+    # Окна последних импульсов обрезаются концом данных
+    for tail in (60, 20, 6):
+        cut = df.iloc[:impulses[-1]['end_idx'] + tail // 10 + 1]
+        tail_impulses = [imp for imp in impulses if imp['end_idx'] < len(cut)]
+        assert (measurer.measure_batch(tail_impulses, cut)
+                == [measurer.measure(imp, cut) for imp in tail_impulses])
+    assert measurer.measure_batch([], df) == []
@@ -0,0 +1,30 @@
+import numpy as np
+from pattern.detector import PatternDetector
+from pattern.range_index import RangeExtremaIndex
+from tests.test_impulse import _random_candles
+
+
+def test_queries_match_brute_force():
+    df = _random_candles(257, 3)
+    index = RangeExtremaIndex(df)
+    highs, lows = df['high'].values, df['low'].values
+
+    a = np.repeat(np.arange(len(df)), len(df))
+    b = np.tile(np.arange(len(df)), len(df))
+    a, b = a[a <= b], b[a <= b]
+    np.testing.assert_array_equal(index.max_high(a, b), [highs[i:j + 1].max() for i, j in zip(a, b)])
+    np.testing.assert_array_equal(index.min_low(a, b), [lows[i:j + 1].min() for i, j in zip(a, b)])
+
+
+def test_indexed_success_matches_slices():
+    detector = PatternDetector('config/pattern_spec.json')
+    df = _random_candles(800, 4)
+    index = RangeExtremaIndex(df)
+
+    for imp in detector.impulse_detector.detect(df, index):
+        pullback = detector.pullback_measurer.measure(imp, df)
+        if pullback:
+            structure = detector.structure_validator.validate(imp, pullback, df)
+            if structure:
+                assert (detector._evaluate_success(imp, structure, df, index)
+                        == detector._evaluate_success(imp, structure, df))
@@ -0,0 +1,53 @@
+import json
+import numpy as np
+from backtest.engine import BacktestEngine
+from features.engineer import FeatureEngineer
+from features.labels import Labeler
+from pattern.detector import PatternDetector
+from pattern.records import PatternTable, pattern_column
+from pattern.tas_detector import ImpulseRejectionDetector
+from tests.test_impulse import _random_candles
+
+
+def test_table_round_trips_detector_output():
+    detector = PatternDetector('config/pattern_spec.json')
+    df = _random_candles(1200, 1)
+    patterns = detector.detect_patterns(df)
+
+    table = detector.detect_patterns(df, as_table=True)
+
+    assert len(table) == len(patterns)
+    assert table.to_dicts() == patterns
+    assert table[3] == patterns[3]
+    np.testing.assert_array_equal(table['structure.entry_idx'], pattern_column(patterns, 'structure.entry_idx'))
+
+
+def test_optional_keys_and_concat():
+    table = PatternTable.from_records([{'a': 1, 's': {'x': 1.0}}, {'a': 2, 's': {'x': 2.0, 'y': 'abc'}}])
+    assert table.to_dicts() == [{'a': 1, 's': {'x': 1.0}}, {'a': 2, 's': {'x': 2.0, 'y': 'abc'}}]
+
+    btc = PatternTable.from_records([{'entry_idx': 5}]).with_column('symbol', 'BTC/USDT')
+    sol = PatternTable.from_records([{'entry_idx': 7}]).with_column('symbol', '1000SATS/USDT')
+    merged = PatternTable.concat([btc, sol])
+    assert list(merged['symbol']) == ['BTC/USDT', '1000SATS/USDT']
+    assert len(PatternTable.concat([])) == 0
+
+
+def test_downstream_stages_accept_table():
+    df = _random_candles(1500, 2)
+    patterns = ImpulseRejectionDetector({}).detect_patterns(df)
+    table = PatternTable.from_records(patterns)
+
+    fe = FeatureEngineer()
+    assert fe.extract_features(table, df).equals(fe.extract_features(patterns, df))
+    labeler = Labeler({})
+    assert labeler.create_labels(table, df).equals(labeler.create_labels(patterns, df))
+
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    config['risk_management']['max_bars_in_trade'] = 40
+    detector = PatternDetector('config/pattern_spec.json')
+    breakout = detector.detect_patterns(df)
+    engine = BacktestEngine(config)
+    assert engine.run_backtest(detector.detect_patterns(df, as_table=True), df).equals(
+        engine.run_backtest(breakout, df))
@@ -0,0 +1,66 @@
+import pandas as pd
+from data.storage import DataStorage
+
+HOUR_MS = 3600 * 1000
+
+
+def _candles(start: str, periods: int) -> pd.DataFrame:
+    ts = pd.date_range(start=start, periods=periods, freq='1h')
+    return pd.DataFrame({
+        'timestamp': ts,
+        'open': range(periods), 'high': range(periods), 'low': range(periods),
+        'close': range(periods), 'volume': [1.0] * periods,
+    })
+
+
+def test_append_only_writes_new_bars(tmp_path):
+    store = DataStorage(str(tmp_path))
+    df = _candles('2024-01-01', 10)
+
+    assert store.next_since('BTC/USDT', '1h') is None
+    assert store.append('BTC/USDT', '1h', df) == 10
+    assert store.append('BTC/USDT', '1h', df.tail(3)) == 0
+    assert store.append('BTC/USDT', '1h', _candles('2024-01-01 08:00', 4)) == 2
+
+    last = pd.Timestamp('2024-01-01 11:00').value // 10**6
+    assert store.last_timestamp('BTC/USDT', '1h') == last
+    assert store.next_since('BTC/USDT', '1h') == last + 1
+    assert len(store.load('BTC/USDT', '1h')) == 12
+    assert store.load_tail('BTC/USDT', '1h', 5)['timestamp'].iloc[-1] == pd.Timestamp('2024-01-01 11:00')
+
+
+def test_update_tail_keeps_forming_bar_off_disk(tmp_path):
+    store = DataStorage(str(tmp_path))
+    fresh = _candles('2024-01-01', 6)
+    # Последний бар открыт в 05:00 и еще не закрыт
+    now_ms = pd.Timestamp('2024-01-01 05:30').value // 10**6
+
+    tail = store.update_tail('ETH/USDT', '1h', fresh, bars=4, now_ms=now_ms)
+
+    assert len(tail) == 5
+    assert tail['timestamp'].iloc[-1] == pd.Timestamp('2024-01-01 05:00')
+    assert store.last_timestamp('ETH/USDT', '1h') == pd.Timestamp('2024-01-01 04:00').value // 10**6
+
+
+def test_update_tail_drops_stale_history_when_fetch_fails(tmp_path):
+    store = DataStorage(str(tmp_path))
+    store.append('ETH/USDT', '1h', _candles('2024-01-01', 6))
+    failed = _candles('2024-01-01', 0)
+
+    # Последний сохраненный бар 05:00 закрылся в 06:00 - он и есть последний закрытый
+    now_ms = pd.Timestamp('2024-01-01 06:20').value // 10**6
+    assert len(store.update_tail('ETH/USDT', '1h', failed, bars=4, now_ms=now_ms)) == 4
+
+    # Через сутки без новых свечей хвост устарел
+    now_ms = pd.Timestamp('2024-01-02 06:20').value // 10**6
+    assert store.update_tail('ETH/USDT', '1h', failed, bars=4, now_ms=now_ms).empty
+
+
+def test_compact_merges_parts(tmp_path):
+    store = DataStorage(str(tmp_path))
+    store.MAX_PARTS = 3
+    for i in range(5):
+        store.append('SOL/USDT', '1h', _candles(f'2024-01-01 {i:02d}:00', 1))
+
+    assert len(list((tmp_path / '1h' / 'SOL_USDT').glob('part-*.parquet'))) <= 3
+    assert len(store.load('SOL/USDT', '1h')) == 5
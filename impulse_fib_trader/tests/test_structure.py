@@ -0,0 +1,25 @@
+import json
+import pytest
+from pattern.impulse import ImpulseDetector
+from pattern.pullback import PullbackMeasurer
+from pattern.structure import StructureValidator
+from tests.test_impulse import _random_candles
+
+
+@pytest.mark.parametrize('trigger', ['false_break_wick_only', 'close_beyond_structure'])
+@pytest.mark.parametrize('n', [600, 250])
+def test_validate_batch_matches_validate(trigger, n):
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    df = _random_candles(n, 9)
+    impulses = ImpulseDetector(config).detect(df)
+    pullbacks = PullbackMeasurer(config).measure_batch(impulses, df)
+    pairs = [(imp, pb) for imp, pb in zip(impulses, pullbacks) if pb]
+    validator = StructureValidator(config)
+    validator.config['type'] = trigger
+    validator.BATCH_ROWS = 7 # несколько блоков
+
+    expected = [validator.validate(imp, pb, df) for imp, pb in pairs]
+
+    assert any(expected)
+    assert validator.validate_batch([imp for imp, _ in pairs], [pb for _, pb in pairs], df) == expected
@@ -0,0 +1,96 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from backtest.engine import BacktestEngine
+from backtest.metrics import MetricsCalculator
+from backtest.parallel import merge_results
+from backtest.sweep import run_sweep, expand_grid, apply_point, summarize
+from features.engineer import FeatureEngineer
+from ml.train import MLTrainer
+from pattern.detector import PatternDetector
+from tests.test_impulse import _random_candles
+
+
+def _direct(frames, config, point, model=None):
+    """One grid point the slow way: full detection and backtest per symbol."""
+    cfg = apply_point(config, point)
+    detector = PatternDetector.from_config(cfg)
+    results = []
+    for symbol, df in frames.items():
+        patterns = detector.detect_patterns(df)
+        for p in patterns:
+            p['symbol'] = symbol
+        if model is not None and patterns:
+            X = FeatureEngineer().extract_features([{'entry_idx': p['structure']['entry_idx']} for p in patterns], df)
+            probs = model.predict_proba(X)[:, 1]
+            patterns = [p for p, prob in zip(patterns, probs) if prob >= point['ml_threshold']]
+        results.append(BacktestEngine(cfg).run_backtest(patterns, df, rr=point['rr']))
+    return MetricsCalculator.calculate(merge_results(results))
+
+
+def _check(results, frames, config, points, model=None):
+    for k, point in enumerate(points):
+        expected = _direct(frames, config, point, model)
+        row = results.iloc[k]
+        assert row['total_trades'] == expected.get('total_trades', 0)
+        for key, value in expected.items():
+            assert row[key] == value or (np.isnan(value) and np.isnan(row[key])), (point, key)
+
+
+def test_sweep_matches_direct_runs():
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    frames = {f"SYM{i}/USDT": _random_candles(800, i) for i in range(2)}
+    grid = {
+        'impulse_detection.min_candles': [2, 3],
+        'impulse_detection.min_atr_multiplier': [0.8, 1.5],
+        'impulse_detection.min_body_ratio': [0.5, 0.7],
+        'pullback_requirements.min_retracement': [0.6, 0.75],
+        'rr': [2.0, 3.0],
+    }
+
+    results = run_sweep(frames, config, grid)
+
+    points = expand_grid(grid)
+    assert len(results) == len(points)
+    assert list(results.columns[:len(grid)]) == list(grid)
+    _check(results, frames, config, points)
+
+
+def test_ml_threshold_filters_like_the_model(tmp_path):
+    with open('config/pattern_spec.json', 'r') as f:
+        config = json.load(f)
+    frames = {'SYM/USDT': _random_candles(800, 5)}
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 6)), columns=FeatureEngineer.FEATURE_COLUMNS)
+    trainer = MLTrainer()
+    trainer.model = xgb.XGBClassifier(n_estimators=5, max_depth=2).fit(X, rng.integers(0, 2, 200))
+    trainer.save_model(str(tmp_path / 'model.joblib'))
+
+    grid = {'ml_threshold': [0.0, 0.5, 0.55], 'rr': [2.0]}
+    results = run_sweep(frames, config, grid, model_path=str(tmp_path / 'model.joblib'))
+
+    _check(results, frames, config, expand_grid(grid), trainer.model)
+    with pytest.raises(ValueError):
+        run_sweep(frames, config, grid)
+
+
+def test_rejects_unsupported_parameters():
+    with pytest.raises(ValueError):
+        expand_grid({'risk_management.max_bars_in_trade': [20, 40]})
+
+
+def test_summary_has_metric_columns_without_trades():
+    points = expand_grid({'rr': [2.0, 3.0]})
+    empty = summarize(pd.DataFrame(), points, n_sims=50)
+    assert list(empty['total_trades']) == [0, 0]
+    assert empty['expectancy'].isna().all() and 'expectancy_ci_lo' in empty
+    # Сортировка как в sweep_params не падает
+    empty.sort_values('expectancy', ascending=False)
+
+    trades = pd.DataFrame({'r_multiple': [1.0, -1.0, 2.0], 'point': [1, 1, 1]})
+    mixed = summarize(trades, points, n_sims=50)
+    assert list(mixed.columns) == list(empty.columns)
+    assert mixed['expectancy'].iloc[1] == pytest.approx(2 / 3) and np.isnan(mixed['expectancy'].iloc[0])
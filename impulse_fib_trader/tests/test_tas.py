@@ -0,0 +1,73 @@
+import json
+import pandas as pd
+import pytest
+from pattern.tas_detector import TASDetector, ImpulseRejectionDetector
+from tests.test_impulse import _random_candles
+
+# (open, high, low, close)
+LEAD = [(100.0 + k * 0.1, 100.3 + k * 0.1, 99.9 + k * 0.1, 100.1 + k * 0.1) for k in range(10)]
+DROP = [(100.0, 100.1, 98.8, 99.0), (99.0, 99.1, 97.8, 98.0), (98.0, 98.1, 96.8, 97.0)]
+TAIL = [(96.9, 97.5, 95.0, 97.3)]
+RETRACE = [(97.3, 97.9, 96.9, 97.8), (97.8, 98.5, 97.6, 98.4)]
+SHELF = [(98.2, 98.3, 97.5, 97.6), (97.6, 97.8, 96.6, 96.9), (96.9, 97.4, 96.5, 97.2), (97.2, 97.8, 97.0, 97.7)]
+ENTRY = [(97.7, 99.3, 97.6, 99.2)]
+TRAIL = [(99.2, 99.6, 99.0, 99.4)] * 3
+
+
+def _frame(bars) -> pd.DataFrame:
+    df = pd.DataFrame(bars, columns=['open', 'high', 'low', 'close'])
+    df['timestamp'] = pd.date_range('2024-01-01', periods=len(df), freq='1h')
+    df['volume'] = 1.0
+    df['atr'] = 1.0
+    return df
+
+
+@pytest.fixture
+def detector():
+    with open('config/pattern_spec_tas.json', 'r') as f:
+        return TASDetector(json.load(f))
+
+
+def test_detects_full_pattern(detector):
+    bars = LEAD + DROP + TAIL + RETRACE + SHELF + ENTRY + TRAIL
+    df = _frame(bars)
+
+    patterns = detector.detect_patterns(df)
+
+    assert len(patterns) == 1
+    p = patterns[0]
+    entry_idx = len(LEAD + DROP + TAIL + RETRACE + SHELF)
+    assert p['entry_idx'] == entry_idx
+    assert p['tail_low'] == 95.0
+    assert p['breakout_level'] == 98.5
+    assert p['shelf_low'] == 96.5
+    assert p['entry_price'] == 99.2
+    assert p['sl'] == pytest.approx(95.0 - 0.15)
+    assert p['timestamp'] == df['timestamp'].iloc[entry_idx]
+
+
+def test_shelf_closing_below_tail_breaks_pattern(detector):
+    broken = SHELF[:2] + [(96.9, 97.0, 94.5, 94.8)] + SHELF[3:]
+    df = _frame(LEAD + DROP + TAIL + RETRACE + broken + ENTRY + TRAIL)
+
+    assert detector.detect_patterns(df) == []
+
+
+def test_short_shelf_is_not_entered(detector):
+    df = _frame(LEAD + DROP + TAIL + RETRACE + SHELF[:2] + ENTRY + TRAIL)
+
+    assert detector.detect_patterns(df) == []
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_rejection_vectorized_matches_loop(seed):
+    detector = ImpulseRejectionDetector({})
+    df = _random_candles(2000, seed)
+    expected = detector._detect_patterns_loop(df)
+
+    assert expected
+    assert detector.detect_patterns(df) == expected
+    # Без готовой ema_200 она считается на месте
+    assert detector.detect_patterns(df.drop(columns=['ema_200'])) == expected
+    assert (detector.detect_patterns(df, last_n=100)
+            == [p for p in expected if p['entry_idx'] >= len(df) - 1 - 100])
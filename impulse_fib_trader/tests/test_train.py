@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pandas as pd
+from ml.train import MLTrainer
+
+
+def _dataset(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=['a', 'b', 'c', 'd'])
+    y = pd.Series((X['a'] + 0.5 * rng.normal(size=n) > 0.8).astype(int))
+    return X, y
+
+
+def test_walk_forward_folds_match_across_workers():
+    X, y = _dataset()
+    trainer = MLTrainer({'n_estimators': 30, 'max_depth': 3, 'learning_rate': 0.1,
+                         'objective': 'binary:logistic', 'random_state': 42})
+
+    serial = trainer.walk_forward(X, y, n_splits=4, workers=1)
+    pooled = trainer.walk_forward(X, y, n_splits=4, workers=2)
+
+    assert list(serial['fold']) == [0, 1, 2, 3]
+    assert list(serial['train_size']) == [600, 1200, 1800, 2400]
+    assert (serial['test_size'] == 600).all()
+    assert (serial['precision'] > 0.5).all() and (serial['recall'] > 0.5).all()
+    pd.testing.assert_frame_equal(serial.drop(columns='seconds'), pooled.drop(columns='seconds'))
+
+
+def test_walk_forward_orders_rows_by_time():
+    X, y = _dataset(1000, 1)
+    trainer = MLTrainer({'n_estimators': 10, 'max_depth': 2, 'random_state': 0})
+    times = pd.Series(pd.date_range('2024-01-01', periods=1000, freq='h'))
+    perm = np.random.default_rng(2).permutation(1000)
+
+    shuffled = trainer.walk_forward(X.iloc[perm], y.iloc[perm], n_splits=3, times=times.iloc[perm])
+
+    pd.testing.assert_frame_equal(shuffled.drop(columns='seconds'),
+                                  trainer.walk_forward(X, y, n_splits=3).drop(columns='seconds'))
+
+
+def test_train_from_shards_matches_in_memory_fit(tmp_path):
+    from ml.dataset import ShardWriter, list_shards
+    from ml.train import booster_params
+    import xgboost as xgb
+
+    writer = ShardWriter(str(tmp_path / 'shards'))
+    frames = []
+    for k, symbol in enumerate(['BTC/USDT', 'ETH/USDT', 'SOL/USDT']):
+        X, y = _dataset(800, k)
+        times = pd.Series(pd.date_range('2023-06-01', periods=800, freq='12h'))
+        writer.write(symbol, X, y, times)
+        frames.append((X, y, times))
+    assert len(list_shards(str(tmp_path / 'shards'))) == 6  # 3 символа x 2023/2024
+
+    params = {'n_estimators': 20, 'max_depth': 3, 'learning_rate': 0.1,
+              'objective': 'binary:logistic', 'random_state': 42}
+    model, result = MLTrainer(params).train_from_shards(str(tmp_path / 'shards'), holdout_from='2024-01-01')
+
+    X = pd.concat([f[0] for f in frames], ignore_index=True)
+    y = pd.concat([f[1] for f in frames], ignore_index=True)
+    train = pd.concat([f[2] for f in frames], ignore_index=True) < '2024-01-01'
+    expected = booster_params(params, 1)
+    expected['scale_pos_weight'] = (y[train] == 0).sum() / (y[train] == 1).sum()
+    booster = xgb.train(expected, xgb.QuantileDMatrix(X[train], y[train]), 20)
+
+    np.testing.assert_allclose(model.predict_proba(X)[:, 1], booster.predict(xgb.DMatrix(X)), atol=1e-5)
+    assert result['report']['1']['support'] == (y[~train] == 1).sum()
+    assert set(result['feature_importance']) == {'a', 'b', 'c', 'd'}
+
+
+def test_refresh_continues_boosting_on_new_rows():
+    X, y = _dataset(2000, 3)
+    trainer = MLTrainer({'n_estimators': 20, 'max_depth': 3, 'learning_rate': 0.1,
+                         'objective': 'binary:logistic', 'random_state': 42})
+    trainer.model.fit(X.iloc[:1000], y.iloc[:1000])
+    old = trainer.model.get_booster()
+    old_probs = old.inplace_predict(X)
+
+    times = pd.Series(pd.date_range('2025-01-01', periods=1000, freq='h'))
+    perm = np.random.default_rng(4).permutation(1000)
+    new_X, new_y = X.iloc[1000:].iloc[perm], y.iloc[1000:].iloc[perm]
+    model, result = trainer.refresh(new_X, new_y, times.iloc[perm], n_trees=10)
+
+    assert result['trees'] == 30 and model.get_booster().num_boosted_rounds() == 30
+    assert (result['train_size'], result['holdout_size']) == (800, 200)
+    assert result['holdout_from'] == times.iloc[800]
+    assert result['improved'] == (result['after']['logloss'] <= result['before']['logloss'])
+    # Старая модель не меняется, новая отличается только добавленными деревьями
+    np.testing.assert_array_equal(old.inplace_predict(X), old_probs)
+    np.testing.assert_allclose(model.get_booster().inplace_predict(X, iteration_range=(0, 20)), old_probs)
+
+
+def test_shards_are_replaced_and_old_xgboost_falls_back(tmp_path, monkeypatch):
+    from ml.dataset import ShardWriter, list_shards
+    import xgboost as xgb
+
+    root = str(tmp_path / 'shards')
+    writer = ShardWriter(root)
+    X, y = _dataset(400, 5)
+    writer.write('BTC/USDT', X, y, pd.Series(pd.date_range('2023-12-01', periods=400, freq='6h')))
+    writer.write('ETH/USDT', X, y, pd.Series(pd.date_range('2024-01-01', periods=400, freq='h')))
+    # Повторная запись BTC только за 2024 год: шард 2023 исчезает
+    writer.write('BTC/USDT', X, y, pd.Series(pd.date_range('2024-03-01', periods=400, freq='h')))
+    assert [os.path.relpath(p, root) for p in list_shards(root)] == [
+        'symbol=BTC_USDT/year=2024/part.parquet', 'symbol=ETH_USDT/year=2024/part.parquet']
+    writer.clear()
+    assert list_shards(root) == []
+
+    writer.write('BTC/USDT', X, y, pd.Series(pd.date_range('2024-01-01', periods=400, freq='h')))
+    params = {'n_estimators': 5, 'max_depth': 2, 'random_state': 0}
+    expected = MLTrainer(params).train_from_shards(root)[0].predict_proba(X)
+    monkeypatch.delattr(xgb, 'ExtMemQuantileDMatrix')
+    model, _ = MLTrainer(params).train_from_shards(root)
+    np.testing.assert_allclose(model.predict_proba(X), expected, atol=1e-5)